@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CompanySettings
+from .models import CompanySettings, EvenementOutbox
 
 
 @admin.register(CompanySettings)
@@ -54,3 +54,22 @@ class CompanySettingsAdmin(admin.ModelAdmin):
             extra_context=extra_context
         )
 
+
+@admin.register(EvenementOutbox)
+class EvenementOutboxAdmin(admin.ModelAdmin):
+    """
+    Suivi du relais des événements métier
+    """
+    list_display = ['id', 'agregat', 'agregat_id', 'type_evenement', 'created_at', 'traite_le', 'tentatives', 'en_echec']
+    list_filter = ['agregat', 'type_evenement', 'en_echec']
+    search_fields = ['agregat_id', 'derniere_erreur']
+    readonly_fields = [
+        'agregat', 'agregat_id', 'type_evenement', 'donnees', 'created_at',
+        'traite_le', 'tentatives', 'en_echec', 'derniere_erreur'
+    ]
+    actions = ['relancer']
+
+    @admin.action(description="Relancer le relais des événements sélectionnés")
+    def relancer(self, request, queryset):
+        total = queryset.filter(traite_le__isnull=True).update(en_echec=False, tentatives=0)
+        self.message_user(request, f"{total} événements remis en file")
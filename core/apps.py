@@ -5,3 +5,7 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
     verbose_name = 'Modèles de base'
+
+    def ready(self):
+        # Enregistre les abonnés aux événements de l'outbox
+        from . import trigrammes  # noqa: F401
@@ -1,4 +1,6 @@
-from produits.models import Produit
+from django.utils.functional import SimpleLazyObject
+
+from stocks.models import AlerteStock
 from .models import CompanySettings
 
 
@@ -19,23 +21,14 @@ def company_settings_context(request):
 
 def alertes_context(request):
     """
-    Context processor pour ajouter les alertes de stock à tous les templates
+    Context processor pour ajouter les alertes de stock à tous les templates.
+    Lit la table des alertes tenue à jour ; les requêtes ne sont exécutées
+    que si le template affiche les alertes.
     """
     if request.user.is_authenticated:
-        # Alertes de stock
-        alertes_stock = []
-        for produit in Produit.objects.filter(is_active=True):
-            stock_actuel = produit.stock_actuel
-            if stock_actuel <= produit.seuil_alerte:
-                alertes_stock.append({
-                    'produit': produit,
-                    'stock_actuel': stock_actuel,
-                    'seuil': produit.seuil_alerte
-                })
-        
         return {
-            'alertes_stock': alertes_stock,
-            'alertes_count': len(alertes_stock)
+            'alertes_stock': AlerteStock.objects.select_related('produit')[:5],
+            'alertes_count': SimpleLazyObject(AlerteStock.objects.count)
         }
     return {
         'alertes_stock': [],
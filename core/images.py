@@ -0,0 +1,156 @@
+"""
+Dérivés des images téléversées (miniatures WebP et JPEG)
+
+À l'enregistrement d'une nouvelle image, le modèle appelle `preparer` puis
+`planifier` : la tâche `core.tasks.generer_derives_image` est lancée après
+validation de la transaction, la requête n'attend pas le redimensionnement.
+La tâche produit, pour chaque largeur de `IMAGES_LARGEURS` inférieure à
+celle de l'original, une version WebP et une version JPEG nommées d'après
+l'empreinte SHA-256 de l'original : un nom désigne toujours le même contenu
+et peut être mis en cache sans limite par les navigateurs. La description
+des dérivés est enregistrée dans le champ JSON `<champ>_derives` du modèle
+et lue par la balise `{% image_responsive %}` sans accès au stockage.
+
+Les images restées sans dérivés (Celery indisponible, tâche perdue) sont
+reprises par la tâche `core.tasks.generer_derives_manquants` et par la
+commande `python manage.py generate_image_derivatives`.
+"""
+import hashlib
+import io
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Modèle (app_label.model_name) -> champs image dont les dérivés sont générés
+CHAMPS_IMAGES = {
+    'produits.produit': ['image'],
+    'utilisateurs.profilutilisateur': ['avatar'],
+}
+DOSSIER = 'derives'
+
+
+def _encoder(image, format_image):
+    tampon = io.BytesIO()
+    if format_image == 'JPEG':
+        if image.mode in ('RGBA', 'LA'):
+            # Le JPEG n'a pas de transparence : l'image est posée sur un fond blanc
+            fond = Image.new('RGB', image.size, 'white')
+            fond.paste(image, mask=image.getchannel('A'))
+            image = fond
+        image.convert('RGB').save(tampon, 'JPEG', quality=settings.IMAGES_QUALITE, optimize=True, progressive=True)
+    else:
+        image.save(tampon, 'WEBP', quality=settings.IMAGES_QUALITE, method=4)
+    return tampon.getvalue()
+
+
+def _enregistrer(nom, contenu):
+    # Même nom, même contenu : un dérivé déjà présent n'est pas réécrit
+    if default_storage.exists(nom):
+        return nom
+    return default_storage.save(nom, ContentFile(contenu))
+
+
+def calculer_derives(contenu, prefixe):
+    """
+    Crée les dérivés d'une image (contenu binaire) sous `derives/<prefixe>/` ;
+    retourne leur description : dimensions de l'original et variantes
+    [{'largeur', 'hauteur', 'webp', 'jpeg'}] par largeur croissante
+    """
+    empreinte = hashlib.sha256(contenu).hexdigest()[:20]
+    with Image.open(io.BytesIO(contenu)) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    largeurs = [largeur for largeur in sorted(settings.IMAGES_LARGEURS) if largeur < image.width] or [image.width]
+    variantes = []
+    for largeur in largeurs:
+        hauteur = max(1, round(image.height * largeur / image.width))
+        reduite = image.resize((largeur, hauteur), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        base = f"{DOSSIER}/{prefixe}/{empreinte}_{largeur}"
+        variantes.append({
+            'largeur': largeur,
+            'hauteur': hauteur,
+            'webp': _enregistrer(f"{base}.webp", _encoder(reduite, 'WEBP')),
+            'jpeg': _enregistrer(f"{base}.jpg", _encoder(reduite, 'JPEG')),
+        })
+    return {'largeur': image.width, 'hauteur': image.height, 'variantes': variantes}
+
+
+def generer(modele, pk, champ):
+    """
+    Génère les dérivés de l'image `champ` d'un objet et les enregistre sur
+    celui-ci ; retourne le nombre de variantes créées
+    """
+    Modele = apps.get_model(modele)
+    instance = Modele.objects.filter(pk=pk).first()
+    fichier = getattr(instance, champ, None)
+    if not fichier:
+        return 0
+    try:
+        with fichier.open('rb'):
+            derives = calculer_derives(fichier.read(), instance._meta.model_name)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        # Fichier illisible : noté pour ne pas être repris à chaque passage
+        logger.warning("Dérivés impossibles pour %s %s (%s) : %s", modele, pk, fichier.name, e)
+        derives = {'erreur': f"{type(e).__name__}: {e}"}
+    # L'image a pu être remplacée pendant le calcul : seuls les dérivés de l'image courante sont gardés
+    Modele.objects.filter(pk=pk, **{champ: fichier.name}).update(**{f"{champ}_derives": derives})
+    return len(derives.get('variantes', []))
+
+
+def preparer(instance, champ):
+    """
+    À appeler avant l'enregistrement de `instance`. Retourne True si une
+    nouvelle image vient d'être téléversée ; les dérivés d'une image
+    remplacée ou retirée sont oubliés.
+    """
+    fichier = getattr(instance, champ)
+    # Un fichier téléversé n'est écrit dans le stockage qu'au save()
+    nouvelle = bool(fichier) and not fichier._committed
+    if nouvelle or not fichier:
+        setattr(instance, f"{champ}_derives", {})
+    return nouvelle
+
+
+def planifier(instance, champ):
+    """
+    Lance la génération des dérivés une fois la transaction courante validée
+    """
+    from .tasks import generer_derives_image
+
+    modele = f"{instance._meta.app_label}.{instance._meta.model_name}"
+    pk = instance.pk
+
+    def lancer():
+        try:
+            generer_derives_image.delay(modele, pk, champ)
+        except Exception as e:
+            # Sans Celery, l'original est servi jusqu'à la reprise périodique
+            logger.warning("Génération des dérivés non planifiée pour %s %s : %s", modele, pk, e)
+
+    transaction.on_commit(lancer)
+
+
+def a_traiter(tous=False):
+    """
+    Objets dont une image n'a pas encore de dérivés (toutes les images avec
+    `tous=True`) : [(modele, pk, champ)]
+    """
+    resultat = []
+    for modele, champs in CHAMPS_IMAGES.items():
+        Modele = apps.get_model(modele)
+        for champ in champs:
+            queryset = Modele.objects.exclude(**{f"{champ}__isnull": True}).exclude(**{champ: ''})
+            if not tous:
+                queryset = queryset.filter(**{f"{champ}_derives": {}})
+            resultat.extend((modele, pk, champ) for pk in queryset.values_list('pk', flat=True))
+    return resultat
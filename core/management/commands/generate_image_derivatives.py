@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core import images
+
+
+class Command(BaseCommand):
+    help = "Génère les miniatures WebP et JPEG des images de produits et des avatars"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tous',
+            action='store_true',
+            help="Régénère aussi les images qui ont déjà leurs dérivés (après un changement de IMAGES_LARGEURS)",
+        )
+
+    def handle(self, *args, **options):
+        a_traiter = images.a_traiter(tous=options['tous'])
+        variantes = 0
+        for modele, pk, champ in a_traiter:
+            variantes += images.generer(modele, pk, champ)
+        self.stdout.write(self.style.SUCCESS(f"{len(a_traiter)} images traitées, {variantes} variantes générées"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import trigrammes
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de trigrammes de la recherche approchée (bases autres que PostgreSQL)"
+
+    def handle(self, *args, **options):
+        if trigrammes.utilise_pg_trgm():
+            self.stdout.write("PostgreSQL : la recherche approchée utilise pg_trgm, aucun index à reconstruire")
+            return
+        total = trigrammes.reconstruire()
+        self.stdout.write(self.style.SUCCESS(f"{total} objets indexés"))
@@ -0,0 +1,122 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:56
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EvenementOutbox",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "agregat",
+                    models.CharField(
+                        help_text="Modèle concerné (app_label.model_name)",
+                        max_length=100,
+                        verbose_name="Agrégat",
+                    ),
+                ),
+                (
+                    "agregat_id",
+                    models.CharField(
+                        help_text="Clé primaire de l'enregistrement concerné",
+                        max_length=64,
+                        verbose_name="Identifiant de l'agrégat",
+                    ),
+                ),
+                (
+                    "type_evenement",
+                    models.CharField(
+                        choices=[
+                            ("CREATION", "Création"),
+                            ("MODIFICATION", "Modification"),
+                            ("SUPPRESSION", "Suppression"),
+                        ],
+                        help_text="Nature de la modification",
+                        max_length=20,
+                        verbose_name="Type d'événement",
+                    ),
+                ),
+                (
+                    "donnees",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        help_text="État utile aux abonnés au moment de l'événement",
+                        verbose_name="Données",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Date de création"
+                    ),
+                ),
+                (
+                    "traite_le",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Date de remise à tous les abonnés",
+                        null=True,
+                        verbose_name="Traité le",
+                    ),
+                ),
+                (
+                    "tentatives",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Nombre de relais ayant échoué pour cet événement",
+                        verbose_name="Tentatives en erreur",
+                    ),
+                ),
+                (
+                    "en_echec",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Relais abandonné après le nombre maximal de tentatives",
+                        verbose_name="En échec",
+                    ),
+                ),
+                (
+                    "derniere_erreur",
+                    models.TextField(
+                        blank=True,
+                        help_text="Message de la dernière erreur d'un abonné",
+                        verbose_name="Dernière erreur",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Événement (outbox)",
+                "verbose_name_plural": "Événements (outbox)",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(
+                            ("en_echec", False), ("traite_le__isnull", True)
+                        ),
+                        fields=["id"],
+                        name="outbox_a_traiter_idx",
+                    ),
+                    models.Index(
+                        fields=["agregat", "agregat_id"], name="outbox_agregat_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
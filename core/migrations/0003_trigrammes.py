@@ -0,0 +1,131 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:03
+
+import re
+
+from django.db import migrations, models
+
+# Table, colonne et nom de l'index GIN trigramme de chaque cible
+INDEX_TRIGRAMMES = [
+    ("produits.produit", "produits_produit", "nom", "produit_nom_trgm_idx"),
+    (
+        "fournisseurs.fournisseur",
+        "fournisseurs_fournisseur",
+        "nom",
+        "fournisseur_nom_trgm_idx",
+    ),
+    ("ventes.vente", "ventes_vente", "client_nom", "vente_client_nom_trgm_idx"),
+]
+
+
+def trigrammes(texte):
+    """
+    Copie figée de core.trigrammes.trigrammes : mots en minuscules,
+    précédés de deux espaces et suivis d'un espace
+    """
+    resultat = set()
+    for mot in re.findall(r"[^\W_]+", (texte or "").lower()):
+        mot = f"  {mot} "
+        resultat.update(mot[i : i + 3] for i in range(len(mot) - 2))
+    return resultat
+
+
+def installer(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for _, table, colonne, index in INDEX_TRIGRAMMES:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {index} ON "{table}" USING gin ("{colonne}" gin_trgm_ops)'
+            )
+        return
+
+    # Autres bases : index Python initial
+    TrigrammeRecherche = apps.get_model("core", "TrigrammeRecherche")
+    for cible, _, colonne, _ in INDEX_TRIGRAMMES:
+        lignes = []
+        valeurs = (
+            apps.get_model(cible)
+            .objects.filter(is_active=True)
+            .values_list("pk", colonne)
+        )
+        for objet_id, valeur in valeurs.iterator(chunk_size=2000):
+            trigrammes_valeur = trigrammes(valeur)
+            lignes.extend(
+                TrigrammeRecherche(
+                    cible=cible,
+                    objet_id=objet_id,
+                    trigramme=trigramme,
+                    total=len(trigrammes_valeur),
+                )
+                for trigramme in trigrammes_valeur
+            )
+        TrigrammeRecherche.objects.bulk_create(lignes, batch_size=2000)
+
+
+def desinstaller(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for _, _, _, index in INDEX_TRIGRAMMES:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_outbox"),
+        ("fournisseurs", "0001_initial"),
+        ("produits", "0002_recherche_plein_texte"),
+        ("ventes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrigrammeRecherche",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "cible",
+                    models.CharField(
+                        help_text="Modèle indexé (app_label.model_name)",
+                        max_length=100,
+                        verbose_name="Cible",
+                    ),
+                ),
+                (
+                    "objet_id",
+                    models.BigIntegerField(
+                        help_text="Clé primaire de l'objet indexé",
+                        verbose_name="Identifiant de l'objet",
+                    ),
+                ),
+                ("trigramme", models.CharField(max_length=3, verbose_name="Trigramme")),
+                (
+                    "total",
+                    models.PositiveSmallIntegerField(
+                        help_text="Nombre de trigrammes distincts de la valeur indexée",
+                        verbose_name="Trigrammes de la valeur",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Trigramme de recherche",
+                "verbose_name_plural": "Trigrammes de recherche",
+                "indexes": [
+                    models.Index(
+                        fields=["cible", "trigramme", "objet_id"],
+                        name="trigramme_recherche_idx",
+                    ),
+                    models.Index(
+                        fields=["cible", "objet_id"], name="trigramme_objet_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(installer, desinstaller),
+    ]
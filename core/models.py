@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 
@@ -198,3 +199,114 @@ class CompanySettings(models.Model):
         Empêche la suppression de l'instance singleton
         """
         pass
+
+
+class EvenementOutbox(models.Model):
+    """
+    Événement métier écrit dans la même transaction que la modification
+    qu'il décrit, puis relayé de façon asynchrone aux abonnés (voir core.outbox)
+    """
+    TYPE_EVENEMENT_CHOICES = [
+        ('CREATION', 'Création'),
+        ('MODIFICATION', 'Modification'),
+        ('SUPPRESSION', 'Suppression'),
+    ]
+
+    agregat = models.CharField(
+        max_length=100,
+        verbose_name="Agrégat",
+        help_text="Modèle concerné (app_label.model_name)"
+    )
+    agregat_id = models.CharField(
+        max_length=64,
+        verbose_name="Identifiant de l'agrégat",
+        help_text="Clé primaire de l'enregistrement concerné"
+    )
+    type_evenement = models.CharField(
+        max_length=20,
+        choices=TYPE_EVENEMENT_CHOICES,
+        verbose_name="Type d'événement",
+        help_text="Nature de la modification"
+    )
+    donnees = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        verbose_name="Données",
+        help_text="État utile aux abonnés au moment de l'événement"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Date de création"
+    )
+    traite_le = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Traité le",
+        help_text="Date de remise à tous les abonnés"
+    )
+    tentatives = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Tentatives en erreur",
+        help_text="Nombre de relais ayant échoué pour cet événement"
+    )
+    en_echec = models.BooleanField(
+        default=False,
+        verbose_name="En échec",
+        help_text="Relais abandonné après le nombre maximal de tentatives"
+    )
+    derniere_erreur = models.TextField(
+        blank=True,
+        verbose_name="Dernière erreur",
+        help_text="Message de la dernière erreur d'un abonné"
+    )
+
+    class Meta:
+        verbose_name = "Événement (outbox)"
+        verbose_name_plural = "Événements (outbox)"
+        ordering = ['id']
+        indexes = [
+            # File des événements à relayer, dans l'ordre d'écriture
+            models.Index(
+                fields=['id'],
+                condition=models.Q(traite_le__isnull=True, en_echec=False),
+                name='outbox_a_traiter_idx',
+            ),
+            models.Index(fields=['agregat', 'agregat_id'], name='outbox_agregat_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.agregat} #{self.agregat_id} - {self.get_type_evenement_display()}"
+
+
+class TrigrammeRecherche(models.Model):
+    """
+    Index de trigrammes pour la recherche approchée hors PostgreSQL (voir core.trigrammes)
+    """
+    cible = models.CharField(
+        max_length=100,
+        verbose_name="Cible",
+        help_text="Modèle indexé (app_label.model_name)"
+    )
+    objet_id = models.BigIntegerField(
+        verbose_name="Identifiant de l'objet",
+        help_text="Clé primaire de l'objet indexé"
+    )
+    trigramme = models.CharField(
+        max_length=3,
+        verbose_name="Trigramme"
+    )
+    total = models.PositiveSmallIntegerField(
+        verbose_name="Trigrammes de la valeur",
+        help_text="Nombre de trigrammes distincts de la valeur indexée"
+    )
+
+    class Meta:
+        verbose_name = "Trigramme de recherche"
+        verbose_name_plural = "Trigrammes de recherche"
+        indexes = [
+            models.Index(fields=['cible', 'trigramme', 'objet_id'], name='trigramme_recherche_idx'),
+            models.Index(fields=['cible', 'objet_id'], name='trigramme_objet_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.cible} #{self.objet_id} - {self.trigramme!r}"
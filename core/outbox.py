@@ -0,0 +1,150 @@
+"""
+Outbox transactionnelle des événements métier
+
+Les modèles publient leurs modifications avec `publier` dans la transaction
+de leur propre enregistrement : l'événement n'existe que si la modification
+est validée. La tâche `core.tasks.relayer_evenements_outbox` lit ensuite la
+table par lots, dans l'ordre d'écriture, et remet chaque événement aux
+fonctions abonnées à son agrégat (`@abonner('stocks.mouvementstock')`).
+
+La remise est « au moins une fois » : un abonné peut recevoir deux fois le
+même événement (identifiant `evenement.pk`) et doit donc être idempotent.
+Les écritures d'un même enregistrement étant sérialisées par ses verrous de
+ligne, l'ordre des identifiants est celui des modifications ; quand un
+abonné échoue, les événements suivants du même agrégat attendent le relais
+suivant. Après `OUTBOX_MAX_TENTATIVES` échecs, l'événement est mis de côté
+(`en_echec`) et son agrégat reste bloqué jusqu'à ce qu'il soit relancé
+depuis l'administration puis traité.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import EvenementOutbox
+
+logger = logging.getLogger(__name__)
+
+_abonnes = {}
+
+
+def abonner(*agregats):
+    """
+    Décorateur : abonne une fonction `f(evenement)` aux événements des agrégats donnés
+    """
+    def decorateur(fonction):
+        for agregat in agregats:
+            abonnes = _abonnes.setdefault(agregat, [])
+            if fonction not in abonnes:
+                abonnes.append(fonction)
+        return fonction
+    return decorateur
+
+
+def nom_agregat(instance):
+    return f"{instance._meta.app_label}.{instance._meta.model_name}"
+
+
+def _evenement(instance, type_evenement, donnees, pk=None):
+    return EvenementOutbox(
+        agregat=nom_agregat(instance),
+        agregat_id=str(instance.pk if pk is None else pk),
+        type_evenement=type_evenement,
+        donnees=donnees or {},
+    )
+
+
+def publier(instance, type_evenement, donnees=None, pk=None):
+    """
+    Enregistre un événement pour `instance`. À appeler dans la transaction
+    de la modification ; `pk` sert après une suppression.
+    """
+    evenement = _evenement(instance, type_evenement, donnees, pk)
+    evenement.save()
+    return evenement
+
+
+def publier_lot(evenements):
+    """
+    Enregistre en une requête les événements [(instance, type_evenement, donnees)]
+    d'objets créés sans passer par save() (bulk_create)
+    """
+    return EvenementOutbox.objects.bulk_create(
+        [_evenement(instance, type_evenement, donnees) for instance, type_evenement, donnees in evenements],
+        batch_size=1000,
+    )
+
+
+def _relayer_lot(taille_lot, max_tentatives):
+    """
+    Relaie un lot d'événements ; retourne (lus, traités, en erreur)
+    """
+    with transaction.atomic():
+        # Les relais concurrents attendent ce verrou : l'ordre de remise est conservé
+        # Un agrégat dont un événement est en échec reste bloqué tant que celui-ci n'est pas traité
+        bloque = EvenementOutbox.objects.filter(
+            agregat=OuterRef('agregat'),
+            agregat_id=OuterRef('agregat_id'),
+            traite_le__isnull=True,
+            en_echec=True,
+            id__lt=OuterRef('id'),
+        )
+        lot = list(
+            EvenementOutbox.objects.select_for_update().filter(
+                ~Exists(bloque), traite_le__isnull=True, en_echec=False
+            ).order_by('id')[:taille_lot]
+        )
+        bloques = set()
+        traites, erreurs = [], []
+        for evenement in lot:
+            cle = (evenement.agregat, evenement.agregat_id)
+            if cle in bloques:
+                continue
+            try:
+                with transaction.atomic():
+                    for abonne in _abonnes.get(evenement.agregat, []):
+                        abonne(evenement)
+            except Exception as e:
+                logger.exception("Échec du relais de l'événement %s", evenement.pk)
+                evenement.tentatives += 1
+                evenement.derniere_erreur = f"{type(e).__name__}: {e}"
+                evenement.en_echec = evenement.tentatives >= max_tentatives
+                bloques.add(cle)
+                erreurs.append(evenement)
+            else:
+                evenement.traite_le = timezone.now()
+                traites.append(evenement)
+
+        EvenementOutbox.objects.bulk_update(traites, ['traite_le'])
+        EvenementOutbox.objects.bulk_update(erreurs, ['tentatives', 'en_echec', 'derniere_erreur'])
+    return len(lot), len(traites), len(erreurs)
+
+
+def relayer(taille_lot=None, max_tentatives=None):
+    """
+    Relaie les événements en attente, lot par lot, jusqu'à vider la file ou
+    rencontrer une erreur. Retourne (traités, en erreur).
+    """
+    taille_lot = taille_lot or settings.OUTBOX_TAILLE_LOT
+    max_tentatives = max_tentatives or settings.OUTBOX_MAX_TENTATIVES
+    total_traites = total_erreurs = 0
+    while True:
+        lus, traites, erreurs = _relayer_lot(taille_lot, max_tentatives)
+        total_traites += traites
+        total_erreurs += erreurs
+        # Une erreur laisse des événements en attente : ils seront repris au prochain relais
+        if lus < taille_lot or erreurs:
+            return total_traites, total_erreurs
+
+
+def purger(jours=None):
+    """
+    Supprime les événements traités depuis plus de `jours` jours
+    """
+    jours = settings.OUTBOX_RETENTION_JOURS if jours is None else jours
+    limite = timezone.now() - timedelta(days=jours)
+    supprimes, _ = EvenementOutbox.objects.filter(traite_le__lt=limite).delete()
+    return supprimes
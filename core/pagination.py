@@ -0,0 +1,161 @@
+import base64
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    Encodeur JSON conservant les microsecondes des dates (DjangoJSONEncoder les tronque)
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class InvalidCursor(Exception):
+    """
+    Curseur de pagination illisible ou incompatible avec le tri
+    """
+
+
+class CursorPage:
+    """
+    Page d'une pagination par curseur (keyset)
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Pagination par curseur sur un tri unique et total, par exemple
+    ('-date_mouvement', '-id'). Chaque page est lue par une condition
+    WHERE sur la dernière clé vue : ni OFFSET, ni COUNT(*).
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        """
+        Retourne la page désignée par un jeton opaque (première page si vide)
+        """
+        direction, valeurs = self.decode_cursor(cursor) if cursor else ('n', None)
+        ordering = self.ordering if direction == 'n' else self._inverser(self.ordering)
+
+        queryset = self.queryset.order_by(*ordering)
+        if valeurs is not None:
+            queryset = queryset.filter(self._condition_apres(ordering, valeurs))
+        objets = list(queryset[:self.per_page + 1])
+        encore = len(objets) > self.per_page
+        objets = objets[:self.per_page]
+
+        if direction == 'p':
+            objets.reverse()
+            suivant = objets and self.encode_cursor('n', objets[-1])
+            precedent = encore and objets and self.encode_cursor('p', objets[0])
+        else:
+            suivant = encore and self.encode_cursor('n', objets[-1])
+            precedent = valeurs is not None and objets and self.encode_cursor('p', objets[0])
+        return CursorPage(objets, suivant or None, precedent or None)
+
+    def encode_cursor(self, direction, obj):
+        valeurs = [getattr(obj, champ.lstrip('-')) for champ in self.ordering]
+        donnees = json.dumps({'d': direction, 'v': valeurs}, cls=CursorEncoder)
+        return base64.urlsafe_b64encode(donnees.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            donnees = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            direction, valeurs = donnees['d'], donnees['v']
+        except (ValueError, TypeError, KeyError):
+            raise InvalidCursor(cursor)
+        if direction not in ('n', 'p') or len(valeurs) != len(self.ordering):
+            raise InvalidCursor(cursor)
+        try:
+            valeurs = [self._convertir(champ, valeur) for champ, valeur in zip(self.ordering, valeurs)]
+        except ValidationError:
+            raise InvalidCursor(cursor)
+        return direction, valeurs
+
+    def _convertir(self, champ, valeur):
+        try:
+            field = self.queryset.model._meta.get_field(champ.lstrip('-'))
+        except FieldDoesNotExist:
+            # Annotation : la valeur JSON est utilisée telle quelle
+            return valeur
+        return field.to_python(valeur)
+
+    @staticmethod
+    def _inverser(ordering):
+        return tuple(champ[1:] if champ.startswith('-') else f'-{champ}' for champ in ordering)
+
+    @staticmethod
+    def _condition_apres(ordering, valeurs):
+        """
+        (a, b, c) > (x, y, z) exprimé champ par champ pour supporter des sens de tri mixtes
+        """
+        condition = Q()
+        egalites = {}
+        for champ, valeur in zip(ordering, valeurs):
+            nom = champ.lstrip('-')
+            lookup = 'lt' if champ.startswith('-') else 'gt'
+            condition |= Q(**egalites, **{f'{nom}__{lookup}': valeur})
+            egalites[nom] = valeur
+        return condition
+
+
+class CursorPaginationMixin:
+    """
+    Active la pagination par curseur d'une ListView quand le paramètre
+    `curseur` est présent dans l'URL ; la pagination classique reste
+    utilisée sinon.
+    """
+    cursor_ordering = None
+    cursor_param = 'curseur'
+
+    def get_cursor_ordering(self):
+        return self.cursor_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.cursor_param not in self.request.GET:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = CursorPaginator(queryset, self.get_cursor_ordering(), page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_param))
+        except InvalidCursor:
+            raise Http404("Curseur de pagination invalide")
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['pagination_curseur'] = self.cursor_param in self.request.GET
+        return context
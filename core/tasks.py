@@ -4,6 +4,10 @@ from django.conf import settings
 from produits.models import Produit
 from stocks.models import MouvementStock
 from django.utils import timezone
+from django.db.models import Sum, F
+from datetime import timedelta
+
+from . import images, outbox
 
 
 @shared_task
@@ -13,15 +17,17 @@ def check_stock_alerts():
     """
     produits_en_rupture = []
     
-    for produit in Produit.objects.filter(is_active=True):
-        if produit.est_en_rupture:
-            produits_en_rupture.append({
-                'nom': produit.nom,
-                'code': produit.code_produit,
-                'stock_actuel': produit.stock_actuel,
-                'seuil': produit.seuil_alerte,
-                'fournisseur': produit.fournisseur_principal.nom if produit.fournisseur_principal else 'Non défini'
-            })
+    produits = Produit.objects.filter(
+        is_active=True
+    ).with_stock().filter(en_rupture=True).select_related('fournisseur_principal')
+    for produit in produits:
+        produits_en_rupture.append({
+            'nom': produit.nom,
+            'code': produit.code_produit,
+            'stock_actuel': produit.stock_actuel,
+            'seuil': produit.seuil_alerte,
+            'fournisseur': produit.fournisseur_principal.nom if produit.fournisseur_principal else 'Non défini'
+        })
     
     if produits_en_rupture:
         # Envoyer un email d'alerte (en développement, affiché dans la console)
@@ -54,29 +60,39 @@ def generate_daily_report():
     """
     Génère un rapport quotidien des ventes et mouvements de stock
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
+    # Bornes du jour en datetime pour profiter de l'index sur date_mouvement
+    debut_jour = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    fin_jour = debut_jour + timedelta(days=1)
     
     # Statistiques des ventes du jour
     ventes_jour = MouvementStock.objects.filter(
         type_mouvement='SORTIE',
         motif='VENTE',
-        date_mouvement__date=today,
+        date_mouvement__gte=debut_jour,
+        date_mouvement__lt=fin_jour,
         is_active=True
     )
     
-    ca_jour = sum(mouvement.valeur_totale for mouvement in ventes_jour if mouvement.valeur_totale)
-    nb_ventes = len(set(mouvement.reference for mouvement in ventes_jour if mouvement.reference))
+    ca_jour = ventes_jour.aggregate(
+        total=Sum(F('prix_unitaire') * F('quantite'))
+    )['total'] or 0
+    nb_ventes = ventes_jour.exclude(reference__isnull=True).exclude(
+        reference=''
+    ).values('reference').distinct().count()
     
     # Mouvements de stock du jour
     mouvements_entree = MouvementStock.objects.filter(
         type_mouvement='ENTREE',
-        date_mouvement__date=today,
+        date_mouvement__gte=debut_jour,
+        date_mouvement__lt=fin_jour,
         is_active=True
     ).count()
     
     mouvements_sortie = MouvementStock.objects.filter(
         type_mouvement='SORTIE',
-        date_mouvement__date=today,
+        date_mouvement__gte=debut_jour,
+        date_mouvement__lt=fin_jour,
         is_active=True
     ).count()
     
@@ -104,3 +120,39 @@ STOCK :
         'mouvements_entree': mouvements_entree,
         'mouvements_sortie': mouvements_sortie
     }
+
+
+@shared_task
+def relayer_evenements_outbox():
+    """
+    Remet les événements de l'outbox en attente à leurs abonnés
+    """
+    traites, erreurs = outbox.relayer()
+    return f"{traites} événements relayés, {erreurs} en erreur"
+
+
+@shared_task
+def purger_evenements_outbox():
+    """
+    Supprime les événements de l'outbox déjà relayés
+    """
+    return f"{outbox.purger()} événements purgés"
+
+
+@shared_task
+def generer_derives_image(modele, pk, champ):
+    """
+    Génère les miniatures WebP et JPEG d'une image téléversée
+    """
+    return f"{images.generer(modele, pk, champ)} dérivés générés pour {modele} {pk}"
+
+
+@shared_task
+def generer_derives_manquants(limite=100):
+    """
+    Reprend les images restées sans dérivés (au plus `limite` par passage)
+    """
+    a_traiter = images.a_traiter()[:limite]
+    for modele, pk, champ in a_traiter:
+        images.generer(modele, pk, champ)
+    return f"{len(a_traiter)} images traitées"
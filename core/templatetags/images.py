@@ -0,0 +1,37 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+def _srcset(variantes, format_image):
+    return ', '.join(f"{default_storage.url(variante[format_image])} {variante['largeur']}w" for variante in variantes)
+
+
+@register.simple_tag
+def image_responsive(objet, champ, alt='', classe='', sizes='100vw'):
+    """
+    Image d'un objet avec ses miniatures (voir core.images) : <picture> avec
+    srcset WebP et JPEG, chargement différé. Tant que les miniatures ne sont
+    pas prêtes, l'original est affiché.
+
+    {% image_responsive produit 'image' alt=produit.nom classe='w-10 h-10' sizes='40px' %}
+    """
+    fichier = getattr(objet, champ, None)
+    if not fichier:
+        return ''
+    variantes = (getattr(objet, f"{champ}_derives", None) or {}).get('variantes')
+    if not variantes:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async">', fichier.url, alt, classe
+        )
+    plus_grande = variantes[-1]
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" '
+        'loading="lazy" decoding="async"></picture>',
+        _srcset(variantes, 'webp'), sizes,
+        default_storage.url(variantes[0]['jpeg']), _srcset(variantes, 'jpeg'), sizes,
+        plus_grande['largeur'], plus_grande['hauteur'], alt, classe,
+    )
@@ -0,0 +1,143 @@
+"""
+Recherche approchée par trigrammes (tolérante aux fautes de frappe)
+
+Cibles : nom des produits, nom des fournisseurs et nom du client des ventes.
+
+PostgreSQL : extension pg_trgm et index GIN `gin_trgm_ops` sur chaque
+colonne ; l'opérateur `<%` (word_similarity) utilise l'index et les
+résultats sont classés par similarité.
+Autres bases : index Python dans la table `TrigrammeRecherche` (trigrammes
+calculés comme pg_trgm), tenu à jour par les événements de l'outbox et
+reconstruit par `python manage.py rebuild_trigram_index`. La similarité
+est la part des trigrammes de la recherche présents dans la valeur.
+
+Dans les deux cas, la limite est appliquée par la base.
+"""
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, FloatField, Max
+from django.db.models.expressions import RawSQL
+
+from .models import TrigrammeRecherche
+from .outbox import abonner
+
+# Agrégat (app_label.model_name) -> colonne indexée
+CIBLES = {
+    'produits.produit': 'nom',
+    'fournisseurs.fournisseur': 'nom',
+    'ventes.vente': 'client_nom',
+}
+
+
+def trigrammes(texte):
+    """
+    Trigrammes d'un texte à la manière de pg_trgm : mots en minuscules,
+    précédés de deux espaces et suivis d'un espace
+    """
+    resultat = set()
+    for mot in re.findall(r'[^\W_]+', (texte or '').lower()):
+        mot = f"  {mot} "
+        resultat.update(mot[i:i + 3] for i in range(len(mot) - 2))
+    return resultat
+
+
+def utilise_pg_trgm(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def _modele(cible):
+    return apps.get_model(cible)
+
+
+def rechercher(queryset, texte, limite=10):
+    """
+    Objets de `queryset` (modèle parmi CIBLES) proches de `texte`, classés
+    par similarité décroissante (attribut `similarite`), au plus `limite`
+    """
+    cible = f"{queryset.model._meta.app_label}.{queryset.model._meta.model_name}"
+    colonne = CIBLES[cible]
+    if not trigrammes(texte):
+        return []
+
+    if utilise_pg_trgm(queryset.db):
+        table = queryset.model._meta.db_table
+        return list(
+            queryset.extra(where=[f'%s <%% "{table}"."{colonne}"'], params=[texte]).annotate(
+                similarite=RawSQL(f'word_similarity(%s, "{table}"."{colonne}")', [texte], output_field=FloatField())
+            ).order_by('-similarite', colonne, 'pk')[:limite]
+        )
+
+    recherche = trigrammes(texte)
+    seuil = settings.RECHERCHE_SIMILARITE_MIN
+    # Un candidat doit partager au moins `seuil` des trigrammes recherchés
+    candidats = list(
+        TrigrammeRecherche.objects.filter(cible=cible, trigramme__in=recherche).values('objet_id').annotate(
+            communs=Count('id'), total=Max('total')
+        ).filter(communs__gte=seuil * len(recherche)).order_by('-communs', 'total', 'objet_id').values_list(
+            'objet_id', 'communs'
+        )[:limite * 2]
+    )
+    objets = queryset.in_bulk([objet_id for objet_id, _ in candidats])
+    resultat = []
+    for objet_id, communs in candidats:
+        if objet_id in objets:
+            objets[objet_id].similarite = communs / len(recherche)
+            resultat.append(objets[objet_id])
+    return resultat[:limite]
+
+
+def lignes_index(cible, objet_id, valeur):
+    """
+    Lignes de l'index Python pour une valeur
+    """
+    trigrammes_valeur = trigrammes(valeur)
+    return [
+        TrigrammeRecherche(cible=cible, objet_id=objet_id, trigramme=trigramme, total=len(trigrammes_valeur))
+        for trigramme in trigrammes_valeur
+    ]
+
+
+def indexer(cible, objet_ids):
+    """
+    Réindexe des objets d'une cible à partir de leur état courant en base
+    (les objets supprimés ou inactifs sortent de l'index)
+    """
+    colonne = CIBLES[cible]
+    valeurs = _modele(cible).objects.filter(pk__in=objet_ids, is_active=True).values_list('pk', colonne)
+    with transaction.atomic():
+        TrigrammeRecherche.objects.filter(cible=cible, objet_id__in=objet_ids).delete()
+        TrigrammeRecherche.objects.bulk_create(
+            [ligne for objet_id, valeur in valeurs for ligne in lignes_index(cible, objet_id, valeur)],
+            batch_size=2000,
+        )
+
+
+def reconstruire(taille_lot=2000):
+    """
+    Reconstruit tout l'index Python ; retourne le nombre d'objets indexés
+    """
+    total = 0
+    for cible, colonne in CIBLES.items():
+        TrigrammeRecherche.objects.filter(cible=cible).delete()
+        valeurs = _modele(cible).objects.filter(is_active=True).values_list('pk', colonne).order_by('pk')
+        lignes = []
+        for objet_id, valeur in valeurs.iterator(chunk_size=taille_lot):
+            lignes.extend(lignes_index(cible, objet_id, valeur))
+            total += 1
+            if len(lignes) >= taille_lot:
+                TrigrammeRecherche.objects.bulk_create(lignes)
+                lignes = []
+        TrigrammeRecherche.objects.bulk_create(lignes)
+    return total
+
+
+@abonner(*CIBLES)
+def indexer_evenement(evenement):
+    """
+    Tient l'index Python à jour (sans objet avec pg_trgm, qui lit la table elle-même)
+    """
+    if not utilise_pg_trgm():
+        indexer(evenement.agregat, [int(evenement.agregat_id)])
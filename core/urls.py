@@ -6,5 +6,6 @@ app_name = 'core'
 
 urlpatterns = [
     path('', views.DashboardView.as_view(), name='dashboard'),
+    path('recherche/', views.RechercheApprocheeView.as_view(), name='recherche'),
     path('set-language/', SetLanguageView.as_view(), name='set_language'),
 ]
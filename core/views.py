@@ -1,5 +1,6 @@
 from django.shortcuts import render
-from django.views.generic import TemplateView
+from django.views.generic import TemplateView, View
+from django.http import JsonResponse
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db.models import Sum, Count
 from django.utils import timezone
@@ -7,9 +8,10 @@ from datetime import timedelta
 from django.utils.translation import gettext_lazy as _
 
 from produits.models import Produit, Categorie
-from stocks.models import MouvementStock
+from stocks.models import MouvementStock, AlerteStock
 from ventes.models import Vente
 from fournisseurs.models import Fournisseur
+from . import trigrammes
 
 
 class HomeView(TemplateView):
@@ -34,9 +36,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         # Produits en rupture de stock
         context['produits_rupture'] = Produit.objects.filter(
             is_active=True
-        ).extra(
-            where=["id IN (SELECT produit_id FROM stocks_mouvementstock WHERE is_active=True GROUP BY produit_id HAVING SUM(CASE WHEN type_mouvement='ENTREE' THEN quantite ELSE -quantite END) <= seuil_alerte)"]
-        )[:10]
+        ).with_stock().filter(en_rupture=True)[:10]
         
         # Ventes récentes
         context['ventes_recentes'] = Vente.objects.filter(
@@ -72,14 +72,45 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         
         # Les alertes de stock sont maintenant gérées par le context processor global
         # mais on garde la liste complète pour le dashboard
-        context['alertes_stock'] = []
-        for produit in Produit.objects.filter(is_active=True):
-            stock_actuel = produit.stock_actuel
-            if stock_actuel <= produit.seuil_alerte:
-                context['alertes_stock'].append({
-                    'produit': produit,
-                    'stock_actuel': stock_actuel,
-                    'seuil': produit.seuil_alerte
-                })
+        context['alertes_stock'] = AlerteStock.objects.select_related('produit')
         
         return context
+
+
+class RechercheApprocheeView(LoginRequiredMixin, View):
+    """
+    Recherche tolérante aux fautes de frappe (JSON) dans les produits, les
+    fournisseurs et les clients, classée par similarité. Paramètres : `q`
+    et `limite` (10 par défaut, 50 au plus).
+    """
+    LIMITE_MAX = 50
+
+    def get(self, request, *args, **kwargs):
+        texte = request.GET.get('q', '').strip()
+        try:
+            limite = min(max(int(request.GET.get('limite', 10)), 1), self.LIMITE_MAX)
+        except ValueError:
+            limite = 10
+
+        produits = trigrammes.rechercher(Produit.objects.filter(is_active=True), texte, limite)
+        fournisseurs = trigrammes.rechercher(Fournisseur.objects.filter(is_active=True), texte, limite)
+        # Un client apparaît sur plusieurs ventes : on garde sa meilleure similarité
+        clients = {}
+        for vente in trigrammes.rechercher(Vente.objects.filter(is_active=True), texte, limite * 3):
+            clients.setdefault(vente.client_nom, vente.similarite)
+
+        return JsonResponse({
+            'q': texte,
+            'produits': [
+                {'id': p.pk, 'code': p.code_produit, 'nom': p.nom, 'similarite': round(p.similarite, 3)}
+                for p in produits
+            ],
+            'fournisseurs': [
+                {'id': f.pk, 'nom': f.nom, 'similarite': round(f.similarite, 3)}
+                for f in fournisseurs
+            ],
+            'clients': [
+                {'nom': nom, 'similarite': round(similarite, 3)}
+                for nom, similarite in list(clients.items())[:limite]
+            ],
+        })
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from core import outbox
 from core.models import BaseModel
 
 
@@ -78,6 +79,29 @@ class Fournisseur(BaseModel):
     def __str__(self):
         return self.nom
 
+    def save(self, *args, **kwargs):
+        creation = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            outbox.publier(self, 'CREATION' if creation else 'MODIFICATION', self.donnees_evenement())
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            outbox.publier(self, 'SUPPRESSION', self.donnees_evenement(), pk=pk)
+        return result
+
+    def donnees_evenement(self):
+        """
+        État du fournisseur transmis aux abonnés de l'outbox
+        """
+        return {
+            'nom': self.nom,
+            'delai_livraison': self.delai_livraison,
+            'is_active': self.is_active,
+        }
+
     @property
     def adresse_complete(self):
         """
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Categorie, Produit
+from .models import Categorie, CodeBarre, HistoriquePrix, ImportCatalogue, Produit
 
 
 @admin.register(Categorie)
@@ -11,6 +11,12 @@ class CategorieAdmin(admin.ModelAdmin):
     ordering = ['nom']
 
 
+class CodeBarreInline(admin.TabularInline):
+    model = CodeBarre
+    fields = ['code', 'is_active']
+    extra = 0
+
+
 @admin.register(Produit)
 class ProduitAdmin(admin.ModelAdmin):
     list_display = [
@@ -21,7 +27,9 @@ class ProduitAdmin(admin.ModelAdmin):
     search_fields = ['code_produit', 'nom', 'description']
     list_editable = ['prix_achat', 'prix_vente', 'seuil_alerte', 'is_active']
     ordering = ['nom']
+    list_select_related = ['categorie', 'solde']
     readonly_fields = ['stock_actuel', 'est_en_rupture', 'marge_beneficiaire']
+    inlines = [CodeBarreInline]
     
     fieldsets = (
         ('Informations générales', {
@@ -37,3 +45,29 @@ class ProduitAdmin(admin.ModelAdmin):
             'fields': ('is_active',)
         })
     )
+
+
+@admin.register(ImportCatalogue)
+class ImportCatalogueAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'fichier', 'statut', 'lignes_traitees', 'lignes_total',
+        'produits_crees', 'produits_modifies', 'lignes_en_erreur', 'utilisateur', 'created_at'
+    ]
+    list_filter = ['statut', 'created_at']
+    readonly_fields = [
+        'statut', 'lignes_total', 'lignes_traitees', 'produits_crees', 'produits_modifies',
+        'lignes_en_erreur', 'rapport_erreurs', 'message', 'utilisateur', 'date_fin'
+    ]
+    ordering = ['-created_at']
+
+
+@admin.register(HistoriquePrix)
+class HistoriquePrixAdmin(admin.ModelAdmin):
+    list_display = [
+        'produit', 'prix_achat_avant', 'prix_achat_apres', 'prix_vente_avant',
+        'prix_vente_apres', 'motif', 'utilisateur', 'date'
+    ]
+    list_filter = ['date']
+    search_fields = ['produit__code_produit', 'produit__nom', 'motif']
+    list_select_related = ['produit', 'utilisateur']
+    ordering = ['-date', '-id']
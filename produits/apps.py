@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import post_migrate
+
+
+def installer_recherche(sender, using, **kwargs):
+    # Les reconstructions de table de SQLite suppriment les triggers de l'index
+    # FTS5 et les index créés hors du modèle
+    appliquees = MigrationRecorder(connections[using]).applied_migrations()
+    if ('produits', '0002_recherche_plein_texte') in appliquees:
+        from .recherche import installer
+        installer(using)
+    if ('produits', '0004_autocompletion') in appliquees:
+        from .autocompletion import installer_index
+        installer_index(connections[using])
 
 
 class ProduitsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "produits"
+
+    def ready(self):
+        post_migrate.connect(installer_recherche, sender=self)
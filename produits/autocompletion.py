@@ -0,0 +1,72 @@
+"""
+Autocomplétion des produits pour les formulaires de stock et de vente
+
+Recherche par préfixe (insensible à la casse) sur le code et sur le nom,
+par pages de `TAILLE_PAGE` produits triés par nom. Chaque page est gardée
+`AUTOCOMPLETE_CACHE_TTL` secondes dans le cache partagé : le stock affiché
+peut donc avoir quelques secondes de retard. Les index de préfixe sont
+créés par la migration produits.0004 et réinstallés après chaque migration
+(une reconstruction de table par SQLite les supprime).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+
+from .models import Produit
+
+TAILLE_PAGE = 20
+LONGUEUR_MAX = 100
+
+# Index de préfixe par base, sur l'expression évaluée par le filtre istartswith de Django
+# (mêmes définitions que la migration produits.0004, qui reste figée)
+INDEX_PREFIXE = {
+    'postgresql': 'CREATE INDEX IF NOT EXISTS {index} ON produits_produit (UPPER("{colonne}"::text) text_pattern_ops)',
+    'sqlite': 'CREATE INDEX IF NOT EXISTS {index} ON produits_produit ("{colonne}" COLLATE NOCASE)',
+}
+COLONNES_PREFIXE = [
+    ('code_produit', 'produit_code_prefixe_idx'),
+    ('nom', 'produit_nom_prefixe_idx'),
+]
+
+
+def rechercher(texte, page=1):
+    """
+    Page `page` des produits actifs dont le code ou le nom commence par `texte` :
+    {'resultats': [...], 'page': page, 'suivante': numéro de page ou None}
+    """
+    texte = (texte or '').strip()[:LONGUEUR_MAX]
+    cle = f"autocomplete:{page}:{texte.lower()}"
+    resultat = cache.get(cle)
+    if resultat is not None:
+        return resultat
+
+    queryset = Produit.objects.filter(is_active=True)
+    if texte:
+        queryset = queryset.filter(Q(code_produit__istartswith=texte) | Q(nom__istartswith=texte))
+    debut = (page - 1) * TAILLE_PAGE
+    # Une ligne de plus indique s'il existe une page suivante, sans COUNT
+    lignes = list(
+        queryset.order_by('nom', 'id').values(
+            'id', 'code_produit', 'nom', 'prix_vente', 'unite'
+        ).annotate(stock=Coalesce('solde__quantite', 0))[debut:debut + TAILLE_PAGE + 1]
+    )
+    resultat = {
+        'resultats': lignes[:TAILLE_PAGE],
+        'page': page,
+        'suivante': page + 1 if len(lignes) > TAILLE_PAGE else None,
+    }
+    cache.set(cle, resultat, settings.AUTOCOMPLETE_CACHE_TTL)
+    return resultat
+
+
+def installer_index(connection):
+    """
+    Crée les index de préfixe s'ils manquent
+    """
+    sql = INDEX_PREFIXE.get(connection.vendor)
+    if sql:
+        with connection.cursor() as cursor:
+            for colonne, index in COLONNES_PREFIXE:
+                cursor.execute(sql.format(index=index, colonne=colonne))
+
@@ -0,0 +1,415 @@
+"""
+Import en masse du catalogue de produits (CSV ou XLSX)
+
+Le fichier est lu en flux (csv.reader sur le fichier, openpyxl en lecture
+seule) et traité par lots de `IMPORT_CATALOGUE_TAILLE_LOT` lignes. Pour
+chaque lot : validation des lignes, résolution des catégories et des
+fournisseurs par leur nom dans des dictionnaires chargés une seule fois,
+chargement des produits existants en une requête, puis création ou mise à
+jour de tous les produits du lot en une requête (`bulk_create` avec
+`update_conflicts` sur `code_produit`). Chaque lot est validé dans sa
+propre transaction et l'avancement est enregistré après chaque lot.
+
+Colonnes reconnues (ligne d'en-tête obligatoire, casse et accents
+indifférents) : code_produit, nom, description, categorie, prix_achat,
+prix_vente, unite, seuil_alerte, fournisseur. Une colonne absente ou une
+cellule vide laisse la valeur d'un produit existant inchangée ; un nouveau
+produit doit avoir un nom, une catégorie et ses deux prix. Les catégories
+inconnues sont créées, un fournisseur inconnu rejette la ligne. Les lignes
+rejetées sont listées dans un rapport CSV attaché à l'import.
+
+bulk_create ne passe pas par Produit.save() : les alertes de stock, la
+valorisation par catégorie, l'outbox et le cache du scan sont mis à jour ici.
+"""
+import csv
+import io
+import logging
+import os
+import re
+import unicodedata
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import outbox
+from fournisseurs.models import Fournisseur
+from . import scan
+from .models import Categorie, ImportCatalogue, Produit
+
+logger = logging.getLogger(__name__)
+
+COLONNES = [
+    'code_produit', 'nom', 'description', 'categorie', 'prix_achat', 'prix_vente',
+    'unite', 'seuil_alerte', 'fournisseur',
+]
+# En-têtes usuels (normalisés) -> colonne
+ALIAS = {
+    'code': 'code_produit',
+    'reference': 'code_produit',
+    'ref': 'code_produit',
+    'designation': 'nom',
+    'libelle': 'nom',
+    'nom_produit': 'nom',
+    'categorie_produit': 'categorie',
+    'prix_d_achat': 'prix_achat',
+    'prix_de_vente': 'prix_vente',
+    'prix': 'prix_vente',
+    'unite_de_mesure': 'unite',
+    'seuil': 'seuil_alerte',
+    'seuil_d_alerte': 'seuil_alerte',
+    'fournisseur_principal': 'fournisseur',
+}
+# Champs du produit écrits par l'import (mis à jour en cas de conflit sur le code)
+CHAMPS = [
+    'nom', 'description', 'categorie_id', 'prix_achat', 'prix_vente', 'unite',
+    'seuil_alerte', 'fournisseur_principal_id',
+]
+OBLIGATOIRES = {
+    'nom': 'nom',
+    'categorie_id': 'catégorie',
+    'prix_achat': "prix d'achat",
+    'prix_vente': 'prix de vente',
+}
+PRIX_MAX = Decimal('99999999.99')
+
+
+class ImportErreur(Exception):
+    """
+    Fichier de catalogue illisible ou sans colonne code_produit
+    """
+
+
+def _normaliser(entete):
+    texte = unicodedata.normalize('NFKD', str(entete or '')).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '_', texte.lower()).strip('_')
+
+
+def _cle(nom):
+    return ' '.join(str(nom).split()).casefold()
+
+
+def _lire_csv(fichier):
+    # Nombre de lignes compté sur les octets : approximatif si des cellules contiennent des retours à la ligne
+    total = sum(bloc.count(b'\n') for bloc in iter(lambda: fichier.read(1 << 20), b''))
+    fichier.seek(0)
+    debut = fichier.read(1 << 16)
+    fichier.seek(0)
+    try:
+        debut[:-4].decode('utf-8')
+        encodage = 'utf-8-sig'
+    except UnicodeDecodeError:
+        # Enregistrement « CSV » d'Excel sous Windows
+        encodage = 'cp1252'
+    entete = debut.split(b'\n', 1)[0].decode(encodage, errors='ignore')
+    separateur = next((sep for sep in ';\t,' if sep in entete), ';')
+    flux = io.TextIOWrapper(fichier, encoding=encodage, newline='')
+    return total, csv.reader(flux, delimiter=separateur)
+
+
+def _lire_xlsx(fichier):
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportErreur("L'import XLSX nécessite le paquet openpyxl (ou enregistrez le fichier en CSV)")
+    try:
+        classeur = openpyxl.load_workbook(fichier, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportErreur(f"Classeur XLSX illisible : {e}")
+    feuille = classeur.worksheets[0]
+
+    def rangees():
+        try:
+            for rangee in feuille.iter_rows(values_only=True):
+                yield ['' if valeur is None else valeur for valeur in rangee]
+        finally:
+            classeur.close()
+
+    return feuille.max_row or 0, rangees()
+
+
+def lire(fichier, nom):
+    """
+    Ouvre un catalogue : retourne (nombre de lignes de données estimé,
+    colonnes présentes, itérateur de (numéro de ligne, {colonne: valeur}))
+    """
+    extension = os.path.splitext(nom)[1].lower()
+    if extension == '.xlsx':
+        total, rangees = _lire_xlsx(fichier)
+    elif extension in ('.csv', '.txt'):
+        total, rangees = _lire_csv(fichier)
+    else:
+        raise ImportErreur("Format non pris en charge : fichier CSV ou XLSX attendu")
+    try:
+        entete = next(rangees)
+    except StopIteration:
+        raise ImportErreur("Le fichier est vide")
+    except UnicodeDecodeError:
+        raise ImportErreur("Encodage non reconnu : enregistrez le fichier en UTF-8")
+    colonnes = [ALIAS.get(nom_colonne, nom_colonne) for nom_colonne in map(_normaliser, entete)]
+    if 'code_produit' not in colonnes:
+        raise ImportErreur("Colonne code_produit introuvable dans la ligne d'en-tête")
+
+    def lignes():
+        try:
+            for numero, rangee in enumerate(rangees, start=2):
+                if not any(str(valeur).strip() for valeur in rangee):
+                    continue
+                yield numero, {
+                    colonne: valeur for colonne, valeur in zip(colonnes, rangee) if colonne in COLONNES
+                }
+        except UnicodeDecodeError:
+            raise ImportErreur("Encodage non reconnu : enregistrez le fichier en UTF-8")
+        except csv.Error as e:
+            raise ImportErreur(f"CSV invalide : {e}")
+
+    return max(total - 1, 0), set(colonnes) & set(COLONNES), lignes()
+
+
+def _texte(valeur):
+    if isinstance(valeur, float) and valeur.is_integer():
+        # Code numérique lu comme nombre dans un classeur
+        valeur = int(valeur)
+    return str(valeur).strip()
+
+
+def _prix(valeur, libelle):
+    texte = re.sub(r'\s', '', _texte(valeur)).replace(',', '.')
+    try:
+        montant = Decimal(texte)
+    except InvalidOperation:
+        raise ValueError(f"{libelle} invalide « {valeur} »")
+    if not montant.is_finite() or montant < 0:
+        raise ValueError(f"{libelle} invalide « {valeur} »")
+    if montant > PRIX_MAX:
+        raise ValueError(f"{libelle} trop élevé « {valeur} »")
+    return montant.quantize(Decimal('0.01'))
+
+
+class Referentiel:
+    """
+    Catégories, fournisseurs et unités indexés par nom, chargés une fois par import
+    """
+
+    def __init__(self):
+        self.categories = {}
+        for categorie_id, nom in Categorie.objects.filter(is_active=True).order_by('id').values_list('id', 'nom'):
+            self.categories.setdefault(_cle(nom), categorie_id)
+        self.fournisseurs = {}
+        for fournisseur_id, nom in Fournisseur.objects.filter(is_active=True).order_by('id').values_list('id', 'nom'):
+            self.fournisseurs.setdefault(_cle(nom), fournisseur_id)
+        self.unites = {}
+        for code, libelle in Produit.CATEGORIES_UNITE:
+            self.unites[_cle(code)] = code
+            self.unites[_cle(libelle)] = code
+
+    def creer_categories(self, noms):
+        """
+        Crée les catégories inconnues (noms tels qu'écrits dans le fichier)
+        """
+        nouvelles = {}
+        for nom in noms:
+            nouvelles.setdefault(_cle(nom), nom)
+        Categorie.objects.bulk_create([Categorie(nom=nom) for nom in nouvelles.values()])
+        for categorie_id, nom in Categorie.objects.filter(
+            nom__in=nouvelles.values(), is_active=True
+        ).order_by('id').values_list('id', 'nom'):
+            self.categories.setdefault(_cle(nom), categorie_id)
+
+
+def valider(brutes, referentiel):
+    """
+    Valeurs d'une ligne prêtes pour le modèle (cellules vides omises) ;
+    le nom d'une catégorie inconnue est laissé dans 'categorie'.
+    Lève ValueError avec la raison du rejet.
+    """
+    valeurs = {}
+    code = _texte(brutes.get('code_produit', ''))
+    if not code:
+        raise ValueError("Code produit manquant")
+    if len(code) > 50:
+        raise ValueError("Code produit trop long (50 caractères au plus)")
+    valeurs['code_produit'] = code
+    cellules = {colonne: _texte(valeur) for colonne, valeur in brutes.items() if _texte(valeur)}
+
+    if 'nom' in cellules:
+        if len(cellules['nom']) > 200:
+            raise ValueError("Nom trop long (200 caractères au plus)")
+        valeurs['nom'] = cellules['nom']
+    if 'description' in cellules:
+        valeurs['description'] = cellules['description']
+    for colonne, libelle in (('prix_achat', "Prix d'achat"), ('prix_vente', 'Prix de vente')):
+        if colonne in cellules:
+            valeurs[colonne] = _prix(brutes[colonne], libelle)
+    if 'unite' in cellules:
+        unite = referentiel.unites.get(_cle(cellules['unite']))
+        if unite is None:
+            raise ValueError(f"Unité inconnue « {cellules['unite']} »")
+        valeurs['unite'] = unite
+    if 'seuil_alerte' in cellules:
+        try:
+            seuil = Decimal(cellules['seuil_alerte'].replace(',', '.'))
+        except InvalidOperation:
+            seuil = None
+        if seuil is None or not seuil.is_finite() or seuil < 0 or seuil != seuil.to_integral_value():
+            raise ValueError(f"Seuil d'alerte invalide « {cellules['seuil_alerte']} »")
+        valeurs['seuil_alerte'] = int(seuil)
+    if 'fournisseur' in cellules:
+        fournisseur_id = referentiel.fournisseurs.get(_cle(cellules['fournisseur']))
+        if fournisseur_id is None:
+            raise ValueError(f"Fournisseur inconnu « {cellules['fournisseur']} »")
+        valeurs['fournisseur_principal_id'] = fournisseur_id
+    if 'categorie' in cellules:
+        if len(cellules['categorie']) > 100:
+            raise ValueError("Nom de catégorie trop long (100 caractères au plus)")
+        categorie_id = referentiel.categories.get(_cle(cellules['categorie']))
+        if categorie_id is None:
+            valeurs['categorie'] = cellules['categorie']
+        else:
+            valeurs['categorie_id'] = categorie_id
+    return valeurs
+
+
+def traiter_lot(lot, referentiel, erreurs):
+    """
+    Crée ou met à jour les produits d'un lot de lignes [(numéro, {colonne: valeur})] ;
+    les lignes rejetées sont ajoutées à `erreurs` [(numéro, code, raison)].
+    Retourne (produits créés, produits modifiés).
+    """
+    retenues = {}
+    for numero, brutes in lot:
+        try:
+            valeurs = valider(brutes, referentiel)
+        except ValueError as e:
+            erreurs.append((numero, _texte(brutes.get('code_produit', '')), str(e)))
+            continue
+        code = valeurs['code_produit']
+        if code in retenues:
+            # Code répété dans le fichier : la dernière ligne l'emporte
+            erreurs.append((retenues[code][0], code, f"Ignorée : code repris à la ligne {numero}"))
+        retenues[code] = (numero, valeurs)
+
+    inconnues = [valeurs['categorie'] for _, valeurs in retenues.values() if 'categorie' in valeurs]
+    if inconnues:
+        referentiel.creer_categories(inconnues)
+        for _, valeurs in retenues.values():
+            if 'categorie' in valeurs:
+                valeurs['categorie_id'] = referentiel.categories[_cle(valeurs.pop('categorie'))]
+
+    existants = {
+        produit['code_produit']: produit
+        for produit in Produit.objects.filter(code_produit__in=retenues).order_by().values(
+            'id', 'code_produit', 'is_active', *CHAMPS
+        )
+    }
+    produits = []
+    for code, (numero, valeurs) in retenues.items():
+        existant = existants.get(code)
+        if existant is None:
+            manquants = [libelle for champ, libelle in OBLIGATOIRES.items() if champ not in valeurs]
+            if manquants:
+                erreurs.append((numero, code, f"Nouveau produit sans {', '.join(manquants)}"))
+                continue
+            produits.append(Produit(**valeurs))
+        else:
+            donnees = {champ: existant[champ] for champ in CHAMPS}
+            donnees.update(valeurs)
+            produits.append(Produit(is_active=existant['is_active'], **donnees))
+    if not produits:
+        return 0, 0
+
+    Produit.objects.bulk_create(
+        produits,
+        update_conflicts=True,
+        unique_fields=['code_produit'],
+        update_fields=CHAMPS + ['updated_at'],
+    )
+    # Toutes les bases ne renvoient pas les identifiants d'un upsert : relus par code
+    ids = dict(Produit.objects.filter(
+        code_produit__in=[produit.code_produit for produit in produits]
+    ).order_by().values_list('code_produit', 'id'))
+    evenements = []
+    for produit in produits:
+        produit.pk = ids[produit.code_produit]
+        produit._state.adding = False
+        existant = existants.get(produit.code_produit)
+        evenements.append((produit, 'MODIFICATION' if existant else 'CREATION', produit.donnees_evenement()))
+
+    from stocks import valorisation
+    from stocks.models import AlerteStock
+    AlerteStock.synchroniser([produit.pk for produit in produits])
+    for produit in produits:
+        existant = existants.get(produit.code_produit)
+        if existant and existant['categorie_id'] != produit.categorie_id:
+            valorisation.changer_categorie(produit.pk, existant['categorie_id'], produit.categorie_id)
+    outbox.publier_lot(evenements)
+    scan.invalider_apres_commit([existant['id'] for existant in existants.values()])
+    modifies = sum(1 for produit in produits if produit.code_produit in existants)
+    return len(produits) - modifies, modifies
+
+
+def _lots(lignes, taille):
+    lot = []
+    for ligne in lignes:
+        lot.append(ligne)
+        if len(lot) >= taille:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def _rapport(erreurs):
+    tampon = io.StringIO()
+    ecriture = csv.writer(tampon, delimiter=';')
+    ecriture.writerow(['ligne', 'code_produit', 'erreur'])
+    ecriture.writerows(sorted(erreurs))
+    return ContentFile(tampon.getvalue().encode('utf-8-sig'))
+
+
+def importer(import_catalogue, taille_lot=None):
+    """
+    Traite un import de catalogue. Les lots déjà validés restent acquis si
+    le traitement est interrompu ; l'import passe alors en échec.
+    """
+    taille_lot = taille_lot or settings.IMPORT_CATALOGUE_TAILLE_LOT
+    suivi = ImportCatalogue.objects.filter(pk=import_catalogue.pk)
+    suivi.update(statut='EN_COURS', lignes_traitees=0, produits_crees=0, produits_modifies=0, lignes_en_erreur=0)
+    erreurs = []
+    statut, message = 'TERMINE', ''
+    try:
+        with import_catalogue.fichier.open('rb') as fichier:
+            total, _, lignes = lire(fichier, import_catalogue.fichier.name)
+            suivi.update(lignes_total=total)
+            referentiel = Referentiel()
+            for lot in _lots(lignes, taille_lot):
+                deja_en_erreur = len(erreurs)
+                with transaction.atomic():
+                    crees, modifies = traiter_lot(lot, referentiel, erreurs)
+                rejetees = len(erreurs) - deja_en_erreur
+                suivi.update(
+                    lignes_traitees=F('lignes_traitees') + len(lot),
+                    produits_crees=F('produits_crees') + crees,
+                    produits_modifies=F('produits_modifies') + modifies,
+                    lignes_en_erreur=F('lignes_en_erreur') + rejetees,
+                )
+    except ImportErreur as e:
+        statut, message = 'ECHEC', str(e)
+    except Exception as e:
+        logger.exception("Import de catalogue %s interrompu", import_catalogue.pk)
+        statut, message = 'ECHEC', f"Import interrompu : {e}"
+
+    import_catalogue.refresh_from_db()
+    if erreurs:
+        import_catalogue.rapport_erreurs.save(f"erreurs_import_{import_catalogue.pk}.csv", _rapport(erreurs), save=False)
+    import_catalogue.statut = statut
+    import_catalogue.message = message
+    import_catalogue.date_fin = timezone.now()
+    if statut == 'TERMINE':
+        # Le total estimé peut différer (lignes vides, retours à la ligne dans les cellules)
+        import_catalogue.lignes_total = import_catalogue.lignes_traitees
+    import_catalogue.save(update_fields=['rapport_erreurs', 'statut', 'message', 'date_fin', 'lignes_total', 'updated_at'])
+    return import_catalogue
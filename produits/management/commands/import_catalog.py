@@ -0,0 +1,36 @@
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from produits import importation
+from produits.models import ImportCatalogue
+
+
+class Command(BaseCommand):
+    help = "Importe un catalogue de produits (CSV ou XLSX) sans passer par Celery"
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Chemin du fichier CSV ou XLSX")
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=None,
+            help="Lignes par transaction (IMPORT_CATALOGUE_TAILLE_LOT par défaut)",
+        )
+
+    def handle(self, *args, **options):
+        chemin = options['fichier']
+        if not os.path.isfile(chemin):
+            raise CommandError(f"Fichier introuvable : {chemin}")
+        with open(chemin, 'rb') as fichier:
+            import_catalogue = ImportCatalogue.objects.create(fichier=File(fichier, name=os.path.basename(chemin)))
+        resultat = importation.importer(import_catalogue, options['taille_lot'])
+        if resultat.statut == 'ECHEC':
+            raise CommandError(resultat.message)
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultat.produits_crees} produits créés, {resultat.produits_modifies} modifiés, "
+            f"{resultat.lignes_en_erreur} lignes en erreur"
+        ))
+        if resultat.rapport_erreurs:
+            self.stdout.write(f"Rapport d'erreurs : {resultat.rapport_erreurs.name}")
@@ -0,0 +1,89 @@
+from django.db import migrations
+
+# Définitions figées à la création de l'index : produits.recherche peut évoluer
+# (et répare l'index après chaque migrate), cette migration non.
+VECTEUR_POSTGRES = (
+    "setweight(to_tsvector('french'::regconfig, coalesce(nom, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(nom, '') || ' ' || coalesce(code_produit, '')), 'A') || "
+    "setweight(to_tsvector('french'::regconfig, coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'B')"
+)
+
+INSTALLER_POSTGRES = [
+    f"ALTER TABLE produits_produit ADD COLUMN IF NOT EXISTS recherche tsvector "
+    f"GENERATED ALWAYS AS ({VECTEUR_POSTGRES}) STORED",
+    "CREATE INDEX IF NOT EXISTS produit_recherche_gin_idx ON produits_produit USING gin (recherche)",
+]
+DESINSTALLER_POSTGRES = [
+    "ALTER TABLE produits_produit DROP COLUMN IF EXISTS recherche",
+]
+
+INSTALLER_SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS produits_produit_fts USING fts5("
+    "nom, code_produit, description, content='produits_produit', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "INSERT INTO produits_produit_fts(produits_produit_fts, rank) VALUES ('rank', 'bm25(10.0, 10.0, 1.0)')",
+    """
+    CREATE TRIGGER IF NOT EXISTS produits_produit_fts_ai AFTER INSERT ON produits_produit BEGIN
+        INSERT INTO produits_produit_fts(rowid, nom, code_produit, description)
+        VALUES (new.id, new.nom, new.code_produit, new.description);
+    END""",
+    """
+    CREATE TRIGGER IF NOT EXISTS produits_produit_fts_ad AFTER DELETE ON produits_produit BEGIN
+        INSERT INTO produits_produit_fts(produits_produit_fts, rowid, nom, code_produit, description)
+        VALUES ('delete', old.id, old.nom, old.code_produit, old.description);
+    END""",
+    """
+    CREATE TRIGGER IF NOT EXISTS produits_produit_fts_au
+    AFTER UPDATE OF nom, code_produit, description ON produits_produit BEGIN
+        INSERT INTO produits_produit_fts(produits_produit_fts, rowid, nom, code_produit, description)
+        VALUES ('delete', old.id, old.nom, old.code_produit, old.description);
+        INSERT INTO produits_produit_fts(rowid, nom, code_produit, description)
+        VALUES (new.id, new.nom, new.code_produit, new.description);
+    END""",
+    "INSERT INTO produits_produit_fts(produits_produit_fts) VALUES ('rebuild')",
+]
+DESINSTALLER_SQLITE = [
+    "DROP TRIGGER IF EXISTS produits_produit_fts_ai",
+    "DROP TRIGGER IF EXISTS produits_produit_fts_ad",
+    "DROP TRIGGER IF EXISTS produits_produit_fts_au",
+    "DROP TABLE IF EXISTS produits_produit_fts",
+]
+
+
+def fts5_disponible(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM pragma_module_list WHERE name = 'fts5'")
+        return bool(cursor.fetchone()[0])
+
+
+def _executer(schema_editor, installation):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        requetes = INSTALLER_POSTGRES if installation else DESINSTALLER_POSTGRES
+    elif connection.vendor == "sqlite" and fts5_disponible(connection):
+        requetes = INSTALLER_SQLITE if installation else DESINSTALLER_SQLITE
+    else:
+        # Autres bases : recherche par icontains, sans index
+        return
+    for sql in requetes:
+        schema_editor.execute(sql)
+
+
+def installer(apps, schema_editor):
+    _executer(schema_editor, installation=True)
+
+
+def desinstaller(apps, schema_editor):
+    _executer(schema_editor, installation=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("produits", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(installer, desinstaller),
+    ]
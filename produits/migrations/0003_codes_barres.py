@@ -0,0 +1,76 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("produits", "0002_recherche_plein_texte"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CodeBarre",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Date et heure de création de l'enregistrement",
+                        verbose_name="Date de création",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="Date et heure de dernière modification",
+                        verbose_name="Date de modification",
+                    ),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(
+                        default=True,
+                        help_text="Indique si l'enregistrement est actif",
+                        verbose_name="Actif",
+                    ),
+                ),
+                (
+                    "code",
+                    models.CharField(
+                        help_text="Code lu par le scanner",
+                        max_length=50,
+                        unique=True,
+                        verbose_name="Code-barres",
+                    ),
+                ),
+                (
+                    "produit",
+                    models.ForeignKey(
+                        help_text="Produit désigné par ce code",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="codes_barres",
+                        to="produits.produit",
+                        verbose_name="Produit",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Code-barres",
+                "verbose_name_plural": "Codes-barres",
+                "ordering": ["code"],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:12
+
+from django.db import migrations, models
+
+# Index de préfixe par base, sur l'expression évaluée par le filtre istartswith de Django
+INDEX_PREFIXE = {
+    "postgresql": 'CREATE INDEX IF NOT EXISTS {index} ON produits_produit (UPPER("{colonne}"::text) text_pattern_ops)',
+    "sqlite": 'CREATE INDEX IF NOT EXISTS {index} ON produits_produit ("{colonne}" COLLATE NOCASE)',
+}
+COLONNES_PREFIXE = [
+    ("code_produit", "produit_code_prefixe_idx"),
+    ("nom", "produit_nom_prefixe_idx"),
+]
+
+
+def installer(apps, schema_editor):
+    sql = INDEX_PREFIXE.get(schema_editor.connection.vendor)
+    if sql:
+        for colonne, index in COLONNES_PREFIXE:
+            schema_editor.execute(sql.format(index=index, colonne=colonne))
+
+
+def desinstaller(apps, schema_editor):
+    if schema_editor.connection.vendor in INDEX_PREFIXE:
+        for _, index in COLONNES_PREFIXE:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fournisseurs", "0001_initial"),
+        ("produits", "0003_codes_barres"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="produit",
+            index=models.Index(fields=["nom", "id"], name="produit_nom_id_idx"),
+        ),
+        migrations.RunPython(installer, desinstaller),
+    ]
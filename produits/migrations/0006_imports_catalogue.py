@@ -0,0 +1,156 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("produits", "0005_derives_images"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportCatalogue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Date et heure de création de l'enregistrement",
+                        verbose_name="Date de création",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="Date et heure de dernière modification",
+                        verbose_name="Date de modification",
+                    ),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(
+                        default=True,
+                        help_text="Indique si l'enregistrement est actif",
+                        verbose_name="Actif",
+                    ),
+                ),
+                (
+                    "fichier",
+                    models.FileField(
+                        help_text="Catalogue importé (CSV ou XLSX)",
+                        upload_to="imports/catalogue/",
+                        verbose_name="Fichier",
+                    ),
+                ),
+                (
+                    "statut",
+                    models.CharField(
+                        choices=[
+                            ("EN_ATTENTE", "En attente"),
+                            ("EN_COURS", "En cours"),
+                            ("TERMINE", "Terminé"),
+                            ("ECHEC", "Échec"),
+                        ],
+                        default="EN_ATTENTE",
+                        help_text="Avancement de l'import",
+                        max_length=10,
+                        verbose_name="Statut",
+                    ),
+                ),
+                (
+                    "lignes_total",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Nombre de lignes de données, connu au début du traitement",
+                        verbose_name="Lignes du fichier",
+                    ),
+                ),
+                (
+                    "lignes_traitees",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Lignes lues et validées jusqu'ici",
+                        verbose_name="Lignes traitées",
+                    ),
+                ),
+                (
+                    "produits_crees",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Produits créés"
+                    ),
+                ),
+                (
+                    "produits_modifies",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Produits modifiés"
+                    ),
+                ),
+                (
+                    "lignes_en_erreur",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Lignes ignorées, détaillées dans le rapport d'erreurs",
+                        verbose_name="Lignes en erreur",
+                    ),
+                ),
+                (
+                    "rapport_erreurs",
+                    models.FileField(
+                        blank=True,
+                        help_text="CSV des lignes ignorées et de la raison du rejet",
+                        upload_to="imports/rapports/",
+                        verbose_name="Rapport d'erreurs",
+                    ),
+                ),
+                (
+                    "message",
+                    models.TextField(
+                        blank=True,
+                        help_text="Erreur ayant interrompu l'import",
+                        verbose_name="Message",
+                    ),
+                ),
+                (
+                    "date_fin",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Fin du traitement",
+                        null=True,
+                        verbose_name="Date de fin",
+                    ),
+                ),
+                (
+                    "utilisateur",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Utilisateur ayant lancé l'import",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="imports_catalogue",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Utilisateur",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Import de catalogue",
+                "verbose_name_plural": "Imports de catalogue",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("produits", "0006_imports_catalogue"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HistoriquePrix",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "prix_achat_avant",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=10,
+                        verbose_name="Prix d'achat avant",
+                    ),
+                ),
+                (
+                    "prix_achat_apres",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=10,
+                        verbose_name="Prix d'achat après",
+                    ),
+                ),
+                (
+                    "prix_vente_avant",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=10,
+                        verbose_name="Prix de vente avant",
+                    ),
+                ),
+                (
+                    "prix_vente_apres",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=10,
+                        verbose_name="Prix de vente après",
+                    ),
+                ),
+                (
+                    "motif",
+                    models.CharField(
+                        blank=True,
+                        help_text="Raison de la révision (hausse fournisseur, promotion...) et règle appliquée",
+                        max_length=200,
+                        verbose_name="Motif",
+                    ),
+                ),
+                (
+                    "date",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Date de la révision",
+                        verbose_name="Date",
+                    ),
+                ),
+                (
+                    "produit",
+                    models.ForeignKey(
+                        help_text="Produit dont le prix a changé",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="historique_prix",
+                        to="produits.produit",
+                        verbose_name="Produit",
+                    ),
+                ),
+                (
+                    "utilisateur",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Utilisateur ayant révisé les prix",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="revisions_prix",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Utilisateur",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Historique de prix",
+                "verbose_name_plural": "Historique des prix",
+                "ordering": ["-date", "-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["produit", "-date"], name="historique_prix_produit_idx"
+                    )
+                ],
+            },
+        ),
+    ]
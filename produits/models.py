@@ -1,5 +1,9 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from core import images, outbox
 from core.models import BaseModel
+from . import scan
 
 
 class Categorie(BaseModel):
@@ -32,6 +36,113 @@ class Categorie(BaseModel):
     def __str__(self):
         return self.nom
 
+    @property
+    def valeur_stock(self):
+        """
+        Retourne la valeur du stock de la catégorie au coût moyen pondéré
+        """
+        from stocks.models import ValorisationCategorie
+        try:
+            return self.valorisation.valeur_cmp
+        except ValorisationCategorie.DoesNotExist:
+            return 0
+
+
+class ProduitQuerySet(models.QuerySet):
+    """
+    QuerySet des produits avec annotations de stock et recherche plein texte
+    """
+
+    def rechercher(self, texte):
+        """
+        Filtre les produits par recherche plein texte (nom, code, description)
+        et annote `pertinence` ; voir produits.recherche
+        """
+        from .recherche import rechercher
+        return rechercher(self, texte)
+
+    def with_stock(self, depuis_journal=False):
+        """
+        Annote chaque produit avec `stock`, `en_rupture` et `ecart_seuil`
+        en une seule requête. Par défaut le stock est lu dans le solde
+        matérialisé ; avec `depuis_journal=True` il est recalculé par une
+        somme conditionnelle sur les mouvements actifs.
+        """
+        if depuis_journal:
+            stock = Coalesce(
+                models.Sum(
+                    models.Case(
+                        models.When(
+                            mouvements_stock__type_mouvement='ENTREE',
+                            then=models.F('mouvements_stock__quantite')
+                        ),
+                        models.When(
+                            mouvements_stock__type_mouvement='SORTIE',
+                            then=-models.F('mouvements_stock__quantite')
+                        ),
+                        default=0,
+                        output_field=models.IntegerField(),
+                    ),
+                    filter=models.Q(mouvements_stock__is_active=True),
+                ),
+                0,
+            )
+        else:
+            stock = Coalesce(models.F('solde__quantite'), 0)
+        return self.annotate(stock=stock).annotate(
+            en_rupture=models.ExpressionWrapper(
+                models.Q(stock__lte=models.F('seuil_alerte')),
+                output_field=models.BooleanField(),
+            ),
+            ecart_seuil=models.ExpressionWrapper(
+                models.F('seuil_alerte') - models.F('stock'),
+                output_field=models.IntegerField(),
+            ),
+        )
+
+    def with_stock_at(self, date):
+        """
+        Annote chaque produit avec `stock_date`, le stock à la clôture du
+        jour `date`, à partir de la dernière clôture enregistrée et des
+        seuls mouvements postérieurs à celle-ci (`debut_mouvements`).
+        """
+        import datetime
+        from stocks.models import ClotureStock, MouvementStock
+
+        clotures = ClotureStock.objects.filter(
+            produit=models.OuterRef('pk'), date__lte=date
+        ).order_by('-date')
+        # Bornes [fin de la clôture, fin du jour demandé[ sur la colonne elle-même (index)
+        mouvements = MouvementStock.objects.filter(
+            produit=models.OuterRef('pk'),
+            is_active=True,
+            date_mouvement__gte=models.OuterRef('debut_mouvements'),
+            date_mouvement__lt=ClotureStock.fin_de(date),
+        ).values('produit').annotate(
+            total=models.Sum(models.Case(
+                models.When(type_mouvement='ENTREE', then=models.F('quantite')),
+                models.When(type_mouvement='SORTIE', then=-models.F('quantite')),
+                default=0,
+                output_field=models.IntegerField(),
+            ))
+        ).values('total')
+        return self.annotate(
+            date_cloture=Coalesce(
+                models.Subquery(clotures.values('date')[:1]),
+                models.Value(datetime.date.min),
+            ),
+            debut_mouvements=Coalesce(
+                models.Subquery(clotures.values('fin_journee')[:1]),
+                models.Value(
+                    datetime.datetime.min.replace(tzinfo=datetime.timezone.utc),
+                    output_field=models.DateTimeField(),
+                ),
+            ),
+        ).annotate(
+            stock_date=Coalesce(models.Subquery(clotures.values('quantite')[:1]), 0)
+            + Coalesce(models.Subquery(mouvements), 0),
+        )
+
 
 class Produit(BaseModel):
     """
@@ -103,6 +214,13 @@ class Produit(BaseModel):
         verbose_name="Image",
         help_text="Image du produit"
     )
+    image_derives = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Dérivés de l'image",
+        help_text="Miniatures générées en arrière-plan (voir core.images)"
+    )
     fournisseur_principal = models.ForeignKey(
         'fournisseurs.Fournisseur',
         on_delete=models.SET_NULL,
@@ -113,36 +231,116 @@ class Produit(BaseModel):
         help_text="Fournisseur principal du produit"
     )
 
+    objects = ProduitQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Produit"
         verbose_name_plural = "Produits"
         ordering = ['nom']
+        indexes = [
+            # Tri par nom de la liste et de l'autocomplétion
+            models.Index(fields=['nom', 'id'], name='produit_nom_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.code_produit} - {self.nom}"
 
+    def save(self, *args, **kwargs):
+        ancienne_categorie_id = None
+        if self.pk and (not kwargs.get('update_fields') or 'categorie' in kwargs['update_fields']):
+            ancienne_categorie_id = Produit.objects.filter(pk=self.pk).values_list(
+                'categorie_id', flat=True
+            ).first()
+        creation = self._state.adding
+        nouvelle_image = images.preparer(self, 'image')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if nouvelle_image:
+                images.planifier(self, 'image')
+            # Le seuil ou le statut du produit peut changer son alerte de stock
+            from stocks.models import AlerteStock
+            AlerteStock.synchroniser([self.pk])
+            # La valeur du stock suit le produit dans sa nouvelle catégorie
+            if ancienne_categorie_id and ancienne_categorie_id != self.categorie_id:
+                from stocks import valorisation
+                valorisation.changer_categorie(self.pk, ancienne_categorie_id, self.categorie_id)
+            outbox.publier(self, 'CREATION' if creation else 'MODIFICATION', self.donnees_evenement())
+            scan.invalider_apres_commit([self.pk])
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            outbox.publier(self, 'SUPPRESSION', self.donnees_evenement(), pk=pk)
+            scan.invalider_apres_commit([pk])
+        return result
+
+    def donnees_evenement(self):
+        """
+        État du produit transmis aux abonnés de l'outbox
+        """
+        return {
+            'code_produit': self.code_produit,
+            'nom': self.nom,
+            'categorie_id': self.categorie_id,
+            'prix_achat': self.prix_achat,
+            'prix_vente': self.prix_vente,
+            'seuil_alerte': self.seuil_alerte,
+            'is_active': self.is_active,
+        }
+
     @property
     def stock_actuel(self):
         """
-        Retourne le stock actuel du produit
+        Retourne le stock actuel du produit à partir de son solde matérialisé
         """
-        from stocks.models import MouvementStock
-        mouvements = MouvementStock.objects.filter(produit=self, is_active=True)
-        stock_entree = mouvements.filter(type_mouvement='ENTREE').aggregate(
-            total=models.Sum('quantite')
-        )['total'] or 0
-        stock_sortie = mouvements.filter(type_mouvement='SORTIE').aggregate(
-            total=models.Sum('quantite')
-        )['total'] or 0
-        return stock_entree - stock_sortie
+        if 'stock' in self.__dict__:
+            return self.stock
+        from stocks.models import SoldeStock
+        try:
+            return self.solde.quantite
+        except SoldeStock.DoesNotExist:
+            return 0
+
+    def stock_at(self, date):
+        """
+        Retourne le stock du produit à la clôture du jour donné
+        """
+        return Produit.objects.filter(pk=self.pk).with_stock_at(date).values_list(
+            'stock_date', flat=True
+        ).get()
 
     @property
     def est_en_rupture(self):
         """
         Vérifie si le produit est en rupture de stock
         """
+        if 'en_rupture' in self.__dict__:
+            return self.en_rupture
         return self.stock_actuel <= self.seuil_alerte
 
+    @property
+    def valeur_stock(self):
+        """
+        Retourne la valeur du stock au coût moyen pondéré
+        """
+        from stocks.models import SoldeStock
+        try:
+            return self.solde.valeur_cmp
+        except SoldeStock.DoesNotExist:
+            return 0
+
+    @property
+    def valeur_stock_fifo(self):
+        """
+        Retourne la valeur du stock selon les couches FIFO
+        """
+        from stocks.models import SoldeStock
+        try:
+            return self.solde.valeur_fifo
+        except SoldeStock.DoesNotExist:
+            return 0
+
     @property
     def marge_beneficiaire(self):
         """
@@ -150,4 +348,216 @@ class Produit(BaseModel):
         """
         if self.prix_achat > 0:
             return ((self.prix_vente - self.prix_achat) / self.prix_achat) * 100
-        return 0
\ No newline at end of file
+        return 0
+
+
+class CodeBarre(BaseModel):
+    """
+    Code-barres supplémentaire d'un produit (EAN fournisseur, ancien code...),
+    reconnu au scan en caisse comme le code produit
+    """
+    produit = models.ForeignKey(
+        Produit,
+        on_delete=models.CASCADE,
+        related_name='codes_barres',
+        verbose_name="Produit",
+        help_text="Produit désigné par ce code"
+    )
+    code = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name="Code-barres",
+        help_text="Code lu par le scanner"
+    )
+
+    class Meta:
+        verbose_name = "Code-barres"
+        verbose_name_plural = "Codes-barres"
+        ordering = ['code']
+
+    def __str__(self):
+        return self.code
+
+    def clean(self):
+        if Produit.objects.filter(code_produit=self.code).exists():
+            raise ValidationError({'code': "Ce code est déjà le code d'un produit."})
+
+    def save(self, *args, **kwargs):
+        ancien = None
+        if self.pk:
+            ancien = CodeBarre.objects.filter(pk=self.pk).values_list('produit_id', 'code').first()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            produit_ids, codes = {self.produit_id}, {self.code}
+            if ancien:
+                produit_ids.add(ancien[0])
+                codes.add(ancien[1])
+            scan.invalider_apres_commit(produit_ids, codes)
+
+    def delete(self, *args, **kwargs):
+        produit_id, code = self.produit_id, self.code
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            scan.invalider_apres_commit([produit_id], [code])
+        return result
+
+
+class ImportCatalogue(BaseModel):
+    """
+    Import d'un catalogue de produits (CSV ou XLSX), traité par lots ; voir produits.importation
+    """
+    STATUT_CHOICES = [
+        ('EN_ATTENTE', 'En attente'),
+        ('EN_COURS', 'En cours'),
+        ('TERMINE', 'Terminé'),
+        ('ECHEC', 'Échec'),
+    ]
+
+    fichier = models.FileField(
+        upload_to='imports/catalogue/',
+        verbose_name="Fichier",
+        help_text="Catalogue importé (CSV ou XLSX)"
+    )
+    statut = models.CharField(
+        max_length=10,
+        choices=STATUT_CHOICES,
+        default='EN_ATTENTE',
+        verbose_name="Statut",
+        help_text="Avancement de l'import"
+    )
+    lignes_total = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Lignes du fichier",
+        help_text="Nombre de lignes de données, connu au début du traitement"
+    )
+    lignes_traitees = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Lignes traitées",
+        help_text="Lignes lues et validées jusqu'ici"
+    )
+    produits_crees = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Produits créés"
+    )
+    produits_modifies = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Produits modifiés"
+    )
+    lignes_en_erreur = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Lignes en erreur",
+        help_text="Lignes ignorées, détaillées dans le rapport d'erreurs"
+    )
+    rapport_erreurs = models.FileField(
+        upload_to='imports/rapports/',
+        blank=True,
+        verbose_name="Rapport d'erreurs",
+        help_text="CSV des lignes ignorées et de la raison du rejet"
+    )
+    message = models.TextField(
+        blank=True,
+        verbose_name="Message",
+        help_text="Erreur ayant interrompu l'import"
+    )
+    utilisateur = models.ForeignKey(
+        'utilisateurs.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='imports_catalogue',
+        verbose_name="Utilisateur",
+        help_text="Utilisateur ayant lancé l'import"
+    )
+    date_fin = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Date de fin",
+        help_text="Fin du traitement"
+    )
+
+    class Meta:
+        verbose_name = "Import de catalogue"
+        verbose_name_plural = "Imports de catalogue"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Import {self.pk} ({self.get_statut_display()})"
+
+    @property
+    def est_termine(self):
+        return self.statut in ('TERMINE', 'ECHEC')
+
+    @property
+    def progression(self):
+        """
+        Pourcentage de lignes traitées
+        """
+        if self.statut == 'TERMINE':
+            return 100
+        if not self.lignes_total:
+            return 0
+        return min(100, self.lignes_traitees * 100 // self.lignes_total)
+
+
+class HistoriquePrix(models.Model):
+    """
+    Ancien et nouveau prix d'un produit à chaque révision des prix en masse
+    """
+    produit = models.ForeignKey(
+        Produit,
+        on_delete=models.CASCADE,
+        related_name='historique_prix',
+        verbose_name="Produit",
+        help_text="Produit dont le prix a changé"
+    )
+    prix_achat_avant = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Prix d'achat avant"
+    )
+    prix_achat_apres = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Prix d'achat après"
+    )
+    prix_vente_avant = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Prix de vente avant"
+    )
+    prix_vente_apres = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Prix de vente après"
+    )
+    motif = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name="Motif",
+        help_text="Raison de la révision (hausse fournisseur, promotion...) et règle appliquée"
+    )
+    utilisateur = models.ForeignKey(
+        'utilisateurs.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='revisions_prix',
+        verbose_name="Utilisateur",
+        help_text="Utilisateur ayant révisé les prix"
+    )
+    date = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Date",
+        help_text="Date de la révision"
+    )
+
+    class Meta:
+        verbose_name = "Historique de prix"
+        verbose_name_plural = "Historique des prix"
+        ordering = ['-date', '-id']
+        indexes = [
+            models.Index(fields=['produit', '-date'], name='historique_prix_produit_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.produit_id} - {self.date:%d/%m/%Y %H:%M}"
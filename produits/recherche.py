@@ -0,0 +1,202 @@
+"""
+Recherche plein texte sur les produits (nom, code, description)
+
+PostgreSQL : colonne `recherche` de type tsvector, générée par la base à
+partir des configurations 'french' (racines) et 'simple' (mots exacts,
+codes), et indexée en GIN ; les résultats sont classés par ts_rank.
+SQLite : table virtuelle FTS5 `produits_produit_fts` alimentée par des
+triggers et classée par bm25.
+Autres bases, ou SQLite compilé sans FTS5 : recherche par `icontains`.
+
+L'index est tenu à jour par la base elle-même : save(), bulk_create() et
+update() sont couverts sans code applicatif. Chaque moteur annote les
+produits trouvés avec `pertinence`, un entier (plus grand = plus pertinent).
+"""
+import re
+
+from django.db import connections
+from django.db.models import IntegerField, Q, Value
+from django.db.models.expressions import RawSQL
+
+TABLE = 'produits_produit'
+TABLE_FTS = 'produits_produit_fts'
+MOTS_MAX = 8
+
+# tsvector pondéré : nom et code (A) avant la description (B)
+VECTEUR_POSTGRES = (
+    "setweight(to_tsvector('french'::regconfig, coalesce(nom, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(nom, '') || ' ' || coalesce(code_produit, '')), 'A') || "
+    "setweight(to_tsvector('french'::regconfig, coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'B')"
+)
+
+TRIGGERS_SQLITE = {
+    f'{TABLE_FTS}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {TABLE_FTS}_ai AFTER INSERT ON {TABLE} BEGIN
+            INSERT INTO {TABLE_FTS}(rowid, nom, code_produit, description)
+            VALUES (new.id, new.nom, new.code_produit, new.description);
+        END""",
+    f'{TABLE_FTS}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {TABLE_FTS}_ad AFTER DELETE ON {TABLE} BEGIN
+            INSERT INTO {TABLE_FTS}({TABLE_FTS}, rowid, nom, code_produit, description)
+            VALUES ('delete', old.id, old.nom, old.code_produit, old.description);
+        END""",
+    f'{TABLE_FTS}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {TABLE_FTS}_au AFTER UPDATE OF nom, code_produit, description ON {TABLE} BEGIN
+            INSERT INTO {TABLE_FTS}({TABLE_FTS}, rowid, nom, code_produit, description)
+            VALUES ('delete', old.id, old.nom, old.code_produit, old.description);
+            INSERT INTO {TABLE_FTS}(rowid, nom, code_produit, description)
+            VALUES (new.id, new.nom, new.code_produit, new.description);
+        END""",
+}
+
+
+def mots(texte):
+    """
+    Mots de la recherche, sans ponctuation (donc sans syntaxe de requête)
+    """
+    return re.findall(r'\w+', (texte or '').lower())[:MOTS_MAX]
+
+
+class RechercheSimple:
+    """
+    Repli sans index plein texte : sous-chaîne insensible à la casse
+    """
+
+    def rechercher(self, queryset, texte):
+        return queryset.filter(
+            Q(nom__icontains=texte) |
+            Q(code_produit__icontains=texte) |
+            Q(description__icontains=texte)
+        ).annotate(pertinence=Value(0, output_field=IntegerField()))
+
+
+class RecherchePostgres:
+    """
+    tsvector généré et index GIN ; chaque mot est cherché comme préfixe
+    """
+
+    def rechercher(self, queryset, texte):
+        termes = mots(texte)
+        if not termes:
+            return queryset.none()
+        requete = ' & '.join(f"{terme}:*" for terme in termes)
+        tsquery = "(to_tsquery('french'::regconfig, %s) || to_tsquery('simple'::regconfig, %s))"
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT id FROM {TABLE} WHERE recherche @@ {tsquery}", [requete, requete])
+        ).annotate(pertinence=RawSQL(
+            f'(ts_rank("{TABLE}"."recherche", {tsquery}) * 1000000)::integer',
+            [requete, requete],
+            output_field=IntegerField(),
+        ))
+
+    def installer(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS recherche tsvector "
+                f"GENERATED ALWAYS AS ({VECTEUR_POSTGRES}) STORED"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS produit_recherche_gin_idx ON {TABLE} USING gin (recherche)"
+            )
+
+    def desinstaller(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {TABLE} DROP COLUMN IF EXISTS recherche")
+
+
+class RechercheSqlite:
+    """
+    Table FTS5 à contenu externe ; chaque mot est cherché comme préfixe
+    """
+
+    def rechercher(self, queryset, texte):
+        termes = mots(texte)
+        if not termes:
+            return queryset.none()
+        requete = ' '.join(f'"{terme}"*' for terme in termes)
+        # Sous-requêtes plutôt que jointure : le queryset reste composable
+        # (sous-requête, update, agrégats) ; bm25 (colonne `rank`, négative)
+        # est lu pour chaque ligne trouvée
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {TABLE_FTS} WHERE {TABLE_FTS} MATCH %s", [requete])
+        ).annotate(pertinence=RawSQL(
+            f"(SELECT CAST(-rank * 1000000 AS INTEGER) FROM {TABLE_FTS} "
+            f'WHERE {TABLE_FTS} MATCH %s AND rowid = "{TABLE}"."id")',
+            [requete],
+            output_field=IntegerField(),
+        ))
+
+    def installer(self, connection):
+        """
+        Crée la table FTS5 et ses triggers s'ils manquent (une reconstruction
+        de la table des produits par une migration supprime les triggers)
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [TABLE]
+            )
+            if set(TRIGGERS_SQLITE) <= {nom for nom, in cursor.fetchall()}:
+                return
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE_FTS} USING fts5("
+                f"nom, code_produit, description, content='{TABLE}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            # Nom et code pèsent plus que la description dans le classement bm25
+            cursor.execute(
+                f"INSERT INTO {TABLE_FTS}({TABLE_FTS}, rank) VALUES ('rank', 'bm25(10.0, 10.0, 1.0)')"
+            )
+            for sql in TRIGGERS_SQLITE.values():
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {TABLE_FTS}({TABLE_FTS}) VALUES ('rebuild')")
+
+    def desinstaller(self, connection):
+        with connection.cursor() as cursor:
+            for nom in TRIGGERS_SQLITE:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {nom}")
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE_FTS}")
+
+
+def fts5_disponible(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        # FTS5 peut aussi être chargé sans option de compilation explicite
+        cursor.execute("SELECT count(*) FROM pragma_module_list WHERE name = 'fts5'")
+        return bool(cursor.fetchone()[0])
+
+
+_moteurs = {}
+
+
+def moteur(using='default'):
+    """
+    Moteur de recherche adapté à la base `using`
+    """
+    if using not in _moteurs:
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            _moteurs[using] = RecherchePostgres()
+        elif connection.vendor == 'sqlite' and fts5_disponible(connection):
+            _moteurs[using] = RechercheSqlite()
+        else:
+            _moteurs[using] = RechercheSimple()
+    return _moteurs[using]
+
+
+def installer(using='default'):
+    """
+    Installe (ou répare) l'index plein texte de la base `using`
+    """
+    recherche = moteur(using)
+    if hasattr(recherche, 'installer'):
+        recherche.installer(connections[using])
+
+
+def rechercher(queryset, texte):
+    """
+    Filtre `queryset` sur `texte` et annote `pertinence`
+    """
+    return moteur(queryset.db).rechercher(queryset, texte)
@@ -0,0 +1,158 @@
+"""
+Résolution rapide d'un code scanné en caisse (code produit ou code-barres)
+
+Un scan est résolu en deux étapes, chacune mise en cache : code -> produit,
+puis produit -> fiche de caisse (identifiant, code, nom, prix, unité, stock
+et codes du produit). Chaque processus garde un cache LRU local devant le
+cache partagé `SCAN_CACHE` : un code déjà scanné ne coûte aucune requête.
+
+Invalidation : l'enregistrement d'un produit, d'un code-barres ou d'un solde
+de stock retire la fiche du produit du cache partagé et du cache local du
+processus, une fois la transaction validée. Les caches locaux des autres
+processus expirent après `SCAN_CACHE_LOCAL_TTL` secondes. Une correspondance
+code -> produit périmée (code modifié, code-barres supprimé) est détectée
+parce que la fiche rechargée ne contient plus le code scanné.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.functions import Coalesce
+
+
+class CacheLRU:
+    """
+    Cache local au processus : au plus `taille` entrées, chacune valable `ttl` secondes
+    """
+
+    def __init__(self, taille, ttl):
+        self.taille = taille
+        self.ttl = ttl
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def get(self, cle):
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                return None
+            expiration, valeur = entree
+            if expiration < time.monotonic():
+                del self._entrees[cle]
+                return None
+            self._entrees.move_to_end(cle)
+            return valeur
+
+    def set(self, cle, valeur):
+        with self._verrou:
+            self._entrees[cle] = (time.monotonic() + self.ttl, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille:
+                self._entrees.popitem(last=False)
+
+    def delete(self, cles):
+        with self._verrou:
+            for cle in cles:
+                self._entrees.pop(cle, None)
+
+    def clear(self):
+        with self._verrou:
+            self._entrees.clear()
+
+
+_local = CacheLRU(settings.SCAN_CACHE_LOCAL_TAILLE, settings.SCAN_CACHE_LOCAL_TTL)
+
+
+def _partage():
+    return caches[settings.SCAN_CACHE]
+
+
+def _cle_code(code):
+    return f"scan:code:{code}"
+
+
+def _cle_fiche(produit_id):
+    return f"scan:produit:{produit_id}"
+
+
+def _lire(cle, charger):
+    """
+    Valeur de `cle` dans le cache local, puis partagé, sinon chargée depuis la base
+    """
+    valeur = _local.get(cle)
+    if valeur is not None:
+        return valeur
+    valeur = _partage().get(cle)
+    if valeur is None:
+        valeur = charger()
+        if valeur is None:
+            return None
+        _partage().set(cle, valeur, settings.SCAN_CACHE_TTL)
+    _local.set(cle, valeur)
+    return valeur
+
+
+def _charger_produit(code):
+    from .models import CodeBarre, Produit
+
+    produit_id = Produit.objects.filter(code_produit=code, is_active=True).values_list('id', flat=True).first()
+    if produit_id is None:
+        produit_id = CodeBarre.objects.filter(
+            code=code, is_active=True, produit__is_active=True
+        ).values_list('produit_id', flat=True).first()
+    return produit_id
+
+
+def _charger_fiche(produit_id):
+    from .models import CodeBarre, Produit
+
+    fiche = Produit.objects.filter(pk=produit_id, is_active=True).values(
+        'id', 'code_produit', 'nom', 'prix_vente', 'unite'
+    ).annotate(stock=Coalesce('solde__quantite', 0)).first()
+    if fiche is None:
+        return None
+    fiche['codes'] = [fiche['code_produit']] + list(
+        CodeBarre.objects.filter(produit_id=produit_id, is_active=True).values_list('code', flat=True)
+    )
+    return fiche
+
+
+def resoudre(code):
+    """
+    Fiche de caisse du produit désigné par `code`, ou None.
+    La fiche est partagée par le cache : ne pas la modifier.
+    """
+    code = (code or '').strip()
+    if not code:
+        return None
+    for _ in range(2):
+        produit_id = _lire(_cle_code(code), lambda: _charger_produit(code))
+        if produit_id is None:
+            return None
+        fiche = _lire(_cle_fiche(produit_id), lambda: _charger_fiche(produit_id))
+        if fiche is not None and code in fiche['codes']:
+            return fiche
+        # Correspondance périmée (code modifié ou supprimé) : relue une fois depuis la base
+        invalider(codes=[code])
+    return None
+
+
+def invalider(produit_ids=(), codes=()):
+    """
+    Retire des caches les fiches des produits et les correspondances des codes donnés
+    """
+    cles = [_cle_fiche(produit_id) for produit_id in produit_ids] + [_cle_code(code) for code in codes]
+    if cles:
+        _local.delete(cles)
+        _partage().delete_many(cles)
+
+
+def invalider_apres_commit(produit_ids=(), codes=()):
+    """
+    Invalide les caches une fois la transaction courante validée
+    """
+    produit_ids, codes = list(produit_ids), list(codes)
+    transaction.on_commit(lambda: invalider(produit_ids, codes))
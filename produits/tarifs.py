@@ -0,0 +1,178 @@
+"""
+Révision des prix en masse (hausse d'un fournisseur, remise sur une catégorie)
+
+Une règle (pourcentage ou montant fixe, sur le prix d'achat, le prix de
+vente ou les deux) s'applique aux produits actifs choisis par catégorie,
+fournisseur principal et recherche. Le nouveau prix est une expression SQL
+sur l'ancien (F(), arrondi au centime) : l'aperçu est un seul agrégat et
+l'application une seule requête UPDATE, quel que soit le nombre de
+produits. Les anciens et nouveaux prix sont lus juste avant la mise à jour
+pour l'historique (`HistoriquePrix`, bulk_create) et l'outbox ; update() ne
+passant pas par Produit.save(), le cache du scan est invalidé ici.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Avg, Count, DecimalField, F, Max, Min, Q, Value
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from core import outbox
+from . import scan
+from .models import HistoriquePrix, Produit
+
+CHAMPS_PRIX = {
+    'prix_achat': "Prix d'achat",
+    'prix_vente': "Prix de vente",
+}
+CIBLE_CHOICES = [
+    ('prix_achat', "Prix d'achat"),
+    ('prix_vente', "Prix de vente"),
+    ('les_deux', "Prix d'achat et de vente"),
+]
+MODE_CHOICES = [
+    ('POURCENTAGE', 'Pourcentage'),
+    ('MONTANT', 'Montant fixe'),
+]
+PRIX_MAX = Decimal('99999999.99')
+
+
+class RevisionPrixErreur(Exception):
+    """
+    Règle de révision invalide ou produisant des prix hors limites
+    """
+
+
+class Regle:
+    """
+    Variation appliquée aux prix : `valeur` % ou `valeur` en montant, sur la cible choisie
+    """
+
+    def __init__(self, cible, mode, valeur):
+        if cible not in dict(CIBLE_CHOICES):
+            raise RevisionPrixErreur("Choisissez le prix à réviser")
+        if mode not in dict(MODE_CHOICES):
+            raise RevisionPrixErreur("Choisissez un pourcentage ou un montant fixe")
+        try:
+            valeur = Decimal(str(valeur).strip().replace(',', '.'))
+        except InvalidOperation:
+            raise RevisionPrixErreur(f"Variation invalide « {valeur} »")
+        if not valeur.is_finite() or not valeur:
+            raise RevisionPrixErreur("La variation doit être un nombre non nul")
+        if mode == 'POURCENTAGE' and valeur <= -100:
+            raise RevisionPrixErreur("Une baisse doit être inférieure à 100 %")
+        self.cible = cible
+        self.mode = mode
+        self.valeur = valeur
+
+    @property
+    def champs(self):
+        return list(CHAMPS_PRIX) if self.cible == 'les_deux' else [self.cible]
+
+    def expression(self, champ):
+        """
+        Nouveau prix calculé par la base à partir du prix actuel
+        """
+        if champ not in self.champs:
+            return F(champ)
+        if self.mode == 'POURCENTAGE':
+            nouveau = F(champ) * Value(1 + self.valeur / 100, output_field=DecimalField())
+        else:
+            nouveau = F(champ) + Value(self.valeur, output_field=DecimalField())
+        return Round(nouveau, 2, output_field=DecimalField(max_digits=10, decimal_places=2))
+
+    def __str__(self):
+        signe = '+' if self.valeur > 0 else ''
+        unite = ' %' if self.mode == 'POURCENTAGE' else ''
+        return f"{dict(CIBLE_CHOICES)[self.cible]} {signe}{self.valeur.normalize():f}{unite}"
+
+
+def selection(categorie_id=None, fournisseur_id=None, recherche=''):
+    """
+    Produits actifs visés par la révision
+    """
+    queryset = Produit.objects.filter(is_active=True)
+    if categorie_id:
+        queryset = queryset.filter(categorie_id=categorie_id)
+    if fournisseur_id:
+        queryset = queryset.filter(fournisseur_principal_id=fournisseur_id)
+    if recherche:
+        queryset = queryset.rechercher(recherche)
+    return queryset.order_by()
+
+
+def _nouveaux_prix(regle):
+    return {f"nouveau_{champ}": regle.expression(champ) for champ in CHAMPS_PRIX}
+
+
+def apercu(queryset, regle):
+    """
+    Effet de la règle, calculé en une requête : nombre de produits, prix
+    moyens avant et après, bornes des nouveaux prix et produits qui
+    seraient vendus à perte ou à un prix négatif
+    """
+    agregats = {'nombre': Count('id')}
+    for champ in CHAMPS_PRIX:
+        agregats[f"{champ}_moyen_avant"] = Avg(champ)
+        agregats[f"{champ}_moyen_apres"] = Avg(f"nouveau_{champ}")
+        agregats[f"{champ}_min_apres"] = Min(f"nouveau_{champ}")
+        agregats[f"{champ}_max_apres"] = Max(f"nouveau_{champ}")
+    agregats['sous_prix_achat'] = Count('id', filter=Q(nouveau_prix_vente__lt=F('nouveau_prix_achat')))
+    agregats['negatifs'] = Count('id', filter=Q(nouveau_prix_achat__lt=0) | Q(nouveau_prix_vente__lt=0))
+    agregats['hors_limite'] = Count(
+        'id', filter=Q(nouveau_prix_achat__gt=PRIX_MAX) | Q(nouveau_prix_vente__gt=PRIX_MAX)
+    )
+    return queryset.annotate(**_nouveaux_prix(regle)).aggregate(**agregats)
+
+
+def appliquer(queryset, regle, motif='', utilisateur=None):
+    """
+    Applique la règle en une requête UPDATE et enregistre l'historique ;
+    retourne le nombre de produits modifiés
+    """
+    motif = ' - '.join(partie for partie in (motif.strip(), str(regle)) if partie)[:200]
+    with transaction.atomic():
+        # Lignes verrouillées (PostgreSQL) : l'UPDATE calcule les mêmes prix que cette lecture
+        lignes = list(queryset.select_for_update().annotate(**_nouveaux_prix(regle)).values(
+            'id', 'code_produit', 'nom', 'categorie_id', 'seuil_alerte', 'is_active',
+            'prix_achat', 'prix_vente', 'nouveau_prix_achat', 'nouveau_prix_vente',
+        ))
+        for ligne in lignes:
+            for champ in regle.champs:
+                if ligne[f"nouveau_{champ}"] < 0:
+                    raise RevisionPrixErreur(f"{ligne['code_produit']} : {CHAMPS_PRIX[champ].lower()} négatif")
+                if ligne[f"nouveau_{champ}"] > PRIX_MAX:
+                    raise RevisionPrixErreur(f"{ligne['code_produit']} : {CHAMPS_PRIX[champ].lower()} trop élevé")
+        if not lignes:
+            return 0
+
+        queryset.update(
+            updated_at=timezone.now(),
+            **{champ: regle.expression(champ) for champ in regle.champs},
+        )
+
+        HistoriquePrix.objects.bulk_create([
+            HistoriquePrix(
+                produit_id=ligne['id'],
+                prix_achat_avant=ligne['prix_achat'],
+                prix_achat_apres=ligne['nouveau_prix_achat'],
+                prix_vente_avant=ligne['prix_vente'],
+                prix_vente_apres=ligne['nouveau_prix_vente'],
+                motif=motif,
+                utilisateur=utilisateur,
+            )
+            for ligne in lignes
+        ], batch_size=1000)
+
+        produits = [
+            Produit(
+                pk=ligne['id'], code_produit=ligne['code_produit'], nom=ligne['nom'],
+                categorie_id=ligne['categorie_id'], seuil_alerte=ligne['seuil_alerte'],
+                is_active=ligne['is_active'], prix_achat=ligne['nouveau_prix_achat'],
+                prix_vente=ligne['nouveau_prix_vente'],
+            )
+            for ligne in lignes
+        ]
+        outbox.publier_lot([(produit, 'MODIFICATION', produit.donnees_evenement()) for produit in produits])
+        scan.invalider_apres_commit([produit.pk for produit in produits])
+    return len(lignes)
@@ -0,0 +1,16 @@
+from celery import shared_task
+
+from . import importation
+from .models import ImportCatalogue
+
+
+@shared_task
+def importer_catalogue(import_id):
+    """
+    Importe un catalogue de produits téléversé (CSV ou XLSX)
+    """
+    resultat = importation.importer(ImportCatalogue.objects.get(pk=import_id))
+    return (
+        f"Import {import_id} : {resultat.produits_crees} produits créés, "
+        f"{resultat.produits_modifies} modifiés, {resultat.lignes_en_erreur} lignes en erreur"
+    )
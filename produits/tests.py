@@ -1,3 +1,376 @@
-from django.test import TestCase
+import datetime
+import io
+import shutil
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from core import images, outbox, trigrammes
+from core.pagination import CursorPaginator, InvalidCursor
+from stocks.models import MouvementStock
+from utilisateurs.models import User
+
+from . import autocompletion, importation, scan, tarifs
+from .models import Categorie, CodeBarre, HistoriquePrix, ImportCatalogue, Produit
+
+
+class RechercheProduitTest(TestCase):
+
+    def test_recherche_suit_les_modifications(self):
+        categorie = Categorie.objects.create(nom="Visserie")
+        vis = Produit.objects.create(
+            code_produit="VIS-001", nom="Vis à bois", description="Tête fraisée",
+            categorie=categorie, prix_achat=1, prix_vente=2,
+        )
+        Produit.objects.bulk_create([
+            Produit(code_produit="CLOU-001", nom="Clous", categorie=categorie, prix_achat=1, prix_vente=2),
+        ])
+
+        self.assertEqual(list(Produit.objects.rechercher("vis")), [vis])
+        self.assertEqual(list(Produit.objects.rechercher("clou")), [Produit.objects.get(code_produit="CLOU-001")])
+        self.assertEqual(list(Produit.objects.rechercher("fraisee")), [vis])
+
+        Produit.objects.filter(pk=vis.pk).update(nom="Boulon")
+        self.assertEqual(list(Produit.objects.rechercher("vis bois")), [])
+        self.assertEqual(list(Produit.objects.rechercher("boulon")), [vis])
+
+
+class RechercheApprocheeTest(TestCase):
+
+    def test_faute_de_frappe(self):
+        categorie = Categorie.objects.create(nom="Fixation")
+        cheville = Produit.objects.create(
+            code_produit="CHV-008", nom="Cheville nylon", categorie=categorie, prix_achat=1, prix_vente=2,
+        )
+        Produit.objects.create(code_produit="CLOU-001", nom="Clous", categorie=categorie, prix_achat=1, prix_vente=2)
+        outbox.relayer()
+
+        self.assertEqual(trigrammes.rechercher(Produit.objects.all(), "chevile"), [cheville])
+        self.assertEqual(trigrammes.rechercher(Produit.objects.all(), "marteau"), [])
+
+
+class ScanProduitTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        scan._local.clear()
+        categorie = Categorie.objects.create(nom="Visserie")
+        self.produit = Produit.objects.create(
+            code_produit="VIS-001", nom="Vis à bois", categorie=categorie, prix_achat=1, prix_vente=2,
+        )
+
+    def test_code_produit_et_code_barres(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            CodeBarre.objects.create(produit=self.produit, code="3760000000017")
+
+        self.assertEqual(scan.resoudre("VIS-001")["id"], self.produit.pk)
+        self.assertEqual(scan.resoudre("3760000000017")["id"], self.produit.pk)
+        self.assertIsNone(scan.resoudre("INCONNU"))
+
+    def test_invalidation_a_l_enregistrement(self):
+        self.assertEqual(scan.resoudre("VIS-001")["prix_vente"], 2)
+        with self.assertNumQueries(0):
+            scan.resoudre("VIS-001")
+
+        self.produit.prix_vente = 3
+        self.produit.code_produit = "VIS-002"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.produit.save()
+
+        self.assertEqual(scan.resoudre("VIS-002")["prix_vente"], 3)
+        self.assertIsNone(scan.resoudre("VIS-001"))
+
+
+class AutocompletionProduitTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        categorie = Categorie.objects.create(nom="Visserie")
+        Produit.objects.bulk_create([
+            Produit(code_produit=f"VIS-{i:03d}", nom=f"Vis {i:03d}", categorie=categorie, prix_achat=1, prix_vente=2)
+            for i in range(autocompletion.TAILLE_PAGE + 5)
+        ] + [
+            Produit(code_produit="CLOU-001", nom="Clous", categorie=categorie, prix_achat=1, prix_vente=2),
+        ])
+
+    def test_prefixe_et_pages(self):
+        page = autocompletion.rechercher("vis")
+        self.assertEqual(len(page['resultats']), autocompletion.TAILLE_PAGE)
+        self.assertEqual(page['suivante'], 2)
+        self.assertEqual(len(autocompletion.rechercher("vis", 2)['resultats']), 5)
+
+        self.assertEqual([p['nom'] for p in autocompletion.rechercher("clou-")['resultats']], ["Clous"])
+        self.assertEqual(autocompletion.rechercher("ous")['resultats'], [])
+
+
+class DerivesImageTest(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        override = override_settings(MEDIA_ROOT=self.media, IMAGES_LARGEURS=[160, 320])
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_miniatures_et_balise(self):
+        contenu = io.BytesIO()
+        Image.new('RGB', (1200, 800), 'red').save(contenu, 'JPEG')
+        produit = Produit.objects.create(
+            code_produit="VIS-001", nom="Vis", categorie=Categorie.objects.create(nom="Visserie"),
+            prix_achat=1, prix_vente=2, image=SimpleUploadedFile("vis.jpg", contenu.getvalue()),
+        )
+        self.assertEqual(images.a_traiter(), [('produits.produit', produit.pk, 'image')])
+
+        self.assertEqual(images.generer('produits.produit', produit.pk, 'image'), 2)
+        produit.refresh_from_db()
+        variantes = produit.image_derives['variantes']
+        self.assertEqual([(v['largeur'], v['hauteur']) for v in variantes], [(160, 107), (320, 213)])
+        self.assertEqual(images.a_traiter(), [])
+
+        html = Template("{% load images %}{% image_responsive produit 'image' sizes='40px' %}").render(
+            Context({'produit': produit})
+        )
+        self.assertIn('type="image/webp"', html)
+        self.assertIn(f"{variantes[1]['webp']} 320w", html)
+        self.assertIn('loading="lazy"', html)
+
+
+class ImportCatalogueTest(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_creation_mise_a_jour_et_rapport(self):
+        Produit.objects.create(
+            code_produit="VIS-001", nom="Vis", categorie=Categorie.objects.create(nom="Visserie"),
+            prix_achat=1, prix_vente=2, seuil_alerte=4,
+        )
+        contenu = (
+            "Code;Désignation;Catégorie;Prix d'achat;Prix de vente\n"
+            "VIS-001;Vis inox;;;2,50\n"
+            "CLOU-001;Clous;visserie;0,10;0,20\n"
+            "MAR-001;Marteau;Outillage;8;15\n"
+            "SCIE-001;Scie;Outillage;abc;20\n"
+            "PINCE-001;Pince;;5;9\n"
+        ).encode('utf-8')
+        import_catalogue = ImportCatalogue.objects.create(fichier=SimpleUploadedFile("catalogue.csv", contenu))
+
+        importation.importer(import_catalogue, taille_lot=2)
+
+        self.assertEqual(import_catalogue.statut, 'TERMINE')
+        self.assertEqual((import_catalogue.produits_crees, import_catalogue.produits_modifies), (2, 1))
+        self.assertEqual(import_catalogue.lignes_en_erreur, 2)
+        vis = Produit.objects.get(code_produit="VIS-001")
+        self.assertEqual((vis.nom, vis.prix_vente, vis.prix_achat, vis.seuil_alerte), ("Vis inox", 2.5, 1, 4))
+        self.assertEqual(Produit.objects.get(code_produit="CLOU-001").categorie, vis.categorie)
+        self.assertEqual(Produit.objects.get(code_produit="MAR-001").categorie.nom, "Outillage")
+        self.assertEqual(Produit.objects.get(code_produit="MAR-001").alerte.ecart, 10)
+        with import_catalogue.rapport_erreurs.open('rb') as rapport:
+            lignes = rapport.read().decode('utf-8-sig').splitlines()
+        self.assertEqual(lignes[1:], [
+            "5;SCIE-001;Prix d'achat invalide « abc »",
+            "6;PINCE-001;Nouveau produit sans catégorie",
+        ])
+
+    def test_requetes_independantes_du_nombre_de_lignes(self):
+        Categorie.objects.create(nom="Outillage")
+
+        def requetes(prefixe, nombre):
+            contenu = "Code;Désignation;Catégorie;Prix d'achat;Prix de vente\n" + "".join(
+                f"{prefixe}-{i:03d};Produit {i};Outillage;1;2\n" for i in range(nombre)
+            )
+            import_catalogue = ImportCatalogue.objects.create(
+                fichier=SimpleUploadedFile(f"{prefixe}.csv", contenu.encode('utf-8'))
+            )
+            with CaptureQueriesContext(connection) as contexte:
+                importation.importer(import_catalogue, taille_lot=1000)
+            self.assertEqual(import_catalogue.produits_crees, nombre)
+            return len(contexte)
+
+        # Un lot coûte un nombre fixe de requêtes, quel que soit son nombre de lignes
+        # (tailles choisies pour tenir dans une seule insertion groupée sous SQLite)
+        self.assertEqual(requetes("PETIT", 3), requetes("GRAND", 30))
+
+
+class RevisionPrixTest(TestCase):
+
+    def setUp(self):
+        self.visserie = Categorie.objects.create(nom="Visserie")
+        Produit.objects.bulk_create([
+            Produit(code_produit="VIS-001", nom="Vis", categorie=self.visserie, prix_achat=10, prix_vente="12.99"),
+            Produit(code_produit="CLOU-001", nom="Clous", categorie=self.visserie, prix_achat=2, prix_vente=3),
+            Produit(code_produit="MAR-001", nom="Marteau", categorie=Categorie.objects.create(nom="Outillage"),
+                    prix_achat=8, prix_vente=15),
+        ])
+
+    def test_apercu_puis_application(self):
+        selection = tarifs.selection(categorie_id=self.visserie.pk)
+        regle = tarifs.Regle('prix_vente', 'POURCENTAGE', '-40')
+
+        with self.assertNumQueries(1):
+            apercu = tarifs.apercu(selection, regle)
+        self.assertEqual(apercu['nombre'], 2)
+        self.assertEqual(apercu['sous_prix_achat'], 2)
+
+        self.assertEqual(tarifs.appliquer(selection, regle, "Promotion"), 2)
+        self.assertEqual(
+            dict(Produit.objects.values_list('code_produit', 'prix_vente')),
+            {'VIS-001': Decimal('7.79'), 'CLOU-001': Decimal('1.80'), 'MAR-001': Decimal('15.00')},
+        )
+        historique = HistoriquePrix.objects.get(produit__code_produit="VIS-001")
+        self.assertEqual((historique.prix_vente_avant, historique.prix_vente_apres), (Decimal('12.99'), Decimal('7.79')))
+        self.assertEqual(historique.prix_achat_apres, historique.prix_achat_avant)
+        self.assertEqual(historique.motif, "Promotion - Prix de vente -40 %")
+
+    def test_selection_par_recherche(self):
+        selection = tarifs.selection(categorie_id=self.visserie.pk, recherche="clous")
+        regle = tarifs.Regle('prix_achat', 'MONTANT', '1')
+        self.assertEqual(tarifs.apercu(selection, regle)['nombre'], 1)
+        self.assertEqual(tarifs.appliquer(selection, regle), 1)
+        self.assertEqual(Produit.objects.get(code_produit="CLOU-001").prix_achat, 3)
+        self.assertEqual(Produit.objects.get(code_produit="VIS-001").prix_achat, 10)
+
+    def test_prix_negatif_refuse(self):
+        with self.assertRaises(tarifs.RevisionPrixErreur):
+            tarifs.appliquer(tarifs.selection(), tarifs.Regle('prix_achat', 'MONTANT', '-5'))
+        self.assertFalse(HistoriquePrix.objects.exists())
+        self.assertEqual(Produit.objects.get(code_produit="MAR-001").prix_achat, 8)
+
+
+class StockProduitTest(TestCase):
+
+    def setUp(self):
+        categorie = Categorie.objects.create(nom="Visserie")
+        self.vis, self.clous, self.marteau = Produit.objects.bulk_create([
+            Produit(code_produit=code, nom=nom, categorie=categorie, prix_achat=1, prix_vente=2, seuil_alerte=seuil)
+            for code, nom, seuil in [("VIS-001", "Vis", 5), ("CLOU-001", "Clous", 5), ("MAR-001", "Marteau", 1)]
+        ])
+        for produit, type_mouvement, quantite in [
+            (self.vis, 'ENTREE', 10), (self.vis, 'SORTIE', 7), (self.clous, 'ENTREE', 20), (self.marteau, 'ENTREE', 1),
+        ]:
+            MouvementStock.objects.create(
+                produit=produit, type_mouvement=type_mouvement, quantite=quantite, motif='ACHAT'
+            )
+        MouvementStock.objects.create(
+            produit=self.clous, type_mouvement='SORTIE', quantite=20, motif='VENTE', is_active=False
+        )
+
+    def test_with_stock_solde_et_journal(self):
+        with self.assertNumQueries(1):
+            depuis_solde = {
+                p.code_produit: (p.stock, p.en_rupture, p.ecart_seuil) for p in Produit.objects.with_stock()
+            }
+        self.assertEqual(depuis_solde, {
+            "VIS-001": (3, True, 2), "CLOU-001": (20, False, -15), "MAR-001": (1, True, 0),
+        })
+        self.assertEqual(depuis_solde, {
+            p.code_produit: (p.stock, p.en_rupture, p.ecart_seuil)
+            for p in Produit.objects.with_stock(depuis_journal=True)
+        })
+
+    def test_liste_filtree_et_triee_en_sql(self):
+        self.client.force_login(User.objects.create_user("caisse", password="secret"))
+        reponse = self.client.get(reverse('produits:list'), {'rupture': 'true', 'tri': 'ecart'})
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual([p.code_produit for p in reponse.context['produits']], ["VIS-001", "MAR-001"])
+
+        reponse = self.client.get(reverse('produits:list'), {'tri': 'ecart'})
+        self.assertEqual([p.ecart_seuil for p in reponse.context['produits']], [2, 0, -15])
+
+
+class PaginationCurseurTest(TestCase):
+
+    def setUp(self):
+        categorie = Categorie.objects.create(nom="Visserie")
+        # Noms en double : l'identifiant départage les produits
+        Produit.objects.bulk_create([
+            Produit(code_produit=f"VIS-{i:03d}", nom=f"Vis {i // 3}", categorie=categorie, prix_achat=1, prix_vente=2)
+            for i in range(11)
+        ])
+        self.ordre = list(Produit.objects.order_by('-nom', 'id').values_list('pk', flat=True))
+
+    def test_parcours_avant_et_arriere(self):
+        paginator = CursorPaginator(Produit.objects.all(), ('-nom', 'id'), 4)
+        pages, page = [], paginator.page()
+        self.assertFalse(page.has_previous())
+        while True:
+            pages.append([produit.pk for produit in page])
+            if not page.has_next():
+                break
+            page = paginator.page(page.next_cursor)
+        self.assertEqual(sum(pages, []), self.ordre)
+        self.assertEqual([len(ids) for ids in pages], [4, 4, 3])
+
+        page = paginator.page(page.previous_cursor)
+        self.assertEqual([produit.pk for produit in page], pages[1])
+        page = paginator.page(page.previous_cursor)
+        self.assertEqual([produit.pk for produit in page], pages[0])
+        self.assertFalse(page.has_previous())
+
+    def test_curseur_invalide(self):
+        paginator = CursorPaginator(Produit.objects.all(), ('nom', 'id'), 4)
+        for curseur in ("n'importe quoi", paginator.encode_cursor('x', Produit.objects.first())):
+            with self.assertRaises(InvalidCursor):
+                paginator.page(curseur)
+
+        self.client.force_login(User.objects.create_user("caisse", password="secret"))
+        self.assertEqual(self.client.get(reverse('produits:list'), {'curseur': "abc"}).status_code, 404)
+        reponse = self.client.get(reverse('produits:list'), {'curseur': ""})
+        self.assertEqual(len(reponse.context['produits']), 11)
+
+
+class HistoriqueStockTest(TestCase):
+
+    def setUp(self):
+        categorie = Categorie.objects.create(nom="Visserie")
+        self.produit = Produit.objects.create(
+            code_produit="VIS-001", nom="Vis à bois", categorie=categorie, prix_achat=1, prix_vente=2,
+        )
+        self.client.force_login(User.objects.create_user("caisse", password="secret"))
+        self.jours = [timezone.localdate() - datetime.timedelta(days=n) for n in (3, 2, 1)]
+
+    def mouvement(self, jour, type_mouvement, quantite, **champs):
+        return MouvementStock.objects.create(
+            produit=self.produit, type_mouvement=type_mouvement, quantite=quantite, motif='ACHAT',
+            date_mouvement=timezone.make_aware(datetime.datetime.combine(jour, datetime.time(10))), **champs
+        )
+
+    def test_solde_cumule(self):
+        self.mouvement(self.jours[0], 'ENTREE', 10)
+        self.mouvement(self.jours[1], 'SORTIE', 3)
+        annulee = self.mouvement(self.jours[1], 'SORTIE', 1)
+        annulee.is_active = False
+        annulee.save()
+        self.mouvement(self.jours[2], 'ENTREE', 5)
+        self.mouvement(self.jours[2], 'SORTIE', 2)
+
+        reponse = self.client.get(
+            reverse('produits:historique', args=[self.produit.pk]), {'debut': self.jours[1].isoformat()}
+        )
+        self.assertEqual(reponse.status_code, 200)
+        donnees = reponse.json()
+        self.assertEqual(donnees['solde_initial'], 10)
+        self.assertEqual(
+            [(jour['entrees'], jour['sorties'], jour['net'], jour['solde']) for jour in donnees['jours']],
+            [(0, 3, -3, 7), (5, 2, 3, 10)],
+        )
+        self.assertEqual(donnees['jours'][-1]['solde'], self.produit.solde.quantite)
+
+        # La fin de période exclut les jours suivants
+        reponse = self.client.get(
+            reverse('produits:historique', args=[self.produit.pk]), {'fin': self.jours[1].isoformat()}
+        )
+        self.assertEqual([jour['solde'] for jour in reponse.json()['jours']], [10, 7])
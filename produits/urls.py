@@ -5,10 +5,18 @@ app_name = 'produits'
 
 urlpatterns = [
     path('', views.ProduitListView.as_view(), name='list'),
+    path('autocomplete/', views.ProduitAutocompleteView.as_view(), name='autocomplete'),
+    path('scan/', views.ProduitScanView.as_view(), name='scan'),
     path('create/', views.ProduitCreateView.as_view(), name='create'),
     path('<int:pk>/', views.ProduitDetailView.as_view(), name='detail'),
+    path('<int:pk>/historique/', views.ProduitHistoriqueView.as_view(), name='historique'),
     path('<int:pk>/edit/', views.ProduitUpdateView.as_view(), name='update'),
     path('<int:pk>/delete/', views.ProduitDeleteView.as_view(), name='delete'),
+    path('prix/', views.ProduitRevisionPrixView.as_view(), name='revision_prix'),
+    path('import/', views.ImportCatalogueView.as_view(), name='import'),
+    path('import/<int:pk>/', views.ImportCatalogueDetailView.as_view(), name='import_detail'),
+    path('import/<int:pk>/progression/', views.ImportCatalogueProgressionView.as_view(), name='import_progression'),
+    path('import/<int:pk>/rapport/', views.ImportCatalogueRapportView.as_view(), name='import_rapport'),
     path('categories/', views.CategorieListView.as_view(), name='categorie_list'),
     path('categories/create/', views.CategorieCreateView.as_view(), name='categorie_create'),
 ]
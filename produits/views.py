@@ -1,31 +1,53 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.generic import ListView, DetailView, TemplateView
+from django.views.generic import ListView, DetailView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, Http404, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
-from .models import Produit, Categorie
+from core import trigrammes
+from core.pagination import CursorPaginationMixin
+from . import autocompletion, importation, scan, tarifs
+from .models import ImportCatalogue, Produit, Categorie
 from fournisseurs.models import Fournisseur
+from stocks.models import MouvementJournalier
 
 
-class ProduitListView(LoginRequiredMixin, ListView):
+class ProduitListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Produit
     template_name = 'produits/list.html'
     context_object_name = 'produits'
     paginate_by = 20
+    cursor_ordering = ('nom', 'id')
+
+    TRI_CHOICES = [
+        ('nom', 'Nom'),
+        ('ecart', 'Écart au seuil'),
+        ('ventes', 'Ventes / jour (30 j)'),
+        ('couverture', 'Jours de couverture'),
+    ]
+    # Ordres de tri (avec l'identifiant pour la pagination par curseur)
+    TRI_ORDRES = {
+        'ecart': ('-ecart_seuil', 'nom', 'id'),
+        'ventes': ('-ventes_30j', 'nom', 'id'),
+        'couverture': ('couverture', 'nom', 'id'),
+    }
+    # Sans vente, la couverture est infinie : ces produits sont classés en dernier
+    COUVERTURE_INFINIE = 10 ** 9
     
     def get_queryset(self):
-        queryset = Produit.objects.filter(is_active=True).select_related('categorie', 'fournisseur_principal')
+        queryset = Produit.objects.filter(is_active=True).select_related(
+            'categorie', 'fournisseur_principal', 'velocite'
+        ).with_stock()
         
-        # Filtrage par recherche
+        # Recherche plein texte (index GIN ou FTS5), classée par pertinence
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(nom__icontains=search) |
-                Q(code_produit__icontains=search) |
-                Q(description__icontains=search)
-            )
+            queryset = queryset.rechercher(search)
         
         # Filtrage par catégorie
         categorie_id = self.request.GET.get('categorie')
@@ -35,16 +57,43 @@ class ProduitListView(LoginRequiredMixin, ListView):
         # Filtrage par rupture de stock
         rupture = self.request.GET.get('rupture')
         if rupture == 'true':
-            queryset = [p for p in queryset if p.est_en_rupture]
+            queryset = queryset.filter(en_rupture=True)
+        
+        # Tri par écart au seuil, ventes ou couverture (vélocités calculées chaque nuit)
+        tri = self.request.GET.get('tri')
+        if tri == 'ventes':
+            queryset = queryset.annotate(ventes_30j=Coalesce('velocite__ventes_30j', 0))
+        elif tri == 'couverture':
+            queryset = queryset.annotate(
+                couverture=Coalesce('velocite__couverture_jours', self.COUVERTURE_INFINIE)
+            )
+        ordering = self.get_cursor_ordering()
+        if ordering != self.cursor_ordering:
+            queryset = queryset.order_by(*ordering)
         
         return queryset
     
+    def get_cursor_ordering(self):
+        tri = self.request.GET.get('tri')
+        if tri in self.TRI_ORDRES:
+            return self.TRI_ORDRES[tri]
+        # Sans tri explicite, une recherche est classée par pertinence
+        if self.request.GET.get('search'):
+            return ('-pertinence', 'nom', 'id')
+        return super().get_cursor_ordering()
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['categories'] = Categorie.objects.filter(is_active=True)
         context['search'] = self.request.GET.get('search', '')
         context['categorie_filter'] = self.request.GET.get('categorie', '')
         context['rupture_filter'] = self.request.GET.get('rupture', '')
+        context['tri_filter'] = self.request.GET.get('tri', '')
+        context['tri_choices'] = self.TRI_CHOICES
+        # Aucun résultat : produits aux noms proches (fautes de frappe)
+        search = self.request.GET.get('search')
+        if search and not context['produits'] and not context['page_obj'].has_previous():
+            context['suggestions'] = trigrammes.rechercher(Produit.objects.filter(is_active=True), search, 5)
         return context
 
 
@@ -54,7 +103,63 @@ class ProduitDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'produit'
     
     def get_queryset(self):
-        return Produit.objects.filter(is_active=True).select_related('categorie', 'fournisseur_principal')
+        return Produit.objects.filter(is_active=True).select_related('categorie', 'fournisseur_principal', 'solde')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['soldes_emplacements'] = self.object.soldes_emplacements.select_related(
+            'emplacement'
+        ).exclude(quantite=0).order_by('-emplacement__est_principal', 'emplacement__nom')
+        return context
+
+
+class ProduitHistoriqueView(LoginRequiredMixin, View):
+    """
+    Historique journalier du stock d'un produit (JSON) : entrées, sorties,
+    variation nette et solde de fin de journée. Paramètres optionnels
+    `debut` et `fin` au format AAAA-MM-JJ.
+    """
+
+    def get(self, request, *args, **kwargs):
+        produit = get_object_or_404(Produit, pk=self.kwargs['pk'], is_active=True)
+        debut = parse_date(request.GET.get('debut') or '')
+        fin = parse_date(request.GET.get('fin') or '')
+        solde_initial, jours = MouvementJournalier.historique(produit.pk, debut, fin)
+        return JsonResponse({
+            'produit': produit.pk,
+            'debut': debut,
+            'fin': fin,
+            'solde_initial': solde_initial,
+            'jours': jours,
+        })
+
+
+class ProduitScanView(LoginRequiredMixin, View):
+    """
+    Résolution d'un code scanné en caisse (JSON) : code produit ou code-barres
+    supplémentaire, vers identifiant, nom, prix et stock. Paramètre `code`.
+    """
+
+    def get(self, request, *args, **kwargs):
+        code = request.GET.get('code', '')
+        fiche = scan.resoudre(code)
+        if fiche is None:
+            return JsonResponse({'erreur': f"Aucun produit pour le code « {code} »"}, status=404)
+        return JsonResponse(fiche)
+
+
+class ProduitAutocompleteView(LoginRequiredMixin, View):
+    """
+    Autocomplétion des produits (JSON) : code ou nom commençant par `q`,
+    par pages de 20 (paramètre `page`)
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        return JsonResponse(autocompletion.rechercher(request.GET.get('q'), page))
 
 
 class ProduitCreateView(LoginRequiredMixin, TemplateView):
@@ -149,7 +254,9 @@ class ProduitDeleteView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['produit'] = get_object_or_404(Produit, id=self.kwargs['pk'], is_active=True)
+        context['produit'] = get_object_or_404(
+            Produit.objects.select_related('solde'), id=self.kwargs['pk'], is_active=True
+        )
         return context
     
     def post(self, request, *args, **kwargs):
@@ -164,6 +271,144 @@ class ProduitDeleteView(LoginRequiredMixin, TemplateView):
             return redirect('produits:list')
 
 
+class ImportCatalogueView(LoginRequiredMixin, TemplateView):
+    """
+    Téléversement d'un catalogue CSV ou XLSX : les petits fichiers sont
+    importés pendant la requête, les autres par une tâche Celery
+    """
+    template_name = 'produits/import_form.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['imports'] = ImportCatalogue.objects.filter(is_active=True).select_related('utilisateur')[:10]
+        context['colonnes'] = importation.COLONNES
+        return context
+
+    def post(self, request, *args, **kwargs):
+        try:
+            fichier = request.FILES.get('fichier')
+            if not fichier:
+                raise importation.ImportErreur("Aucun fichier de catalogue fourni")
+            if not fichier.name.lower().endswith(('.csv', '.txt', '.xlsx')):
+                raise importation.ImportErreur("Format non pris en charge : fichier CSV ou XLSX attendu")
+            import_catalogue = ImportCatalogue.objects.create(fichier=fichier, utilisateur=request.user)
+
+        except Exception as e:
+            messages.error(request, f"Erreur lors de l'import : {str(e)}")
+            return self.get(request, *args, **kwargs)
+
+        if fichier.size <= settings.IMPORT_CATALOGUE_TAILLE_SYNCHRONE:
+            importation.importer(import_catalogue)
+        else:
+            from .tasks import importer_catalogue
+            try:
+                importer_catalogue.delay(import_catalogue.pk)
+            except Exception as e:
+                ImportCatalogue.objects.filter(pk=import_catalogue.pk).update(
+                    statut='ECHEC',
+                    message=f"Import non planifié (file de tâches indisponible) : {e}",
+                    date_fin=timezone.now(),
+                )
+        return redirect('produits:import_detail', pk=import_catalogue.pk)
+
+
+class ImportCatalogueDetailView(LoginRequiredMixin, DetailView):
+    model = ImportCatalogue
+    template_name = 'produits/import_detail.html'
+    context_object_name = 'import_catalogue'
+
+    def get_queryset(self):
+        return ImportCatalogue.objects.filter(is_active=True).select_related('utilisateur')
+
+
+class ImportCatalogueProgressionView(LoginRequiredMixin, View):
+    """
+    Avancement d'un import (JSON), interrogé par la page de l'import
+    """
+
+    def get(self, request, *args, **kwargs):
+        import_catalogue = get_object_or_404(ImportCatalogue, pk=self.kwargs['pk'], is_active=True)
+        return JsonResponse({
+            'statut': import_catalogue.statut,
+            'termine': import_catalogue.est_termine,
+            'progression': import_catalogue.progression,
+            'lignes_total': import_catalogue.lignes_total,
+            'lignes_traitees': import_catalogue.lignes_traitees,
+            'produits_crees': import_catalogue.produits_crees,
+            'produits_modifies': import_catalogue.produits_modifies,
+            'lignes_en_erreur': import_catalogue.lignes_en_erreur,
+            'message': import_catalogue.message,
+        })
+
+
+class ImportCatalogueRapportView(LoginRequiredMixin, View):
+    """
+    Téléchargement du rapport CSV des lignes rejetées
+    """
+
+    def get(self, request, *args, **kwargs):
+        import_catalogue = get_object_or_404(ImportCatalogue, pk=self.kwargs['pk'], is_active=True)
+        if not import_catalogue.rapport_erreurs:
+            raise Http404("Aucun rapport d'erreurs pour cet import")
+        return FileResponse(
+            import_catalogue.rapport_erreurs.open('rb'),
+            as_attachment=True,
+            filename=f"erreurs_import_{import_catalogue.pk}.csv",
+            content_type='text/csv; charset=utf-8',
+        )
+
+
+class ProduitRevisionPrixView(LoginRequiredMixin, TemplateView):
+    """
+    Révision des prix en masse par catégorie, fournisseur ou recherche :
+    aperçu en GET (paramètre `valeur`), application en POST
+    """
+    template_name = 'produits/revision_prix.html'
+
+    def get_parametres(self, donnees):
+        return {
+            'categorie': donnees.get('categorie', ''),
+            'fournisseur': donnees.get('fournisseur', ''),
+            'search': donnees.get('search', '').strip(),
+            'cible': donnees.get('cible', 'prix_vente'),
+            'mode': donnees.get('mode', 'POURCENTAGE'),
+            'valeur': donnees.get('valeur', '').strip(),
+            'motif': donnees.get('motif', '').strip(),
+        }
+
+    def get_selection(self, parametres):
+        return tarifs.selection(parametres['categorie'], parametres['fournisseur'], parametres['search'])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        parametres = self.get_parametres(self.request.GET)
+        context['parametres'] = parametres
+        context['categories'] = Categorie.objects.filter(is_active=True)
+        context['fournisseurs'] = Fournisseur.objects.filter(is_active=True)
+        context['cible_choices'] = tarifs.CIBLE_CHOICES
+        context['mode_choices'] = tarifs.MODE_CHOICES
+        if parametres['valeur']:
+            try:
+                regle = tarifs.Regle(parametres['cible'], parametres['mode'], parametres['valeur'])
+                context['regle'] = regle
+                context['apercu'] = tarifs.apercu(self.get_selection(parametres), regle)
+            except tarifs.RevisionPrixErreur as e:
+                messages.error(self.request, str(e))
+        return context
+
+    def post(self, request, *args, **kwargs):
+        parametres = self.get_parametres(request.POST)
+        try:
+            regle = tarifs.Regle(parametres['cible'], parametres['mode'], parametres['valeur'])
+            total = tarifs.appliquer(self.get_selection(parametres), regle, parametres['motif'], request.user)
+            messages.success(request, f'Prix révisés pour {total} produit(s) : {regle}.')
+            return redirect('produits:list')
+
+        except Exception as e:
+            messages.error(request, f'Erreur lors de la révision des prix : {str(e)}')
+            return self.get(request, *args, **kwargs)
+
+
 class CategorieListView(LoginRequiredMixin, ListView):
     model = Categorie
     template_name = 'produits/categorie_list.html'
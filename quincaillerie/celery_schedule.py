@@ -10,4 +10,32 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'core.tasks.generate_daily_report',
         'schedule': crontab(hour=18, minute=0),  # Tous les jours à 18h00
     },
+    'relayer-evenements-outbox': {
+        'task': 'core.tasks.relayer_evenements_outbox',
+        'schedule': crontab(),  # Toutes les minutes
+    },
+    'purger-evenements-outbox': {
+        'task': 'core.tasks.purger_evenements_outbox',
+        'schedule': crontab(hour=3, minute=0),  # Tous les jours à 3h00
+    },
+    'generer-derives-manquants': {
+        'task': 'core.tasks.generer_derives_manquants',
+        'schedule': crontab(minute='*/10'),  # Toutes les 10 minutes
+    },
+    'cloturer-stock-journalier': {
+        'task': 'stocks.tasks.cloturer_stock_journalier',
+        'schedule': crontab(hour=0, minute=30),  # Tous les jours à 00h30
+    },
+    'calculer-velocites-produits': {
+        'task': 'stocks.tasks.calculer_velocites_produits',
+        'schedule': crontab(hour=0, minute=45),  # Tous les jours à 00h45
+    },
+    'creer-partitions-stock': {
+        'task': 'stocks.tasks.creer_partitions_stock',
+        'schedule': crontab(hour=1, minute=0, day_of_week=1),  # Tous les lundis à 1h00
+    },
+    'archiver-mouvements-stock': {
+        'task': 'stocks.tasks.archiver_mouvements_stock',
+        'schedule': crontab(hour=2, minute=0, day_of_month=15, month_of_year=1),  # Le 15 janvier à 2h00
+    },
 }
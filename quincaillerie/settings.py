@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
-from decouple import config
+from decouple import Csv, config
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -184,6 +184,56 @@ CELERY_TIMEZONE = TIME_ZONE
 # Celery Beat Schedule
 from .celery_schedule import CELERY_BEAT_SCHEDULE
 
+# Archivage du journal des stocks : exercices conservés et dossier des archives
+STOCKS_ARCHIVAGE_ANNEES = config('STOCKS_ARCHIVAGE_ANNEES', default=5, cast=int)
+STOCKS_ARCHIVES_DIR = config('STOCKS_ARCHIVES_DIR', default=str(BASE_DIR / 'archives'))
+
+# Refuser les sorties de stock qui rendraient le stock négatif
+STOCKS_INTERDIRE_STOCK_NEGATIF = config('STOCKS_INTERDIRE_STOCK_NEGATIF', default=False, cast=bool)
+
+# Réapprovisionnement : nombre de jours de ventes couverts par une commande, en plus du délai de livraison
+STOCKS_REAPPRO_JOURS_COUVERTURE = config('STOCKS_REAPPRO_JOURS_COUVERTURE', default=30, cast=int)
+
+# Outbox des événements métier : taille des lots du relais, échecs tolérés par
+# événement avant abandon, et conservation des événements traités
+OUTBOX_TAILLE_LOT = config('OUTBOX_TAILLE_LOT', default=500, cast=int)
+OUTBOX_MAX_TENTATIVES = config('OUTBOX_MAX_TENTATIVES', default=10, cast=int)
+OUTBOX_RETENTION_JOURS = config('OUTBOX_RETENTION_JOURS', default=7, cast=int)
+
+# Recherche approchée (index Python hors PostgreSQL) : part minimale des trigrammes
+# recherchés présents dans un résultat
+RECHERCHE_SIMILARITE_MIN = config('RECHERCHE_SIMILARITE_MIN', default=0.6, cast=float)
+
+# Cache partagé entre les processus : Redis si CACHE_URL est défini
+# (ex. redis://localhost:6379/1), sinon mémoire locale
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+
+# Scan en caisse : cache partagé utilisé, durée de vie des fiches (secondes),
+# taille et durée de vie du cache local de chaque processus
+SCAN_CACHE = config('SCAN_CACHE', default='default')
+SCAN_CACHE_TTL = config('SCAN_CACHE_TTL', default=3600, cast=int)
+SCAN_CACHE_LOCAL_TAILLE = config('SCAN_CACHE_LOCAL_TAILLE', default=10000, cast=int)
+SCAN_CACHE_LOCAL_TTL = config('SCAN_CACHE_LOCAL_TTL', default=5, cast=int)
+
+# Autocomplétion des produits : durée de vie des pages en cache (secondes)
+AUTOCOMPLETE_CACHE_TTL = config('AUTOCOMPLETE_CACHE_TTL', default=30, cast=int)
+
+# Dérivés des images téléversées : largeurs des miniatures (pixels) et qualité WebP/JPEG
+IMAGES_LARGEURS = config('IMAGES_LARGEURS', default='160,320,640', cast=Csv(int))
+IMAGES_QUALITE = config('IMAGES_QUALITE', default=80, cast=int)
+
+# Import du catalogue : lignes par lot (une transaction par lot) et taille (octets)
+# en dessous de laquelle le fichier est traité pendant la requête plutôt que par Celery
+IMPORT_CATALOGUE_TAILLE_LOT = config('IMPORT_CATALOGUE_TAILLE_LOT', default=1000, cast=int)
+IMPORT_CATALOGUE_TAILLE_SYNCHRONE = config('IMPORT_CATALOGUE_TAILLE_SYNCHRONE', default=262144, cast=int)
+
 # Login URLs
 LOGIN_URL = '/utilisateurs/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
@@ -1,11 +1,16 @@
 from django.contrib import admin
-from .models import MouvementStock
+from django.db import transaction
+from .models import (
+    MouvementStock, SoldeStock, ClotureStock, AlerteStock, CoucheFifo, ValorisationCategorie,
+    InventaireSession, LigneInventaire, MouvementJournalier, VelociteProduit,
+    Emplacement, SoldeEmplacement
+)
 
 
 @admin.register(MouvementStock)
 class MouvementStockAdmin(admin.ModelAdmin):
     list_display = [
-        'produit', 'type_mouvement', 'quantite', 'motif', 
+        'produit', 'type_mouvement', 'quantite', 'motif', 'emplacement',
         'reference', 'prix_unitaire', 'valeur_totale', 'date_mouvement', 'is_active'
     ]
     list_filter = ['type_mouvement', 'motif', 'is_active', 'date_mouvement']
@@ -13,11 +18,24 @@ class MouvementStockAdmin(admin.ModelAdmin):
     list_editable = ['is_active']
     ordering = ['-date_mouvement']
     readonly_fields = ['valeur_totale']
+
+    def delete_queryset(self, request, queryset):
+        """
+        Suppression groupée mouvement par mouvement : delete() retire l'impact
+        de chacun sur les soldes, l'historique journalier et la valorisation,
+        que queryset.delete() ignorerait
+        """
+        with transaction.atomic():
+            for mouvement in queryset.select_related(None).order_by('pk'):
+                mouvement.delete()
     
     fieldsets = (
         ('Mouvement', {
             'fields': ('produit', 'type_mouvement', 'quantite', 'motif')
         }),
+        ('Emplacements', {
+            'fields': ('emplacement', 'emplacement_destination')
+        }),
         ('Informations', {
             'fields': ('reference', 'prix_unitaire', 'valeur_totale', 'date_mouvement')
         }),
@@ -31,3 +49,98 @@ class MouvementStockAdmin(admin.ModelAdmin):
             'fields': ('is_active',)
         })
     )
+
+
+@admin.register(SoldeStock)
+class SoldeStockAdmin(admin.ModelAdmin):
+    list_display = ['produit', 'quantite', 'cout_moyen', 'valeur_cmp', 'valeur_fifo', 'updated_at']
+    search_fields = ['produit__nom', 'produit__code_produit']
+    list_select_related = ['produit']
+    readonly_fields = ['produit', 'quantite', 'cout_moyen', 'valeur_cmp', 'valeur_fifo', 'updated_at']
+    ordering = ['quantite']
+
+
+@admin.register(Emplacement)
+class EmplacementAdmin(admin.ModelAdmin):
+    list_display = ['code', 'nom', 'type_emplacement', 'est_principal', 'is_active']
+    list_filter = ['type_emplacement', 'is_active']
+    search_fields = ['code', 'nom']
+
+
+@admin.register(SoldeEmplacement)
+class SoldeEmplacementAdmin(admin.ModelAdmin):
+    list_display = ['produit', 'emplacement', 'quantite', 'updated_at']
+    list_filter = ['emplacement']
+    search_fields = ['produit__nom', 'produit__code_produit']
+    list_select_related = ['produit', 'emplacement']
+    readonly_fields = ['produit', 'emplacement', 'quantite', 'updated_at']
+
+
+@admin.register(ClotureStock)
+class ClotureStockAdmin(admin.ModelAdmin):
+    list_display = ['produit', 'date', 'quantite']
+    list_filter = ['date']
+    search_fields = ['produit__nom', 'produit__code_produit']
+    list_select_related = ['produit']
+    readonly_fields = ['produit', 'date', 'quantite', 'fin_journee']
+    date_hierarchy = 'date'
+
+
+@admin.register(MouvementJournalier)
+class MouvementJournalierAdmin(admin.ModelAdmin):
+    list_display = ['produit', 'date', 'entrees', 'sorties']
+    list_filter = ['date']
+    search_fields = ['produit__nom', 'produit__code_produit']
+    list_select_related = ['produit']
+    readonly_fields = ['produit', 'date', 'entrees', 'sorties']
+    date_hierarchy = 'date'
+
+
+@admin.register(VelociteProduit)
+class VelociteProduitAdmin(admin.ModelAdmin):
+    list_display = ['produit', 'ventes_7j', 'ventes_30j', 'ventes_90j', 'couverture_jours', 'updated_at']
+    search_fields = ['produit__nom', 'produit__code_produit']
+    list_select_related = ['produit']
+    readonly_fields = ['produit', 'ventes_7j', 'ventes_30j', 'ventes_90j', 'couverture_jours', 'updated_at']
+    ordering = ['couverture_jours']
+
+
+@admin.register(AlerteStock)
+class AlerteStockAdmin(admin.ModelAdmin):
+    list_display = ['produit', 'stock_actuel', 'seuil', 'ecart', 'updated_at']
+    search_fields = ['produit__nom', 'produit__code_produit']
+    list_select_related = ['produit']
+    readonly_fields = ['produit', 'stock_actuel', 'seuil', 'ecart', 'updated_at']
+
+
+@admin.register(CoucheFifo)
+class CoucheFifoAdmin(admin.ModelAdmin):
+    list_display = ['produit', 'date_entree', 'quantite_restante', 'cout_unitaire']
+    search_fields = ['produit__nom', 'produit__code_produit']
+    list_select_related = ['produit']
+    readonly_fields = ['produit', 'mouvement_id', 'date_entree', 'quantite_restante', 'cout_unitaire']
+
+
+@admin.register(ValorisationCategorie)
+class ValorisationCategorieAdmin(admin.ModelAdmin):
+    list_display = ['categorie', 'valeur_cmp', 'valeur_fifo', 'updated_at']
+    list_select_related = ['categorie']
+    readonly_fields = ['categorie', 'valeur_cmp', 'valeur_fifo', 'updated_at']
+
+
+@admin.register(InventaireSession)
+class InventaireSessionAdmin(admin.ModelAdmin):
+    list_display = ['reference', 'statut', 'emplacement', 'created_at', 'date_validation', 'is_active']
+    list_filter = ['statut', 'emplacement', 'is_active']
+    search_fields = ['reference', 'commentaire']
+    readonly_fields = ['date_validation']
+
+
+@admin.register(LigneInventaire)
+class LigneInventaireAdmin(admin.ModelAdmin):
+    list_display = ['session', 'produit', 'quantite_comptee', 'stock_theorique', 'ecart']
+    list_filter = ['session']
+    search_fields = ['produit__nom', 'produit__code_produit']
+    list_select_related = ['session', 'produit']
+    raw_id_fields = ['produit']
+    readonly_fields = ['stock_theorique', 'ecart']
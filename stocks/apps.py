@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class StocksConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "stocks"
+
+    def ready(self):
+        # Enregistre les abonnés aux événements de l'outbox
+        from . import evenements  # noqa: F401
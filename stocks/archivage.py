@@ -0,0 +1,148 @@
+"""
+Archivage du journal des mouvements de stock
+
+Les mouvements antérieurs au début d'un exercice sont exportés dans un
+fichier NDJSON compressé puis remplacés, pour chaque produit et chaque
+emplacement, par un seul mouvement de solde d'ouverture. Le stock de
+chaque produit et de chaque emplacement est vérifié avant la validation
+de la transaction.
+"""
+import gzip
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import MouvementStock, SoldeEmplacement, SoldeStock
+
+MOTIF_OUVERTURE = 'SOLDE_OUVERTURE'
+
+
+class ArchivageError(Exception):
+    """
+    Les soldes recalculés après archivage ne correspondent pas aux soldes initiaux
+    """
+
+
+def date_limite(annees):
+    """
+    Début de l'exercice (année civile) à partir duquel les mouvements sont conservés
+    """
+    annee = timezone.localdate().year - annees
+    return timezone.make_aware(datetime(annee, 1, 1))
+
+
+def soldes_journal(queryset=None):
+    """
+    Stock par produit calculé à partir des mouvements actifs du journal
+    """
+    queryset = MouvementStock.objects.all() if queryset is None else queryset
+    return dict(
+        queryset.filter(is_active=True).values('produit_id').annotate(
+            total=models.Sum(models.Case(
+                models.When(type_mouvement='ENTREE', then=models.F('quantite')),
+                models.When(type_mouvement='SORTIE', then=-models.F('quantite')),
+                default=0,
+                output_field=models.IntegerField(),
+            ))
+        ).values_list('produit_id', 'total')
+    )
+
+
+def verifier(avant, apres):
+    """
+    Retourne les produits dont le stock diffère entre deux relevés
+    """
+    produits = set(avant) | set(apres)
+    return {
+        produit_id: (avant.get(produit_id) or 0, apres.get(produit_id) or 0)
+        for produit_id in produits
+        if (avant.get(produit_id) or 0) != (apres.get(produit_id) or 0)
+    }
+
+
+def archiver(annees, dossier=None, chunk_size=2000, dry_run=False):
+    """
+    Archive les mouvements de plus de `annees` exercices et les compacte en
+    soldes d'ouverture. Retourne un dictionnaire décrivant l'opération.
+    """
+    limite = date_limite(annees)
+    anciens = MouvementStock.objects.filter(date_mouvement__lt=limite)
+    resultat = {
+        'date_limite': limite,
+        'mouvements': anciens.count(),
+        'fichier': None,
+    }
+    if dry_run or not resultat['mouvements']:
+        resultat['ouvertures'] = sum(1 for total in SoldeEmplacement.totaux_journal(anciens).values() if total)
+        return resultat
+
+    dossier = Path(dossier or settings.STOCKS_ARCHIVES_DIR)
+    dossier.mkdir(parents=True, exist_ok=True)
+    fichier = dossier / f"mouvements_avant_{limite.date().isoformat()}_{timezone.now():%Y%m%d%H%M%S}.ndjson.gz"
+
+    try:
+        with transaction.atomic():
+            avant = soldes_journal()
+            avant_emplacements = SoldeEmplacement.totaux_journal()
+            # Un solde d'ouverture par produit et par emplacement
+            ouvertures = {
+                cle: total
+                for cle, total in SoldeEmplacement.totaux_journal(anciens).items()
+                if total
+            }
+
+            # Les soldes d'ouverture sont valorisés au coût moyen pondéré courant
+            couts = {
+                produit_id: cout_moyen.quantize(Decimal('0.01'))
+                for produit_id, cout_moyen in SoldeStock.objects.filter(
+                    produit_id__in={produit_id for produit_id, _ in ouvertures}, cout_moyen__gt=0
+                ).values_list('produit_id', 'cout_moyen')
+            }
+
+            dernier_id = None
+            with gzip.open(fichier, 'wt', encoding='utf-8') as sortie:
+                for ligne in anciens.order_by('id').values().iterator(chunk_size=chunk_size):
+                    sortie.write(json.dumps(ligne, default=str) + '\n')
+                    dernier_id = ligne['id']
+            anciens.filter(id__lte=dernier_id).delete()
+
+            # bulk_create ne passe pas par save() : les soldes matérialisés restent inchangés
+            date_ouverture = limite - timedelta(seconds=1)
+            MouvementStock.objects.bulk_create(
+                [
+                    MouvementStock(
+                        produit_id=produit_id,
+                        emplacement_id=emplacement_id,
+                        type_mouvement='ENTREE' if total > 0 else 'SORTIE',
+                        quantite=abs(total),
+                        motif=MOTIF_OUVERTURE,
+                        prix_unitaire=couts.get(produit_id),
+                        reference=f"ARCHIVE-{limite.year}",
+                        commentaire=f"Solde d'ouverture au {limite.date().strftime('%d/%m/%Y')}",
+                        date_mouvement=date_ouverture,
+                    )
+                    for (produit_id, emplacement_id), total in ouvertures.items()
+                ],
+                batch_size=chunk_size,
+            )
+
+            # Vérification : le stock de chaque produit doit être inchangé
+            ecarts = verifier(avant, soldes_journal())
+            ecarts.update(verifier(avant_emplacements, SoldeEmplacement.totaux_journal()))
+            if ecarts:
+                raise ArchivageError(ecarts)
+    except BaseException:
+        fichier.unlink(missing_ok=True)
+        raise
+
+    resultat.update({
+        'fichier': str(fichier),
+        'ouvertures': len(ouvertures),
+        'produits_verifies': len(avant),
+    })
+    return resultat
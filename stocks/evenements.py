@@ -0,0 +1,15 @@
+"""
+Abonnés du module stocks aux événements de l'outbox (voir core.outbox)
+"""
+from core.outbox import abonner
+
+from .models import VelociteProduit
+
+
+@abonner('stocks.mouvementstock')
+def actualiser_couverture(evenement):
+    """
+    La couverture en jours suit le stock entre deux calculs nocturnes des vélocités
+    """
+    produit_ids = {evenement.donnees['produit_id'], evenement.donnees.get('ancien_produit_id')}
+    VelociteProduit.actualiser_couverture(produit_ids - {None})
@@ -0,0 +1,136 @@
+"""
+Export en flux du journal des mouvements de stock
+
+Les lignes sont lues par paquets avec `iterator(chunk_size=...)` (curseur
+côté serveur sur PostgreSQL) et écrites au fil de l'eau : la mémoire reste
+constante quel que soit le nombre de mouvements.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import MouvementStock
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+COLONNES = [
+    ('id', 'id'),
+    ('date_mouvement', 'date'),
+    ('produit__code_produit', 'code_produit'),
+    ('produit__nom', 'produit'),
+    ('type_mouvement', 'type'),
+    ('motif', 'motif'),
+    ('emplacement__code', 'emplacement'),
+    ('emplacement_destination__code', 'emplacement_destination'),
+    ('quantite', 'quantite'),
+    ('prix_unitaire', 'prix_unitaire'),
+    ('reference', 'reference'),
+    ('fournisseur__nom', 'fournisseur'),
+    ('client', 'client'),
+    ('commentaire', 'commentaire'),
+]
+
+
+def _debut_journee(jour):
+    return timezone.make_aware(datetime.combine(jour, time.min))
+
+
+def filtrer_mouvements(params, queryset=None):
+    """
+    Applique les filtres de la liste des mouvements (search, type_mouvement,
+    motif, emplacement, date_debut, date_fin au format AAAA-MM-JJ) à un queryset
+    """
+    if queryset is None:
+        queryset = MouvementStock.objects.filter(is_active=True)
+
+    search = params.get('search')
+    if search:
+        queryset = queryset.filter(
+            Q(produit__nom__icontains=search) |
+            Q(produit__code_produit__icontains=search) |
+            Q(reference__icontains=search) |
+            Q(commentaire__icontains=search)
+        )
+
+    type_mouvement = params.get('type_mouvement')
+    if type_mouvement:
+        queryset = queryset.filter(type_mouvement=type_mouvement)
+
+    motif = params.get('motif')
+    if motif:
+        queryset = queryset.filter(motif=motif)
+
+    # Un transfert concerne ses deux emplacements ; un identifiant invalide est ignoré
+    emplacement = (params.get('emplacement') or '').strip()
+    if emplacement.isdigit():
+        queryset = queryset.filter(
+            Q(emplacement_id=emplacement) | Q(emplacement_destination_id=emplacement)
+        )
+
+    # Bornes sur la colonne elle-même (et non sur __date) pour utiliser les index
+    date_debut = parse_date(params.get('date_debut') or '')
+    if date_debut:
+        queryset = queryset.filter(date_mouvement__gte=_debut_journee(date_debut))
+
+    date_fin = parse_date(params.get('date_fin') or '')
+    if date_fin:
+        queryset = queryset.filter(date_mouvement__lt=_debut_journee(date_fin + timedelta(days=1)))
+
+    return queryset
+
+
+class _Tampon:
+    """
+    Pseudo-fichier dont write() retourne la ligne au lieu de la stocker
+    """
+
+    def write(self, valeur):
+        return valeur
+
+
+def _lignes(queryset, chunk_size):
+    champs = [champ for champ, _ in COLONNES]
+    return queryset.order_by('date_mouvement', 'id').values_list(*champs).iterator(chunk_size=chunk_size)
+
+
+def _valeur(valeur):
+    if isinstance(valeur, datetime):
+        return valeur.isoformat()
+    return valeur
+
+
+def lignes_csv(queryset, chunk_size=2000):
+    """
+    Génère l'export CSV (séparateur « ; », avec BOM pour les tableurs) ligne par ligne
+    """
+    writer = csv.writer(_Tampon(), delimiter=';')
+    yield '\ufeff' + writer.writerow([nom for _, nom in COLONNES])
+    for ligne in _lignes(queryset, chunk_size):
+        yield writer.writerow([_valeur(valeur) for valeur in ligne])
+
+
+def lignes_ndjson(queryset, chunk_size=2000):
+    """
+    Génère l'export NDJSON : un objet JSON par ligne
+    """
+    noms = [nom for _, nom in COLONNES]
+    for ligne in _lignes(queryset, chunk_size):
+        yield json.dumps(
+            dict(zip(noms, map(_valeur, ligne))), default=str, ensure_ascii=False
+        ) + '\n'
+
+
+def exporter(queryset, format='csv', chunk_size=2000):
+    """
+    Retourne le générateur de lignes correspondant au format demandé
+    """
+    if format == 'ndjson':
+        return lignes_ndjson(queryset, chunk_size)
+    return lignes_csv(queryset, chunk_size)
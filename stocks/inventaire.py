@@ -0,0 +1,211 @@
+"""
+Inventaire physique par sessions
+
+Les comptages (fichier CSV d'un scanner ou lots JSON) sont agrégés par code
+produit et enregistrés en une seule requête par lot. À la validation, les
+écarts avec les soldes sont calculés en une requête, puis les mouvements
+d'ajustement sont insérés avec bulk_create dans une seule transaction, et
+les soldes, l'historique et la valorisation sont mis à jour par lot.
+"""
+import csv
+import io
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core import outbox
+from produits import scan
+from .models import (
+    AlerteStock, Emplacement, InventaireSession, LigneInventaire, MouvementJournalier, MouvementStock,
+    SoldeEmplacement, SoldeStock
+)
+from .services import verrouiller_soldes
+
+MOTIF_INVENTAIRE = 'AJUSTEMENT_INVENTAIRE'
+
+
+class InventaireError(Exception):
+    """
+    Comptage invalide ou session d'inventaire non modifiable
+    """
+
+
+def lire_csv(fichier):
+    """
+    Lit un export de scanner : une ligne par code produit, suivie
+    éventuellement de la quantité (1 par défaut). Une ligne d'en-tête est
+    ignorée. Retourne un dictionnaire {code: quantité} agrégé.
+    """
+    contenu = fichier.read()
+    if isinstance(contenu, bytes):
+        contenu = contenu.decode('utf-8-sig')
+    debut = contenu[:2048]
+    separateur = next((sep for sep in ';\t,' if sep in debut), ';')
+
+    comptages = {}
+    for numero, ligne in enumerate(csv.reader(io.StringIO(contenu), delimiter=separateur), start=1):
+        ligne = [cellule.strip() for cellule in ligne]
+        if not ligne or not ligne[0]:
+            continue
+        code = ligne[0]
+        quantite = ligne[1] if len(ligne) > 1 and ligne[1] else '1'
+        try:
+            quantite = int(quantite)
+        except ValueError:
+            if numero == 1:
+                continue  # en-tête
+            raise InventaireError(f"Ligne {numero} : quantité invalide « {quantite} »")
+        if quantite < 0:
+            raise InventaireError(f"Ligne {numero} : quantité négative pour {code}")
+        comptages[code] = comptages.get(code, 0) + quantite
+    return comptages
+
+
+def lire_json(donnees):
+    """
+    Lit un lot JSON : liste (ou clé "lignes") d'objets {"code", "quantite"}
+    """
+    if isinstance(donnees, dict):
+        donnees = donnees.get('lignes', [])
+    if not isinstance(donnees, list):
+        raise InventaireError("Le lot doit être une liste de lignes")
+
+    comptages = {}
+    for numero, ligne in enumerate(donnees, start=1):
+        try:
+            code = str(ligne['code']).strip()
+            quantite = int(ligne.get('quantite', 1))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise InventaireError(f"Ligne {numero} : code ou quantité invalide")
+        if quantite < 0:
+            raise InventaireError(f"Ligne {numero} : quantité négative pour {code}")
+        comptages[code] = comptages.get(code, 0) + quantite
+    return comptages
+
+
+def enregistrer_comptages(session, comptages, remplacer=False):
+    """
+    Enregistre un lot de comptages dans la session. Par défaut les quantités
+    s'ajoutent à celles déjà comptées (plusieurs scans d'un même produit) ;
+    avec `remplacer=True` elles les remplacent.
+    Retourne (nombre de lignes enregistrées, codes inconnus).
+    """
+    from produits.models import Produit
+
+    if not session.est_ouverte:
+        raise InventaireError("La session d'inventaire n'est plus ouverte")
+
+    produits = dict(
+        Produit.objects.filter(code_produit__in=comptages, is_active=True).values_list('code_produit', 'pk')
+    )
+    inconnus = sorted(set(comptages) - set(produits))
+
+    with transaction.atomic():
+        deja_comptees = {}
+        if not remplacer:
+            deja_comptees = dict(
+                session.lignes.select_for_update().filter(
+                    produit_id__in=produits.values()
+                ).values_list('produit_id', 'quantite_comptee')
+            )
+        LigneInventaire.objects.bulk_create(
+            [
+                LigneInventaire(
+                    session=session,
+                    produit_id=produit_id,
+                    quantite_comptee=deja_comptees.get(produit_id, 0) + comptages[code],
+                )
+                for code, produit_id in produits.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['session', 'produit'],
+            update_fields=['quantite_comptee', 'updated_at'],
+            batch_size=1000,
+        )
+    return len(produits), inconnus
+
+
+def lignes_avec_ecart(session):
+    """
+    Lignes de la session annotées du stock théorique courant et de l'écart
+    """
+    if session.emplacement_id:
+        stock = Coalesce(models.Subquery(
+            SoldeEmplacement.objects.filter(
+                produit=models.OuterRef('produit'), emplacement_id=session.emplacement_id
+            ).values('quantite')[:1]
+        ), 0)
+    else:
+        stock = Coalesce('produit__solde__quantite', 0)
+    return session.lignes.annotate(
+        stock=stock,
+        ecart_courant=models.F('quantite_comptee') - stock,
+    )
+
+
+@transaction.atomic
+def valider(session):
+    """
+    Enregistre les ajustements de la session : une entrée ou une sortie
+    (motif inventaire) par produit dont le comptage diffère du solde.
+    Retourne le nombre de mouvements créés.
+    """
+    session = InventaireSession.objects.select_for_update().get(pk=session.pk)
+    if not session.est_ouverte:
+        raise InventaireError("La session d'inventaire n'est plus ouverte")
+
+    produit_ids = list(session.lignes.values_list('produit_id', flat=True))
+    # Aucune vente ne peut modifier ces soldes avant la fin de la transaction
+    verrouiller_soldes(produit_ids)
+
+    lignes = list(lignes_avec_ecart(session))
+    couts = {
+        produit_id: cout_moyen.quantize(Decimal('0.01'))
+        for produit_id, cout_moyen in SoldeStock.objects.filter(
+            produit_id__in=produit_ids, cout_moyen__gt=0
+        ).values_list('produit_id', 'cout_moyen')
+    }
+    maintenant = timezone.now()
+    emplacement_id = session.emplacement_id or Emplacement.principal_id()
+    mouvements = []
+    for ligne in lignes:
+        ligne.stock_theorique = ligne.stock
+        ligne.ecart = ligne.ecart_courant
+        if not ligne.ecart:
+            continue
+        mouvements.append(MouvementStock(
+            produit_id=ligne.produit_id,
+            # Le type AJUSTEMENT ne modifie pas le stock : l'écart est une entrée ou une sortie
+            type_mouvement='ENTREE' if ligne.ecart > 0 else 'SORTIE',
+            quantite=abs(ligne.ecart),
+            motif=MOTIF_INVENTAIRE,
+            prix_unitaire=couts.get(ligne.produit_id),
+            reference=session.reference,
+            emplacement_id=emplacement_id,
+            commentaire=f"Inventaire {session.reference} : compté {ligne.quantite_comptee}, théorique {ligne.stock}",
+            date_mouvement=maintenant,
+        ))
+
+    MouvementStock.objects.bulk_create(mouvements, batch_size=1000)
+    # bulk_create ne passe pas par save() : soldes, historique, valorisation et alertes sont mis à jour ici
+    SoldeStock.enregistrer(mouvements)
+    SoldeEmplacement.enregistrer(mouvements)
+    MouvementJournalier.enregistrer(mouvements)
+    outbox.publier_lot(
+        (mouvement, 'CREATION', mouvement.donnees_evenement()) for mouvement in mouvements
+    )
+    LigneInventaire.objects.bulk_update(lignes, ['stock_theorique', 'ecart'], batch_size=1000)
+
+    ajustes = [mouvement.produit_id for mouvement in mouvements]
+    if ajustes:
+        from . import valorisation
+        valorisation.appliquer_mouvements(mouvements)
+        AlerteStock.synchroniser(ajustes)
+        scan.invalider_apres_commit(ajustes)
+
+    session.statut = 'VALIDEE'
+    session.date_validation = maintenant
+    session.save(update_fields=['statut', 'date_validation', 'updated_at'])
+    return len(mouvements)
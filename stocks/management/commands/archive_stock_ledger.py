@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks import archivage
+from stocks.models import SoldeStock
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive les mouvements de stock des anciens exercices dans un fichier "
+        "NDJSON compressé et les remplace par un solde d'ouverture par produit"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--annees',
+            type=int,
+            default=settings.STOCKS_ARCHIVAGE_ANNEES,
+            help="Nombre d'exercices précédents à conserver dans le journal"
+        )
+        parser.add_argument(
+            '--dossier',
+            default=None,
+            help="Dossier de destination des archives"
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Affiche ce qui serait archivé sans rien modifier"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            resultat = archivage.archiver(
+                options['annees'], dossier=options['dossier'], dry_run=options['dry_run']
+            )
+        except archivage.ArchivageError as e:
+            raise CommandError(f"Archivage annulé, soldes modifiés : {e}")
+
+        limite = resultat['date_limite'].strftime('%d/%m/%Y')
+        self.stdout.write(
+            f"{resultat['mouvements']} mouvements antérieurs au {limite}, "
+            f"{resultat['ouvertures']} soldes d'ouverture"
+        )
+        if not resultat['fichier']:
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"Archive écrite : {resultat['fichier']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Vérification : stock inchangé pour {resultat['produits_verifies']} produits"
+        ))
+
+        # Contrôle complémentaire avec les soldes matérialisés
+        ecarts = archivage.verifier(
+            dict(SoldeStock.objects.values_list('produit_id', 'quantite')),
+            archivage.soldes_journal(),
+        )
+        if ecarts:
+            self.stdout.write(self.style.WARNING(
+                f"{len(ecarts)} soldes matérialisés diffèrent du journal : "
+                f"lancer rebuild_stock_balances"
+            ))
@@ -0,0 +1,145 @@
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from produits.models import Categorie, Produit
+from stocks.models import ClotureStock, Emplacement, MouvementStock
+
+
+class Command(BaseCommand):
+    help = (
+        "Affiche le plan d'exécution et la durée des requêtes fréquentes sur les "
+        "mouvements de stock. Lancer avant et après `migrate stocks 0005` pour "
+        "comparer les plans avec et sans index ; --seed génère un journal de test "
+        "(hors DEBUG, avec --confirmer)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help="Nombre de mouvements de test à générer avant la mesure (ex. 5000000)"
+        )
+        parser.add_argument(
+            '--produits',
+            type=int,
+            default=2000,
+            help="Nombre de produits de test sur lesquels répartir les mouvements"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help="Taille des lots d'insertion"
+        )
+        parser.add_argument(
+            '--confirmer',
+            action='store_true',
+            help="Autorise --seed hors DEBUG : les mouvements générés s'ajoutent au vrai journal"
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            if not (settings.DEBUG or options['confirmer']):
+                raise CommandError(
+                    "--seed écrit des produits et des mouvements dans la base : "
+                    "refusé hors DEBUG sans --confirmer"
+                )
+            self.seed(options['seed'], options['produits'], options['batch_size'])
+
+        produit = Produit.objects.filter(mouvements_stock__isnull=False).first()
+        if produit is None:
+            self.stdout.write(self.style.WARNING("Aucun mouvement de stock : utilisez --seed"))
+            return
+
+        debut_jour = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        requetes = {
+            'Stock d\'un produit depuis le journal': MouvementStock.objects.filter(
+                produit=produit, is_active=True
+            ).values('type_mouvement').annotate(total=Sum('quantite')),
+            'Mouvements récents (tableau de bord)': MouvementStock.objects.filter(
+                is_active=True
+            ).order_by('-date_mouvement')[:10],
+            'Historique d\'un produit': MouvementStock.objects.filter(
+                produit=produit, is_active=True
+            ).order_by('-date_mouvement')[:50],
+            'Ventes du jour (rapport quotidien)': MouvementStock.objects.filter(
+                type_mouvement='SORTIE',
+                motif='VENTE',
+                date_mouvement__gte=debut_jour,
+                date_mouvement__lt=debut_jour + timedelta(days=1),
+                is_active=True,
+            ),
+        }
+
+        self.stdout.write(f"Base : {connection.vendor} - {MouvementStock.objects.count()} mouvements")
+        for titre, queryset in requetes.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{titre}"))
+            self.stdout.write(queryset.explain())
+            debut = time.perf_counter()
+            list(queryset)
+            duree = (time.perf_counter() - debut) * 1000
+            self.stdout.write(self.style.SUCCESS(f"Durée : {duree:.1f} ms"))
+
+    def seed(self, total, nb_produits, batch_size):
+        """
+        Génère des produits et un journal de mouvements aléatoires
+        """
+        categorie, _ = Categorie.objects.get_or_create(nom="Benchmark")
+        Produit.objects.bulk_create(
+            [
+                Produit(
+                    code_produit=f"BENCH-{i:06d}",
+                    nom=f"Produit benchmark {i}",
+                    categorie=categorie,
+                    prix_achat=1,
+                    prix_vente=2,
+                )
+                for i in range(nb_produits)
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        produit_ids = list(
+            Produit.objects.filter(categorie=categorie).values_list('id', flat=True)
+        )
+
+        maintenant = timezone.now()
+        emplacement_id = Emplacement.principal_id()
+        types = ['ENTREE', 'SORTIE', 'SORTIE', 'AJUSTEMENT']
+        motifs = {'ENTREE': 'ACHAT', 'SORTIE': 'VENTE', 'AJUSTEMENT': 'AJUSTEMENT_INVENTAIRE'}
+        crees = 0
+        while crees < total:
+            lot = []
+            for _ in range(min(batch_size, total - crees)):
+                type_mouvement = random.choice(types)
+                lot.append(MouvementStock(
+                    produit_id=random.choice(produit_ids),
+                    type_mouvement=type_mouvement,
+                    quantite=random.randint(1, 50),
+                    motif=motifs[type_mouvement],
+                    prix_unitaire=2,
+                    emplacement_id=emplacement_id,
+                    is_active=random.random() > 0.02,
+                    date_mouvement=maintenant - timedelta(minutes=random.randint(0, 5 * 365 * 24 * 60)),
+                ))
+            MouvementStock.objects.bulk_create(lot)
+            crees += len(lot)
+            self.stdout.write(f"{crees}/{total} mouvements générés", ending='\r')
+        self.stdout.write('')
+
+        # bulk_create ne passe pas par save() : toutes les tables dérivées du journal sont
+        # recalculées (soldes, emplacements et alertes, historique, valorisation) et les
+        # clôtures des produits générés, faussées par les mouvements antidatés, supprimées
+        ClotureStock.objects.filter(produit_id__in=produit_ids).delete()
+        call_command('rebuild_stock_balances', stdout=self.stdout)
+        call_command('rebuild_stock_history', stdout=self.stdout)
+        call_command('rebuild_stock_valuation', stdout=self.stdout)
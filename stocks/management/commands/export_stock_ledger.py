@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from stocks.export import FORMATS, exporter, filtrer_mouvements
+
+
+class Command(BaseCommand):
+    help = "Exporte en flux le journal des mouvements de stock (CSV ou NDJSON)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=sorted(FORMATS),
+            default='csv',
+            help="Format de l'export"
+        )
+        parser.add_argument(
+            '--sortie',
+            help="Fichier de destination (sortie standard par défaut)"
+        )
+        parser.add_argument('--search', help="Recherche sur le produit, la référence ou le commentaire")
+        parser.add_argument('--type-mouvement', help="Type de mouvement (ENTREE, SORTIE...)")
+        parser.add_argument('--motif', help="Motif du mouvement")
+        parser.add_argument('--emplacement', help="Identifiant de l'emplacement (origine ou destination)")
+        parser.add_argument('--date-debut', help="Premier jour inclus (AAAA-MM-JJ)")
+        parser.add_argument('--date-fin', help="Dernier jour inclus (AAAA-MM-JJ)")
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help="Nombre de lignes lues par paquet"
+        )
+
+    def handle(self, *args, **options):
+        queryset = filtrer_mouvements(options)
+        lignes = exporter(queryset, options['format'], options['chunk_size'])
+
+        if not options['sortie']:
+            for ligne in lignes:
+                self.stdout.write(ligne, ending='')
+            return
+
+        total = 0
+        with open(options['sortie'], 'w', encoding='utf-8', newline='') as fichier:
+            for ligne in lignes:
+                fichier.write(ligne)
+                total += 1
+        if options['format'] == 'csv':
+            total -= 1  # en-tête
+        self.stdout.write(self.style.SUCCESS(f"{total} mouvements exportés dans {options['sortie']}"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stocks import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Convertit la table des mouvements de stock en table partitionnée par mois "
+        "(PostgreSQL uniquement). La table est verrouillée pendant la conversion."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mois-a-venir',
+            type=int,
+            default=3,
+            help="Nombre de partitions mensuelles à créer à l'avance"
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.est_supporte():
+            raise CommandError(
+                "Le partitionnement n'est disponible que sur PostgreSQL ; "
+                "la table des mouvements reste une table simple."
+            )
+        if partitions.est_partitionnee():
+            total = partitions.creer_partitions(options['mois_a_venir'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Table déjà partitionnée : {total} partitions à venir vérifiées"
+            ))
+            return
+
+        partitions.partitionner(options['mois_a_venir'])
+        self.stdout.write(self.style.SUCCESS("Table des mouvements de stock partitionnée par mois"))
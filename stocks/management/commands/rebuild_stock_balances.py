@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from stocks.models import SoldeStock, SoldeEmplacement, AlerteStock
+
+
+class Command(BaseCommand):
+    help = "Recalcule les soldes de stock de tous les produits à partir des mouvements"
+
+    def handle(self, *args, **options):
+        total = SoldeStock.reconstruire()
+        self.stdout.write(self.style.SUCCESS(f"{total} soldes de stock recalculés"))
+        total = SoldeEmplacement.reconstruire()
+        self.stdout.write(self.style.SUCCESS(f"{total} soldes par emplacement recalculés"))
+        self.stdout.write(self.style.SUCCESS(f"{AlerteStock.objects.count()} alertes de stock"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from stocks.models import MouvementJournalier
+
+
+class Command(BaseCommand):
+    help = "Recalcule l'historique journalier du stock à partir des mouvements"
+
+    def handle(self, *args, **options):
+        total = MouvementJournalier.reconstruire()
+        self.stdout.write(self.style.SUCCESS(f"{total} journées d'historique recalculées"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from stocks import valorisation
+from stocks.models import ValorisationCategorie
+
+
+class Command(BaseCommand):
+    help = "Recalcule la valorisation du stock (CMP et FIFO) à partir du journal des mouvements"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=500,
+            help="Nombre de produits recalculés par transaction"
+        )
+
+    def handle(self, *args, **options):
+        total = valorisation.reconstruire(options['taille_lot'])
+        valeur = ValorisationCategorie.valeur_boutique()
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} produits revalorisés - valeur du stock : "
+            f"{valeur['valeur_cmp']} (CMP), {valeur['valeur_fifo']} (FIFO)"
+        ))
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def initialiser_soldes(apps, schema_editor):
+    Produit = apps.get_model("produits", "Produit")
+    MouvementStock = apps.get_model("stocks", "MouvementStock")
+    SoldeStock = apps.get_model("stocks", "SoldeStock")
+
+    totaux = dict(
+        MouvementStock.objects.filter(is_active=True)
+        .values("produit_id")
+        .annotate(
+            total=models.Sum(
+                models.Case(
+                    models.When(type_mouvement="ENTREE", then=models.F("quantite")),
+                    models.When(type_mouvement="SORTIE", then=-models.F("quantite")),
+                    default=0,
+                    output_field=models.IntegerField(),
+                )
+            )
+        )
+        .values_list("produit_id", "total")
+    )
+    SoldeStock.objects.bulk_create(
+        [
+            SoldeStock(produit_id=produit_id, quantite=totaux.get(produit_id) or 0)
+            for produit_id in Produit.objects.values_list("id", flat=True)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("produits", "0001_initial"),
+        ("stocks", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SoldeStock",
+            fields=[
+                (
+                    "produit",
+                    models.OneToOneField(
+                        help_text="Produit concerné par le solde",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="solde",
+                        serialize=False,
+                        to="produits.produit",
+                        verbose_name="Produit",
+                    ),
+                ),
+                (
+                    "quantite",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Entrées moins sorties actives du produit",
+                        verbose_name="Quantité en stock",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Date de modification"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Solde de stock",
+                "verbose_name_plural": "Soldes de stock",
+            },
+        ),
+        migrations.RunPython(initialiser_soldes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def initialiser_alertes(apps, schema_editor):
+    Produit = apps.get_model("produits", "Produit")
+    AlerteStock = apps.get_model("stocks", "AlerteStock")
+
+    produits = (
+        Produit.objects.filter(is_active=True)
+        .annotate(stock=Coalesce(models.F("solde__quantite"), 0))
+        .filter(stock__lte=models.F("seuil_alerte"))
+        .values("id", "stock", "seuil_alerte")
+    )
+    AlerteStock.objects.bulk_create(
+        [
+            AlerteStock(
+                produit_id=produit["id"],
+                stock_actuel=produit["stock"],
+                seuil=produit["seuil_alerte"],
+                ecart=produit["seuil_alerte"] - produit["stock"],
+            )
+            for produit in produits
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("produits", "0001_initial"),
+        ("stocks", "0002_soldestock"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AlerteStock",
+            fields=[
+                (
+                    "produit",
+                    models.OneToOneField(
+                        help_text="Produit en alerte de stock",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="alerte",
+                        serialize=False,
+                        to="produits.produit",
+                        verbose_name="Produit",
+                    ),
+                ),
+                (
+                    "stock_actuel",
+                    models.IntegerField(
+                        help_text="Stock du produit au moment de l'alerte",
+                        verbose_name="Stock actuel",
+                    ),
+                ),
+                (
+                    "seuil",
+                    models.PositiveIntegerField(
+                        help_text="Seuil d'alerte du produit",
+                        verbose_name="Seuil d'alerte",
+                    ),
+                ),
+                (
+                    "ecart",
+                    models.IntegerField(
+                        db_index=True,
+                        help_text="Quantité manquante pour revenir au seuil",
+                        verbose_name="Écart au seuil",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Date de modification"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Alerte de stock",
+                "verbose_name_plural": "Alertes de stock",
+                "ordering": ["-ecart"],
+            },
+        ),
+        migrations.RunPython(initialiser_alertes, migrations.RunPython.noop),
+    ]
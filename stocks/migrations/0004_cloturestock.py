@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("produits", "0001_initial"),
+        ("stocks", "0003_alertestock"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClotureStock",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "date",
+                    models.DateField(
+                        help_text="Jour de la clôture", verbose_name="Date"
+                    ),
+                ),
+                (
+                    "quantite",
+                    models.IntegerField(
+                        help_text="Stock du produit en fin de journée",
+                        verbose_name="Quantité en stock",
+                    ),
+                ),
+                (
+                    "produit",
+                    models.ForeignKey(
+                        help_text="Produit concerné par la clôture",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="clotures_stock",
+                        to="produits.produit",
+                        verbose_name="Produit",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Clôture de stock",
+                "verbose_name_plural": "Clôtures de stock",
+                "ordering": ["-date"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("produit", "date"), name="unique_cloture_produit_date"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fournisseurs", "0001_initial"),
+        ("produits", "0001_initial"),
+        ("stocks", "0004_cloturestock"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="mouvementstock",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["produit", "type_mouvement", "quantite"],
+                name="mvt_produit_type_actif_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="mouvementstock",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["produit", "date_mouvement"],
+                name="mvt_produit_date_actif_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="mouvementstock",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["-date_mouvement"],
+                name="mvt_date_actif_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="mouvementstock",
+            index=models.Index(
+                fields=["type_mouvement", "motif", "date_mouvement"],
+                name="mvt_type_motif_date_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stocks", "0005_mouvementstock_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="mouvementstock",
+            name="motif",
+            field=models.CharField(
+                choices=[
+                    ("ACHAT", "Achat"),
+                    ("VENTE", "Vente"),
+                    ("AJUSTEMENT_INVENTAIRE", "Ajustement inventaire"),
+                    ("RETOUR_CLIENT", "Retour client"),
+                    ("RETOUR_FOURNISSEUR", "Retour fournisseur"),
+                    ("CASSAGE", "Cassage"),
+                    ("PERDU", "Perdu"),
+                    ("VOL", "Vol"),
+                    ("DON", "Don"),
+                    ("SOLDE_OUVERTURE", "Solde d'ouverture"),
+                ],
+                help_text="Motif du mouvement",
+                max_length=30,
+                verbose_name="Motif",
+            ),
+        ),
+    ]
@@ -0,0 +1,162 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("produits", "0001_initial"),
+        ("stocks", "0006_mouvementstock_motif_ouverture"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ValorisationCategorie",
+            fields=[
+                (
+                    "categorie",
+                    models.OneToOneField(
+                        help_text="Catégorie valorisée",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="valorisation",
+                        serialize=False,
+                        to="produits.categorie",
+                        verbose_name="Catégorie",
+                    ),
+                ),
+                (
+                    "valeur_cmp",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Valeur du stock de la catégorie au coût moyen pondéré",
+                        max_digits=18,
+                        verbose_name="Valeur au CMP",
+                    ),
+                ),
+                (
+                    "valeur_fifo",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Valeur du stock de la catégorie selon les couches FIFO",
+                        max_digits=18,
+                        verbose_name="Valeur FIFO",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Date de modification"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Valorisation de catégorie",
+                "verbose_name_plural": "Valorisations de catégorie",
+            },
+        ),
+        migrations.AddField(
+            model_name="soldestock",
+            name="cout_moyen",
+            field=models.DecimalField(
+                decimal_places=4,
+                default=0,
+                help_text="Coût unitaire moyen pondéré du stock",
+                max_digits=14,
+                verbose_name="Coût moyen pondéré",
+            ),
+        ),
+        migrations.AddField(
+            model_name="soldestock",
+            name="valeur_cmp",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                help_text="Valeur du stock au coût moyen pondéré",
+                max_digits=16,
+                verbose_name="Valeur au CMP",
+            ),
+        ),
+        migrations.AddField(
+            model_name="soldestock",
+            name="valeur_fifo",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                help_text="Valeur du stock selon les couches FIFO restantes",
+                max_digits=16,
+                verbose_name="Valeur FIFO",
+            ),
+        ),
+        migrations.CreateModel(
+            name="CoucheFifo",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "mouvement_id",
+                    models.BigIntegerField(
+                        blank=True,
+                        help_text="Identifiant du mouvement d'entrée à l'origine de la couche",
+                        null=True,
+                        verbose_name="Mouvement d'entrée",
+                    ),
+                ),
+                (
+                    "date_entree",
+                    models.DateTimeField(
+                        help_text="Date du mouvement d'entrée",
+                        verbose_name="Date d'entrée",
+                    ),
+                ),
+                (
+                    "quantite_restante",
+                    models.PositiveIntegerField(
+                        help_text="Quantité de l'entrée non encore sortie",
+                        verbose_name="Quantité restante",
+                    ),
+                ),
+                (
+                    "cout_unitaire",
+                    models.DecimalField(
+                        decimal_places=2,
+                        help_text="Coût unitaire de l'entrée",
+                        max_digits=10,
+                        verbose_name="Coût unitaire",
+                    ),
+                ),
+                (
+                    "produit",
+                    models.ForeignKey(
+                        help_text="Produit concerné par la couche",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="couches_fifo",
+                        to="produits.produit",
+                        verbose_name="Produit",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Couche FIFO",
+                "verbose_name_plural": "Couches FIFO",
+                "ordering": ["date_entree", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["produit", "date_entree", "id"],
+                        name="couche_fifo_produit_date_idx",
+                    )
+                ],
+            },
+        ),
+    ]
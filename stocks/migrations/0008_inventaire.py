@@ -0,0 +1,175 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("produits", "0001_initial"),
+        ("stocks", "0007_valorisation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InventaireSession",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Date et heure de création de l'enregistrement",
+                        verbose_name="Date de création",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="Date et heure de dernière modification",
+                        verbose_name="Date de modification",
+                    ),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(
+                        default=True,
+                        help_text="Indique si l'enregistrement est actif",
+                        verbose_name="Actif",
+                    ),
+                ),
+                (
+                    "reference",
+                    models.CharField(
+                        help_text="Référence de la session d'inventaire",
+                        max_length=50,
+                        unique=True,
+                        verbose_name="Référence",
+                    ),
+                ),
+                (
+                    "statut",
+                    models.CharField(
+                        choices=[
+                            ("OUVERTE", "Ouverte"),
+                            ("VALIDEE", "Validée"),
+                            ("ANNULEE", "Annulée"),
+                        ],
+                        default="OUVERTE",
+                        help_text="Statut de la session",
+                        max_length=10,
+                        verbose_name="Statut",
+                    ),
+                ),
+                (
+                    "commentaire",
+                    models.TextField(
+                        blank=True,
+                        help_text="Commentaire sur l'inventaire",
+                        verbose_name="Commentaire",
+                    ),
+                ),
+                (
+                    "date_validation",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Date à laquelle les ajustements ont été enregistrés",
+                        null=True,
+                        verbose_name="Date de validation",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Session d'inventaire",
+                "verbose_name_plural": "Sessions d'inventaire",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="LigneInventaire",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "quantite_comptee",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Quantité physiquement comptée",
+                        verbose_name="Quantité comptée",
+                    ),
+                ),
+                (
+                    "stock_theorique",
+                    models.IntegerField(
+                        blank=True,
+                        help_text="Solde du produit au moment de la validation",
+                        null=True,
+                        verbose_name="Stock théorique",
+                    ),
+                ),
+                (
+                    "ecart",
+                    models.IntegerField(
+                        blank=True,
+                        help_text="Quantité comptée moins stock théorique, à la validation",
+                        null=True,
+                        verbose_name="Écart",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Date de modification"
+                    ),
+                ),
+                (
+                    "produit",
+                    models.ForeignKey(
+                        help_text="Produit compté",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lignes_inventaire",
+                        to="produits.produit",
+                        verbose_name="Produit",
+                    ),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        help_text="Session d'inventaire",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lignes",
+                        to="stocks.inventairesession",
+                        verbose_name="Session",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ligne d'inventaire",
+                "verbose_name_plural": "Lignes d'inventaire",
+                "ordering": ["session", "produit"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("session", "produit"),
+                        name="unique_ligne_inventaire_produit",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def initialiser_historique(apps, schema_editor):
+    MouvementStock = apps.get_model("stocks", "MouvementStock")
+    MouvementJournalier = apps.get_model("stocks", "MouvementJournalier")
+
+    agregats = (
+        MouvementStock.objects.filter(
+            is_active=True, type_mouvement__in=["ENTREE", "SORTIE"], quantite__gt=0
+        )
+        .annotate(jour=TruncDate("date_mouvement"))
+        .values("produit_id", "jour")
+        .annotate(
+            entrees=models.Sum(
+                "quantite", filter=models.Q(type_mouvement="ENTREE"), default=0
+            ),
+            sorties=models.Sum(
+                "quantite", filter=models.Q(type_mouvement="SORTIE"), default=0
+            ),
+        )
+        .order_by()
+    )
+    MouvementJournalier.objects.bulk_create(
+        [
+            MouvementJournalier(
+                produit_id=ligne["produit_id"],
+                date=ligne["jour"],
+                entrees=ligne["entrees"],
+                sorties=ligne["sorties"],
+            )
+            for ligne in agregats.iterator(chunk_size=2000)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("produits", "0001_initial"),
+        ("stocks", "0008_inventaire"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MouvementJournalier",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "date",
+                    models.DateField(
+                        help_text="Jour des mouvements (heure locale)",
+                        verbose_name="Date",
+                    ),
+                ),
+                (
+                    "entrees",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Quantité entrée dans la journée",
+                        verbose_name="Entrées",
+                    ),
+                ),
+                (
+                    "sorties",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Quantité sortie dans la journée",
+                        verbose_name="Sorties",
+                    ),
+                ),
+                (
+                    "produit",
+                    models.ForeignKey(
+                        help_text="Produit concerné",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="mouvements_journaliers",
+                        to="produits.produit",
+                        verbose_name="Produit",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Mouvement journalier",
+                "verbose_name_plural": "Mouvements journaliers",
+                "ordering": ["produit", "date"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("produit", "date"),
+                        name="unique_mouvement_journalier_produit_date",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(initialiser_historique, migrations.RunPython.noop),
+    ]
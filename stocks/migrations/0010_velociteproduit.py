@@ -0,0 +1,79 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("produits", "0001_initial"),
+        ("stocks", "0009_mouvementjournalier"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VelociteProduit",
+            fields=[
+                (
+                    "produit",
+                    models.OneToOneField(
+                        help_text="Produit concerné",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="velocite",
+                        serialize=False,
+                        to="produits.produit",
+                        verbose_name="Produit",
+                    ),
+                ),
+                (
+                    "ventes_7j",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Quantité vendue sur les 7 derniers jours",
+                        verbose_name="Ventes 7 jours",
+                    ),
+                ),
+                (
+                    "ventes_30j",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Quantité vendue sur les 30 derniers jours",
+                        verbose_name="Ventes 30 jours",
+                    ),
+                ),
+                (
+                    "ventes_90j",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Quantité vendue sur les 90 derniers jours",
+                        verbose_name="Ventes 90 jours",
+                    ),
+                ),
+                (
+                    "couverture_jours",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="Nombre de jours de vente couverts par le stock (vide si aucune vente)",
+                        null=True,
+                        verbose_name="Couverture (jours)",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Date de calcul"),
+                ),
+            ],
+            options={
+                "verbose_name": "Vélocité produit",
+                "verbose_name_plural": "Vélocités produits",
+                "indexes": [
+                    models.Index(fields=["ventes_30j"], name="velocite_ventes_30j_idx"),
+                    models.Index(
+                        fields=["couverture_jours"], name="velocite_couverture_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
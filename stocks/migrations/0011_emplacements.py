@@ -0,0 +1,259 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def creer_emplacement_principal(apps, schema_editor):
+    Emplacement = apps.get_model("stocks", "Emplacement")
+    SoldeEmplacement = apps.get_model("stocks", "SoldeEmplacement")
+    SoldeStock = apps.get_model("stocks", "SoldeStock")
+
+    # Tout le stock existant est rattaché à la boutique (emplacement principal)
+    principal = Emplacement.objects.create(
+        code="BOUTIQUE", nom="Boutique", type_emplacement="BOUTIQUE", est_principal=True
+    )
+    SoldeEmplacement.objects.bulk_create(
+        [
+            SoldeEmplacement(
+                produit_id=produit_id, emplacement_id=principal.pk, quantite=quantite
+            )
+            for produit_id, quantite in SoldeStock.objects.exclude(
+                quantite=0
+            ).values_list("produit_id", "quantite")
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("produits", "0001_initial"),
+        ("stocks", "0010_velociteproduit"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="mouvementstock",
+            name="motif",
+            field=models.CharField(
+                choices=[
+                    ("ACHAT", "Achat"),
+                    ("VENTE", "Vente"),
+                    ("AJUSTEMENT_INVENTAIRE", "Ajustement inventaire"),
+                    ("RETOUR_CLIENT", "Retour client"),
+                    ("RETOUR_FOURNISSEUR", "Retour fournisseur"),
+                    ("CASSAGE", "Cassage"),
+                    ("PERDU", "Perdu"),
+                    ("VOL", "Vol"),
+                    ("DON", "Don"),
+                    ("SOLDE_OUVERTURE", "Solde d'ouverture"),
+                    ("TRANSFERT", "Transfert entre emplacements"),
+                ],
+                help_text="Motif du mouvement",
+                max_length=30,
+                verbose_name="Motif",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="mouvementstock",
+            name="type_mouvement",
+            field=models.CharField(
+                choices=[
+                    ("ENTREE", "Entrée"),
+                    ("SORTIE", "Sortie"),
+                    ("AJUSTEMENT", "Ajustement"),
+                    ("RETOUR", "Retour"),
+                    ("TRANSFERT", "Transfert"),
+                ],
+                help_text="Type de mouvement de stock",
+                max_length=20,
+                verbose_name="Type de mouvement",
+            ),
+        ),
+        migrations.CreateModel(
+            name="Emplacement",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True,
+                        help_text="Date et heure de création de l'enregistrement",
+                        verbose_name="Date de création",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        help_text="Date et heure de dernière modification",
+                        verbose_name="Date de modification",
+                    ),
+                ),
+                (
+                    "is_active",
+                    models.BooleanField(
+                        default=True,
+                        help_text="Indique si l'enregistrement est actif",
+                        verbose_name="Actif",
+                    ),
+                ),
+                (
+                    "code",
+                    models.CharField(
+                        help_text="Code unique de l'emplacement",
+                        max_length=20,
+                        unique=True,
+                        verbose_name="Code",
+                    ),
+                ),
+                (
+                    "nom",
+                    models.CharField(
+                        help_text="Nom de l'emplacement",
+                        max_length=100,
+                        verbose_name="Nom",
+                    ),
+                ),
+                (
+                    "type_emplacement",
+                    models.CharField(
+                        choices=[("BOUTIQUE", "Boutique"), ("DEPOT", "Dépôt")],
+                        default="BOUTIQUE",
+                        help_text="Type d'emplacement",
+                        max_length=10,
+                        verbose_name="Type",
+                    ),
+                ),
+                (
+                    "est_principal",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Emplacement utilisé pour les mouvements sans emplacement précisé",
+                        verbose_name="Emplacement principal",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Emplacement",
+                "verbose_name_plural": "Emplacements",
+                "ordering": ["-est_principal", "nom"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("est_principal", True)),
+                        fields=("est_principal",),
+                        name="unique_emplacement_principal",
+                    )
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name="inventairesession",
+            name="emplacement",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Emplacement inventorié (vide : stock total, ajusté à l'emplacement principal)",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="inventaires",
+                to="stocks.emplacement",
+                verbose_name="Emplacement",
+            ),
+        ),
+        migrations.AddField(
+            model_name="mouvementstock",
+            name="emplacement",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Emplacement du mouvement (origine pour un transfert)",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="mouvements_stock",
+                to="stocks.emplacement",
+                verbose_name="Emplacement",
+            ),
+        ),
+        migrations.AddField(
+            model_name="mouvementstock",
+            name="emplacement_destination",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Emplacement de destination d'un transfert",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="transferts_recus",
+                to="stocks.emplacement",
+                verbose_name="Emplacement de destination",
+            ),
+        ),
+        migrations.CreateModel(
+            name="SoldeEmplacement",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "quantite",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Quantité du produit présente à l'emplacement",
+                        verbose_name="Quantité en stock",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Date de modification"
+                    ),
+                ),
+                (
+                    "emplacement",
+                    models.ForeignKey(
+                        help_text="Emplacement concerné par le solde",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="soldes",
+                        to="stocks.emplacement",
+                        verbose_name="Emplacement",
+                    ),
+                ),
+                (
+                    "produit",
+                    models.ForeignKey(
+                        help_text="Produit concerné par le solde",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="soldes_emplacements",
+                        to="produits.produit",
+                        verbose_name="Produit",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Solde par emplacement",
+                "verbose_name_plural": "Soldes par emplacement",
+                "ordering": ["produit", "emplacement"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("produit", "emplacement"),
+                        name="unique_solde_produit_emplacement",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(creer_emplacement_principal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:05
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def fin_de(date):
+    return timezone.make_aware(
+        datetime.datetime.combine(date + datetime.timedelta(days=1), datetime.time.min)
+    )
+
+
+def initialiser_fin_journee(apps, schema_editor):
+    """
+    Renseigne la borne de fin de journée et recalcule les clôtures existantes,
+    qui ne tenaient pas compte des mouvements saisis après coup
+    """
+    ClotureStock = apps.get_model("stocks", "ClotureStock")
+    MouvementStock = apps.get_model("stocks", "MouvementStock")
+
+    clotures = list(ClotureStock.objects.all())
+    for cloture in clotures:
+        cloture.fin_journee = fin_de(cloture.date)
+    ClotureStock.objects.bulk_update(clotures, ["fin_journee"], batch_size=1000)
+
+    stock = (
+        MouvementStock.objects.filter(
+            produit=models.OuterRef("produit"),
+            is_active=True,
+            date_mouvement__lt=models.OuterRef("fin_journee"),
+        )
+        .values("produit")
+        .annotate(
+            total=models.Sum(
+                models.Case(
+                    models.When(type_mouvement="ENTREE", then=models.F("quantite")),
+                    models.When(type_mouvement="SORTIE", then=-models.F("quantite")),
+                    default=0,
+                    output_field=models.IntegerField(),
+                )
+            )
+        )
+        .values("total")
+    )
+    ClotureStock.objects.update(quantite=Coalesce(models.Subquery(stock), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stocks", "0011_emplacements"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cloturestock",
+            name="fin_journee",
+            field=models.DateTimeField(
+                help_text="Minuit (heure locale) suivant le jour clôturé : borne exclue des mouvements inclus",
+                null=True,
+                verbose_name="Fin de journée",
+            ),
+        ),
+        migrations.RunPython(initialiser_fin_journee, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="cloturestock",
+            name="fin_journee",
+            field=models.DateTimeField(
+                help_text="Minuit (heure locale) suivant le jour clôturé : borne exclue des mouvements inclus",
+                verbose_name="Fin de journée",
+            ),
+        ),
+    ]
@@ -1,7 +1,73 @@
-from django.db import models
+from django.db import models, transaction
+from core import outbox
 from core.models import BaseModel
 
 
+class Emplacement(BaseModel):
+    """
+    Lieu de stockage (boutique, dépôt)
+    """
+    TYPE_EMPLACEMENT_CHOICES = [
+        ('BOUTIQUE', 'Boutique'),
+        ('DEPOT', 'Dépôt'),
+    ]
+
+    code = models.CharField(
+        max_length=20,
+        unique=True,
+        verbose_name="Code",
+        help_text="Code unique de l'emplacement"
+    )
+    nom = models.CharField(
+        max_length=100,
+        verbose_name="Nom",
+        help_text="Nom de l'emplacement"
+    )
+    type_emplacement = models.CharField(
+        max_length=10,
+        choices=TYPE_EMPLACEMENT_CHOICES,
+        default='BOUTIQUE',
+        verbose_name="Type",
+        help_text="Type d'emplacement"
+    )
+    est_principal = models.BooleanField(
+        default=False,
+        verbose_name="Emplacement principal",
+        help_text="Emplacement utilisé pour les mouvements sans emplacement précisé"
+    )
+
+    class Meta:
+        verbose_name = "Emplacement"
+        verbose_name_plural = "Emplacements"
+        ordering = ['-est_principal', 'nom']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['est_principal'],
+                condition=models.Q(est_principal=True),
+                name='unique_emplacement_principal',
+            ),
+        ]
+
+    # Identifiant de l'emplacement principal, mis en cache par processus
+    _principal_id = None
+
+    def __str__(self):
+        return self.nom
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Emplacement._principal_id = None
+
+    @classmethod
+    def principal_id(cls):
+        """
+        Retourne l'identifiant de l'emplacement principal
+        """
+        if cls._principal_id is None:
+            cls._principal_id = cls.objects.filter(est_principal=True).values_list('pk', flat=True).first()
+        return cls._principal_id
+
+
 class MouvementStock(BaseModel):
     """
     Modèle pour les mouvements de stock
@@ -11,6 +77,7 @@ class MouvementStock(BaseModel):
         ('SORTIE', 'Sortie'),
         ('AJUSTEMENT', 'Ajustement'),
         ('RETOUR', 'Retour'),
+        ('TRANSFERT', 'Transfert'),
     ]
 
     MOTIF_CHOICES = [
@@ -23,6 +90,8 @@ class MouvementStock(BaseModel):
         ('PERDU', 'Perdu'),
         ('VOL', 'Vol'),
         ('DON', 'Don'),
+        ('SOLDE_OUVERTURE', "Solde d'ouverture"),
+        ('TRANSFERT', 'Transfert entre emplacements'),
     ]
 
     produit = models.ForeignKey(
@@ -79,6 +148,24 @@ class MouvementStock(BaseModel):
         verbose_name="Client",
         help_text="Client concerné (pour les sorties)"
     )
+    emplacement = models.ForeignKey(
+        Emplacement,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='mouvements_stock',
+        verbose_name="Emplacement",
+        help_text="Emplacement du mouvement (origine pour un transfert)"
+    )
+    emplacement_destination = models.ForeignKey(
+        Emplacement,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='transferts_recus',
+        verbose_name="Emplacement de destination",
+        help_text="Emplacement de destination d'un transfert"
+    )
     commentaire = models.TextField(
         blank=True,
         null=True,
@@ -94,15 +181,189 @@ class MouvementStock(BaseModel):
         verbose_name = "Mouvement de stock"
         verbose_name_plural = "Mouvements de stock"
         ordering = ['-date_mouvement']
+        indexes = [
+            # Calcul du stock par produit (sommes des entrées/sorties actives)
+            models.Index(
+                fields=['produit', 'type_mouvement', 'quantite'],
+                condition=models.Q(is_active=True),
+                name='mvt_produit_type_actif_idx',
+            ),
+            # Historique d'un produit et clôtures journalières
+            models.Index(
+                fields=['produit', 'date_mouvement'],
+                condition=models.Q(is_active=True),
+                name='mvt_produit_date_actif_idx',
+            ),
+            # Liste et mouvements récents du tableau de bord
+            models.Index(
+                fields=['-date_mouvement'],
+                condition=models.Q(is_active=True),
+                name='mvt_date_actif_idx',
+            ),
+            # Rapport quotidien (ventes et entrées/sorties du jour)
+            models.Index(
+                fields=['type_mouvement', 'motif', 'date_mouvement'],
+                name='mvt_type_motif_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.produit.nom} - {self.get_type_mouvement_display()} - {self.quantite}"
 
+    # Sens de chaque type de mouvement dans le calcul du stock
+    SENS_STOCK = {
+        'ENTREE': 1,
+        'SORTIE': -1,
+    }
+
     def save(self, *args, **kwargs):
         if not self.date_mouvement:
             from django.utils import timezone
             self.date_mouvement = timezone.now()
-        super().save(*args, **kwargs)
+        if not self.emplacement_id:
+            self.emplacement_id = Emplacement.principal_id()
+
+        with transaction.atomic():
+            ancien = None
+            if self.pk:
+                ancien = MouvementStock.objects.select_for_update().filter(pk=self.pk).values(
+                    'produit_id', 'type_mouvement', 'quantite', 'is_active', 'date_mouvement',
+                    'emplacement_id', 'emplacement_destination_id'
+                ).first()
+            super().save(*args, **kwargs)
+
+            # Soldes par emplacement : retirer l'ancien impact, appliquer le nouveau
+            if ancien:
+                for emplacement_id, delta in self.impacts_emplacements(
+                    ancien['type_mouvement'], ancien['quantite'], ancien['is_active'],
+                    ancien['emplacement_id'], ancien['emplacement_destination_id']
+                ):
+                    SoldeEmplacement.appliquer(ancien['produit_id'], emplacement_id, -delta)
+            for emplacement_id, delta in self.impacts_emplacements(
+                self.type_mouvement, self.quantite, self.is_active,
+                self.emplacement_id, self.emplacement_destination_id
+            ):
+                SoldeEmplacement.appliquer(self.produit_id, emplacement_id, delta)
+
+            # Retirer l'ancien impact puis appliquer le nouveau sur le solde
+            if ancien:
+                SoldeStock.appliquer(ancien['produit_id'], -self.impact_stock(
+                    ancien['type_mouvement'], ancien['quantite'], ancien['is_active']
+                ))
+            SoldeStock.appliquer(self.produit_id, self.impact_stock(
+                self.type_mouvement, self.quantite, self.is_active
+            ))
+
+            # Clôtures déjà écrites à partir du jour du mouvement (saisie rétroactive)
+            if ancien:
+                ClotureStock.decaler(ancien['produit_id'], ancien['date_mouvement'], -self.impact_stock(
+                    ancien['type_mouvement'], ancien['quantite'], ancien['is_active']
+                ))
+            ClotureStock.decaler(self.produit_id, self.date_mouvement, self.impact_stock(
+                self.type_mouvement, self.quantite, self.is_active
+            ))
+
+            # Historique journalier : même principe, par produit et par jour
+            if ancien:
+                entrees, sorties = MouvementJournalier.deltas(
+                    ancien['type_mouvement'], ancien['quantite'], ancien['is_active']
+                )
+                MouvementJournalier.appliquer(
+                    ancien['produit_id'], MouvementJournalier.jour(ancien['date_mouvement']), -entrees, -sorties
+                )
+            MouvementJournalier.appliquer(
+                self.produit_id,
+                MouvementJournalier.jour(self.date_mouvement),
+                *MouvementJournalier.deltas(self.type_mouvement, self.quantite, self.is_active)
+            )
+
+            # Valorisation : incrémentale pour un nouveau mouvement, rejouée
+            # pour le produit quand un mouvement existant est modifié
+            from . import valorisation
+            if ancien:
+                if ancien['type_mouvement'] in self.SENS_STOCK or self.type_mouvement in self.SENS_STOCK:
+                    valorisation.revaloriser_produits({ancien['produit_id'], self.produit_id})
+            else:
+                valorisation.appliquer_mouvement(self)
+
+            donnees = self.donnees_evenement()
+            if ancien and ancien['produit_id'] != self.produit_id:
+                donnees['ancien_produit_id'] = ancien['produit_id']
+            outbox.publier(self, 'MODIFICATION' if ancien else 'CREATION', donnees)
+        self._invalider_solde_produit()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            impact = self.impact_stock(self.type_mouvement, self.quantite, self.is_active)
+            produit_id = self.produit_id
+            pk = self.pk
+            result = super().delete(*args, **kwargs)
+            outbox.publier(self, 'SUPPRESSION', self.donnees_evenement(), pk=pk)
+            SoldeStock.appliquer(produit_id, -impact)
+            ClotureStock.decaler(produit_id, self.date_mouvement, -impact)
+            for emplacement_id, delta in self.impacts_emplacements(
+                self.type_mouvement, self.quantite, self.is_active,
+                self.emplacement_id, self.emplacement_destination_id
+            ):
+                SoldeEmplacement.appliquer(produit_id, emplacement_id, -delta)
+            entrees, sorties = MouvementJournalier.deltas(self.type_mouvement, self.quantite, self.is_active)
+            MouvementJournalier.appliquer(
+                produit_id, MouvementJournalier.jour(self.date_mouvement), -entrees, -sorties
+            )
+            if impact:
+                from . import valorisation
+                valorisation.revaloriser_produits({produit_id})
+        self._invalider_solde_produit()
+        return result
+
+    def donnees_evenement(self):
+        """
+        État du mouvement transmis aux abonnés de l'outbox
+        """
+        return {
+            'produit_id': self.produit_id,
+            'type_mouvement': self.type_mouvement,
+            'motif': self.motif,
+            'quantite': self.quantite,
+            'emplacement_id': self.emplacement_id,
+            'emplacement_destination_id': self.emplacement_destination_id,
+            'date_mouvement': self.date_mouvement,
+            'is_active': self.is_active,
+        }
+
+    @classmethod
+    def impact_stock(cls, type_mouvement, quantite, is_active=True):
+        """
+        Retourne la variation de stock induite par un mouvement
+        """
+        if not is_active:
+            return 0
+        return cls.SENS_STOCK.get(type_mouvement, 0) * (quantite or 0)
+
+    @classmethod
+    def impacts_emplacements(cls, type_mouvement, quantite, is_active=True,
+                             emplacement_id=None, destination_id=None):
+        """
+        Retourne les variations [(emplacement_id, delta)] induites par un
+        mouvement ; un transfert sort de l'origine et entre à la destination
+        """
+        if not is_active or not quantite:
+            return []
+        emplacement_id = emplacement_id or Emplacement.principal_id()
+        if type_mouvement == 'TRANSFERT':
+            return [(emplacement_id, -quantite), (destination_id, quantite)]
+        delta = cls.impact_stock(type_mouvement, quantite)
+        return [(emplacement_id, delta)] if delta else []
+
+    def _invalider_solde_produit(self):
+        """
+        Oublie le solde mis en cache sur l'instance produit chargée
+        """
+        produit_field = self._meta.get_field('produit')
+        if produit_field.is_cached(self):
+            solde_field = self.produit._meta.get_field('solde')
+            if solde_field.is_cached(self.produit):
+                solde_field.delete_cached_value(self.produit)
 
     @property
     def valeur_totale(self):
@@ -111,4 +372,998 @@ class MouvementStock(BaseModel):
         """
         if self.prix_unitaire:
             return self.prix_unitaire * self.quantite
-        return 0
\ No newline at end of file
+        return 0
+
+
+class SoldeStock(models.Model):
+    """
+    Solde de stock matérialisé par produit, tenu à jour à chaque mouvement
+    """
+    produit = models.OneToOneField(
+        'produits.Produit',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='solde',
+        verbose_name="Produit",
+        help_text="Produit concerné par le solde"
+    )
+    quantite = models.IntegerField(
+        default=0,
+        verbose_name="Quantité en stock",
+        help_text="Entrées moins sorties actives du produit"
+    )
+    cout_moyen = models.DecimalField(
+        max_digits=14,
+        decimal_places=4,
+        default=0,
+        verbose_name="Coût moyen pondéré",
+        help_text="Coût unitaire moyen pondéré du stock"
+    )
+    valeur_cmp = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        verbose_name="Valeur au CMP",
+        help_text="Valeur du stock au coût moyen pondéré"
+    )
+    valeur_fifo = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        verbose_name="Valeur FIFO",
+        help_text="Valeur du stock selon les couches FIFO restantes"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Date de modification"
+    )
+
+    class Meta:
+        verbose_name = "Solde de stock"
+        verbose_name_plural = "Soldes de stock"
+
+    def __str__(self):
+        return f"{self.produit_id} - {self.quantite}"
+
+    @classmethod
+    def appliquer(cls, produit_id, delta):
+        """
+        Applique une variation au solde d'un produit par un UPDATE atomique
+        """
+        if not delta:
+            return
+        updated = cls.objects.filter(produit_id=produit_id).update(
+            quantite=models.F('quantite') + delta
+        )
+        if not updated:
+            cls.objects.get_or_create(produit_id=produit_id)
+            cls.objects.filter(produit_id=produit_id).update(
+                quantite=models.F('quantite') + delta
+            )
+        AlerteStock.synchroniser([produit_id])
+        # Le stock affiché au scan en caisse suit le solde
+        from produits import scan
+        scan.invalider_apres_commit([produit_id])
+
+    @classmethod
+    def enregistrer(cls, mouvements):
+        """
+        Applique en une fois des mouvements créés sans passer par save() (bulk_create).
+        Les alertes et le cache du scan restent à la charge de l'appelant.
+        """
+        deltas = {}
+        for mouvement in mouvements:
+            deltas[mouvement.produit_id] = deltas.get(mouvement.produit_id, 0) + MouvementStock.impact_stock(
+                mouvement.type_mouvement, mouvement.quantite, mouvement.is_active
+            )
+        deltas = {produit_id: delta for produit_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        with transaction.atomic():
+            existants = {
+                solde.produit_id: solde
+                for solde in cls.objects.select_for_update().filter(produit_id__in=deltas)
+            }
+            soldes = []
+            for produit_id, delta in deltas.items():
+                solde = existants.get(produit_id) or cls(produit_id=produit_id)
+                solde.quantite += delta
+                soldes.append(solde)
+            cls.objects.bulk_create(
+                soldes,
+                update_conflicts=True,
+                unique_fields=['produit'],
+                update_fields=['quantite', 'updated_at'],
+                batch_size=1000,
+            )
+
+    @classmethod
+    def reconstruire(cls):
+        """
+        Recalcule tous les soldes à partir du journal des mouvements
+        """
+        from produits.models import Produit
+
+        totaux = dict(
+            MouvementStock.objects.filter(is_active=True).values('produit_id').annotate(
+                total=models.Sum(models.Case(
+                    models.When(type_mouvement='ENTREE', then=models.F('quantite')),
+                    models.When(type_mouvement='SORTIE', then=-models.F('quantite')),
+                    default=0,
+                    output_field=models.IntegerField(),
+                ))
+            ).values_list('produit_id', 'total')
+        )
+        soldes = [
+            cls(produit_id=produit_id, quantite=totaux.get(produit_id) or 0)
+            for produit_id in Produit.objects.values_list('id', flat=True)
+        ]
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                soldes,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['produit'],
+                update_fields=['quantite', 'updated_at'],
+            )
+        AlerteStock.reconstruire()
+        from produits import scan
+        scan.invalider_apres_commit([solde.produit_id for solde in soldes])
+        return len(soldes)
+
+
+class SoldeEmplacement(models.Model):
+    """
+    Solde de stock par produit et par emplacement, tenu à jour à chaque
+    mouvement. La somme des emplacements d'un produit est son SoldeStock.
+    """
+    produit = models.ForeignKey(
+        'produits.Produit',
+        on_delete=models.CASCADE,
+        related_name='soldes_emplacements',
+        verbose_name="Produit",
+        help_text="Produit concerné par le solde"
+    )
+    emplacement = models.ForeignKey(
+        Emplacement,
+        on_delete=models.CASCADE,
+        related_name='soldes',
+        verbose_name="Emplacement",
+        help_text="Emplacement concerné par le solde"
+    )
+    quantite = models.IntegerField(
+        default=0,
+        verbose_name="Quantité en stock",
+        help_text="Quantité du produit présente à l'emplacement"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Date de modification"
+    )
+
+    class Meta:
+        verbose_name = "Solde par emplacement"
+        verbose_name_plural = "Soldes par emplacement"
+        ordering = ['produit', 'emplacement']
+        constraints = [
+            models.UniqueConstraint(fields=['produit', 'emplacement'], name='unique_solde_produit_emplacement'),
+        ]
+
+    def __str__(self):
+        return f"{self.produit_id} @ {self.emplacement_id} - {self.quantite}"
+
+    @classmethod
+    def appliquer(cls, produit_id, emplacement_id, delta):
+        """
+        Applique une variation au solde d'un produit à un emplacement
+        """
+        if not delta or not emplacement_id:
+            return
+        updated = cls.objects.filter(produit_id=produit_id, emplacement_id=emplacement_id).update(
+            quantite=models.F('quantite') + delta
+        )
+        if not updated:
+            cls.objects.get_or_create(produit_id=produit_id, emplacement_id=emplacement_id)
+            cls.objects.filter(produit_id=produit_id, emplacement_id=emplacement_id).update(
+                quantite=models.F('quantite') + delta
+            )
+
+    @classmethod
+    def enregistrer(cls, mouvements):
+        """
+        Applique en une fois des mouvements créés sans passer par save() (bulk_create)
+        """
+        deltas = {}
+        for mouvement in mouvements:
+            for emplacement_id, delta in MouvementStock.impacts_emplacements(
+                mouvement.type_mouvement, mouvement.quantite, mouvement.is_active,
+                mouvement.emplacement_id, mouvement.emplacement_destination_id
+            ):
+                cle = (mouvement.produit_id, emplacement_id)
+                deltas[cle] = deltas.get(cle, 0) + delta
+        deltas = {cle: delta for cle, delta in deltas.items() if delta and cle[1]}
+        if not deltas:
+            return
+
+        with transaction.atomic():
+            existants = {
+                (solde.produit_id, solde.emplacement_id): solde
+                for solde in cls.objects.select_for_update().filter(
+                    produit_id__in={produit_id for produit_id, _ in deltas},
+                    emplacement_id__in={emplacement_id for _, emplacement_id in deltas},
+                )
+            }
+            soldes = []
+            for (produit_id, emplacement_id), delta in deltas.items():
+                solde = existants.get((produit_id, emplacement_id)) or cls(
+                    produit_id=produit_id, emplacement_id=emplacement_id
+                )
+                solde.quantite += delta
+                soldes.append(solde)
+            cls.objects.bulk_create(
+                soldes,
+                update_conflicts=True,
+                unique_fields=['produit', 'emplacement'],
+                update_fields=['quantite', 'updated_at'],
+                batch_size=1000,
+            )
+
+    @classmethod
+    def totaux_journal(cls, queryset=None):
+        """
+        Stock par (produit, emplacement) calculé à partir des mouvements actifs du journal
+        """
+        queryset = MouvementStock.objects.all() if queryset is None else queryset
+        actifs = queryset.filter(is_active=True)
+        principal_id = Emplacement.principal_id()
+        totaux = {}
+
+        sorties = actifs.values('produit_id', 'emplacement_id').annotate(
+            total=models.Sum(models.Case(
+                models.When(type_mouvement='ENTREE', then=models.F('quantite')),
+                models.When(type_mouvement__in=['SORTIE', 'TRANSFERT'], then=-models.F('quantite')),
+                default=0,
+                output_field=models.IntegerField(),
+            ))
+        ).values_list('produit_id', 'emplacement_id', 'total').order_by()
+        arrivees = actifs.filter(type_mouvement='TRANSFERT').values(
+            'produit_id', 'emplacement_destination_id'
+        ).annotate(total=models.Sum('quantite')).values_list(
+            'produit_id', 'emplacement_destination_id', 'total'
+        ).order_by()
+
+        for produit_id, emplacement_id, total in list(sorties) + list(arrivees):
+            cle = (produit_id, emplacement_id or principal_id)
+            totaux[cle] = totaux.get(cle, 0) + (total or 0)
+        return totaux
+
+    @classmethod
+    def reconstruire(cls):
+        """
+        Recalcule tous les soldes par emplacement à partir du journal
+        """
+        soldes = [
+            cls(produit_id=produit_id, emplacement_id=emplacement_id, quantite=total)
+            for (produit_id, emplacement_id), total in cls.totaux_journal().items()
+            if emplacement_id
+        ]
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(soldes, batch_size=1000)
+        return len(soldes)
+
+
+class CoucheFifo(models.Model):
+    """
+    Couche de coût FIFO : quantité restante d'une entrée de stock et son coût unitaire
+    """
+    produit = models.ForeignKey(
+        'produits.Produit',
+        on_delete=models.CASCADE,
+        related_name='couches_fifo',
+        verbose_name="Produit",
+        help_text="Produit concerné par la couche"
+    )
+    # Identifiant simple : une clé étrangère est impossible vers le journal partitionné
+    mouvement_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Mouvement d'entrée",
+        help_text="Identifiant du mouvement d'entrée à l'origine de la couche"
+    )
+    date_entree = models.DateTimeField(
+        verbose_name="Date d'entrée",
+        help_text="Date du mouvement d'entrée"
+    )
+    quantite_restante = models.PositiveIntegerField(
+        verbose_name="Quantité restante",
+        help_text="Quantité de l'entrée non encore sortie"
+    )
+    cout_unitaire = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Coût unitaire",
+        help_text="Coût unitaire de l'entrée"
+    )
+
+    class Meta:
+        verbose_name = "Couche FIFO"
+        verbose_name_plural = "Couches FIFO"
+        ordering = ['date_entree', 'id']
+        indexes = [
+            models.Index(fields=['produit', 'date_entree', 'id'], name='couche_fifo_produit_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.produit_id} - {self.quantite_restante} x {self.cout_unitaire}"
+
+
+class ValorisationCategorie(models.Model):
+    """
+    Valeur du stock cumulée par catégorie, tenue à jour avec les soldes
+    """
+    categorie = models.OneToOneField(
+        'produits.Categorie',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='valorisation',
+        verbose_name="Catégorie",
+        help_text="Catégorie valorisée"
+    )
+    valeur_cmp = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=0,
+        verbose_name="Valeur au CMP",
+        help_text="Valeur du stock de la catégorie au coût moyen pondéré"
+    )
+    valeur_fifo = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=0,
+        verbose_name="Valeur FIFO",
+        help_text="Valeur du stock de la catégorie selon les couches FIFO"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Date de modification"
+    )
+
+    class Meta:
+        verbose_name = "Valorisation de catégorie"
+        verbose_name_plural = "Valorisations de catégorie"
+
+    def __str__(self):
+        return f"{self.categorie_id} - {self.valeur_cmp}"
+
+    @classmethod
+    def appliquer(cls, categorie_id, delta_cmp, delta_fifo):
+        """
+        Applique une variation de valeur à une catégorie par un UPDATE atomique
+        """
+        if not delta_cmp and not delta_fifo:
+            return
+        updated = cls.objects.filter(categorie_id=categorie_id).update(
+            valeur_cmp=models.F('valeur_cmp') + delta_cmp,
+            valeur_fifo=models.F('valeur_fifo') + delta_fifo,
+        )
+        if not updated:
+            cls.objects.get_or_create(categorie_id=categorie_id)
+            cls.objects.filter(categorie_id=categorie_id).update(
+                valeur_cmp=models.F('valeur_cmp') + delta_cmp,
+                valeur_fifo=models.F('valeur_fifo') + delta_fifo,
+            )
+
+    @classmethod
+    def valeur_boutique(cls):
+        """
+        Valeur totale du stock (somme des quelques lignes par catégorie)
+        """
+        totaux = cls.objects.aggregate(
+            valeur_cmp=models.Sum('valeur_cmp'),
+            valeur_fifo=models.Sum('valeur_fifo'),
+        )
+        return {cle: valeur or 0 for cle, valeur in totaux.items()}
+
+
+class ClotureStock(models.Model):
+    """
+    Stock d'un produit à la clôture d'un jour. Une ligne n'est écrite que
+    pour les jours où le produit a eu des mouvements.
+    """
+    produit = models.ForeignKey(
+        'produits.Produit',
+        on_delete=models.CASCADE,
+        related_name='clotures_stock',
+        verbose_name="Produit",
+        help_text="Produit concerné par la clôture"
+    )
+    date = models.DateField(
+        verbose_name="Date",
+        help_text="Jour de la clôture"
+    )
+    quantite = models.IntegerField(
+        verbose_name="Quantité en stock",
+        help_text="Stock du produit en fin de journée"
+    )
+    fin_journee = models.DateTimeField(
+        verbose_name="Fin de journée",
+        help_text="Minuit (heure locale) suivant le jour clôturé : borne exclue des mouvements inclus"
+    )
+
+    class Meta:
+        verbose_name = "Clôture de stock"
+        verbose_name_plural = "Clôtures de stock"
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['produit', 'date'], name='unique_cloture_produit_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.produit_id} - {self.date} - {self.quantite}"
+
+    @staticmethod
+    def fin_de(date):
+        """
+        Début du lendemain de `date` en heure locale : les mouvements d'un
+        jour sont bornés par [fin_de(veille), fin_de(jour)[ sur la colonne
+        elle-même, ce qui permet d'utiliser l'index sur date_mouvement
+        """
+        import datetime
+        from django.utils import timezone
+        return timezone.make_aware(datetime.datetime.combine(date + datetime.timedelta(days=1), datetime.time.min))
+
+    @classmethod
+    def cloturer(cls, date):
+        """
+        Enregistre le stock de clôture du jour donné pour les produits
+        ayant eu des mouvements ce jour-là
+        """
+        import datetime
+        from produits.models import Produit
+
+        fin_journee = cls.fin_de(date)
+        produit_ids = MouvementStock.objects.filter(
+            date_mouvement__gte=cls.fin_de(date - datetime.timedelta(days=1)),
+            date_mouvement__lt=fin_journee,
+        ).values_list('produit_id', flat=True).distinct()
+        with transaction.atomic():
+            # Une clôture déjà écrite pour ce jour ne doit pas servir de base à son propre recalcul
+            cls.objects.filter(produit_id__in=produit_ids, date=date).delete()
+            clotures = [
+                cls(produit_id=produit_id, date=date, quantite=quantite, fin_journee=fin_journee)
+                for produit_id, quantite in Produit.objects.filter(
+                    pk__in=produit_ids
+                ).with_stock_at(date).values_list('pk', 'stock_date')
+            ]
+            cls.objects.bulk_create(clotures, batch_size=1000)
+        return len(clotures)
+
+    @classmethod
+    def decaler(cls, produit_id, date_mouvement, delta):
+        """
+        Reporte sur les clôtures déjà écrites la variation de stock d'un
+        mouvement daté de leur jour ou d'avant (saisie rétroactive,
+        modification, suppression) : chacune est décalée de `delta`
+        """
+        from django.utils import timezone
+        if delta:
+            cls.objects.filter(
+                produit_id=produit_id, date__gte=timezone.localdate(date_mouvement)
+            ).update(quantite=models.F('quantite') + delta)
+
+
+class MouvementJournalier(models.Model):
+    """
+    Entrées et sorties cumulées par produit et par jour, tenues à jour à
+    chaque enregistrement de mouvement (historique du stock)
+    """
+    produit = models.ForeignKey(
+        'produits.Produit',
+        on_delete=models.CASCADE,
+        related_name='mouvements_journaliers',
+        verbose_name="Produit",
+        help_text="Produit concerné"
+    )
+    date = models.DateField(
+        verbose_name="Date",
+        help_text="Jour des mouvements (heure locale)"
+    )
+    entrees = models.IntegerField(
+        default=0,
+        verbose_name="Entrées",
+        help_text="Quantité entrée dans la journée"
+    )
+    sorties = models.IntegerField(
+        default=0,
+        verbose_name="Sorties",
+        help_text="Quantité sortie dans la journée"
+    )
+
+    class Meta:
+        verbose_name = "Mouvement journalier"
+        verbose_name_plural = "Mouvements journaliers"
+        ordering = ['produit', 'date']
+        constraints = [
+            models.UniqueConstraint(fields=['produit', 'date'], name='unique_mouvement_journalier_produit_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.produit_id} - {self.date} : +{self.entrees} / -{self.sorties}"
+
+    @staticmethod
+    def jour(date_mouvement):
+        from django.utils import timezone
+        return timezone.localdate(date_mouvement)
+
+    @classmethod
+    def deltas(cls, type_mouvement, quantite, is_active=True):
+        """
+        Retourne la variation (entrées, sorties) induite par un mouvement
+        """
+        sens = MouvementStock.impact_stock(type_mouvement, quantite, is_active)
+        return (sens, 0) if sens > 0 else (0, -sens)
+
+    @classmethod
+    def appliquer(cls, produit_id, date, entrees=0, sorties=0):
+        """
+        Ajoute des entrées/sorties au cumul du jour
+        """
+        if not entrees and not sorties:
+            return
+        valeurs = {
+            'entrees': models.F('entrees') + entrees,
+            'sorties': models.F('sorties') + sorties,
+        }
+        updated = cls.objects.filter(produit_id=produit_id, date=date).update(**valeurs)
+        if entrees < 0 or sorties < 0:
+            # Mouvement retiré : la journée peut ne plus rien contenir
+            cls.objects.filter(produit_id=produit_id, date=date, entrees=0, sorties=0).delete()
+        elif not updated:
+            _, created = cls.objects.get_or_create(
+                produit_id=produit_id, date=date, defaults={'entrees': entrees, 'sorties': sorties}
+            )
+            if not created:
+                cls.objects.filter(produit_id=produit_id, date=date).update(**valeurs)
+
+    @classmethod
+    def enregistrer(cls, mouvements):
+        """
+        Ajoute en une fois des mouvements créés sans passer par save() (bulk_create)
+        """
+        cumuls = {}
+        for mouvement in mouvements:
+            entrees, sorties = cls.deltas(mouvement.type_mouvement, mouvement.quantite, mouvement.is_active)
+            if entrees or sorties:
+                cle = (mouvement.produit_id, cls.jour(mouvement.date_mouvement))
+                cumul = cumuls.setdefault(cle, [0, 0])
+                cumul[0] += entrees
+                cumul[1] += sorties
+        if not cumuls:
+            return
+
+        with transaction.atomic():
+            existants = {
+                (ligne.produit_id, ligne.date): ligne
+                for ligne in cls.objects.select_for_update().filter(
+                    produit_id__in={produit_id for produit_id, _ in cumuls},
+                    date__in={date for _, date in cumuls},
+                )
+            }
+            lignes = []
+            for (produit_id, date), (entrees, sorties) in cumuls.items():
+                ligne = existants.get((produit_id, date)) or cls(produit_id=produit_id, date=date)
+                ligne.entrees += entrees
+                ligne.sorties += sorties
+                lignes.append(ligne)
+            cls.objects.bulk_create(
+                lignes,
+                update_conflicts=True,
+                unique_fields=['produit', 'date'],
+                update_fields=['entrees', 'sorties'],
+                batch_size=1000,
+            )
+
+    @classmethod
+    def reconstruire(cls, chunk_size=2000):
+        """
+        Recalcule tout l'historique à partir du journal des mouvements
+        """
+        from django.db.models.functions import TruncDate
+
+        agregats = MouvementStock.objects.filter(
+            is_active=True, type_mouvement__in=list(MouvementStock.SENS_STOCK), quantite__gt=0
+        ).annotate(jour=TruncDate('date_mouvement')).values('produit_id', 'jour').annotate(
+            total_entrees=models.Sum('quantite', filter=models.Q(type_mouvement='ENTREE'), default=0),
+            total_sorties=models.Sum('quantite', filter=models.Q(type_mouvement='SORTIE'), default=0),
+        ).order_by()
+
+        total = 0
+        with transaction.atomic():
+            cls.objects.all().delete()
+            lot = []
+            for ligne in agregats.iterator(chunk_size=chunk_size):
+                lot.append(cls(
+                    produit_id=ligne['produit_id'],
+                    date=ligne['jour'],
+                    entrees=ligne['total_entrees'],
+                    sorties=ligne['total_sorties'],
+                ))
+                if len(lot) >= chunk_size:
+                    cls.objects.bulk_create(lot)
+                    total += len(lot)
+                    lot = []
+            cls.objects.bulk_create(lot)
+            total += len(lot)
+        return total
+
+    @classmethod
+    def historique(cls, produit_id, debut=None, fin=None):
+        """
+        Retourne le solde avant `debut` et la liste des jours de la période
+        avec entrées, sorties, variation nette et solde de fin de journée
+        """
+        lignes = cls.objects.filter(produit_id=produit_id)
+        solde = 0
+        if debut:
+            solde = lignes.filter(date__lt=debut).aggregate(
+                total=models.Sum(models.F('entrees') - models.F('sorties'), default=0)
+            )['total']
+            lignes = lignes.filter(date__gte=debut)
+        if fin:
+            lignes = lignes.filter(date__lte=fin)
+
+        solde_initial = solde
+        jours = []
+        for date, entrees, sorties in lignes.order_by('date').values_list('date', 'entrees', 'sorties'):
+            solde += entrees - sorties
+            jours.append({
+                'date': date,
+                'entrees': entrees,
+                'sorties': sorties,
+                'net': entrees - sorties,
+                'solde': solde,
+            })
+        return solde_initial, jours
+
+
+class VelociteProduit(models.Model):
+    """
+    Ventes des 7, 30 et 90 derniers jours et couverture de stock d'un
+    produit, recalculées chaque nuit
+    """
+    FENETRES = (7, 30, 90)
+    # Fenêtre utilisée pour la couverture de stock
+    FENETRE_COUVERTURE = 30
+
+    produit = models.OneToOneField(
+        'produits.Produit',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='velocite',
+        verbose_name="Produit",
+        help_text="Produit concerné"
+    )
+    ventes_7j = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Ventes 7 jours",
+        help_text="Quantité vendue sur les 7 derniers jours"
+    )
+    ventes_30j = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Ventes 30 jours",
+        help_text="Quantité vendue sur les 30 derniers jours"
+    )
+    ventes_90j = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Ventes 90 jours",
+        help_text="Quantité vendue sur les 90 derniers jours"
+    )
+    couverture_jours = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Couverture (jours)",
+        help_text="Nombre de jours de vente couverts par le stock (vide si aucune vente)"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Date de calcul"
+    )
+
+    class Meta:
+        verbose_name = "Vélocité produit"
+        verbose_name_plural = "Vélocités produits"
+        indexes = [
+            models.Index(fields=['ventes_30j'], name='velocite_ventes_30j_idx'),
+            models.Index(fields=['couverture_jours'], name='velocite_couverture_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.produit} - {self.velocite_30j:.2f}/jour"
+
+    @property
+    def velocite_7j(self):
+        return self.ventes_7j / 7
+
+    @property
+    def velocite_30j(self):
+        return self.ventes_30j / 30
+
+    @property
+    def velocite_90j(self):
+        return self.ventes_90j / 90
+
+    @classmethod
+    def recalculer(cls, maintenant=None):
+        """
+        Recalcule les vélocités de tous les produits actifs : une requête
+        groupée par fenêtre sur les sorties de vente, puis un upsert
+        """
+        from datetime import timedelta
+        from django.utils import timezone
+        from produits.models import Produit
+
+        maintenant = maintenant or timezone.now()
+        ventes = {
+            jours: dict(
+                MouvementStock.objects.filter(
+                    is_active=True,
+                    type_mouvement='SORTIE',
+                    motif='VENTE',
+                    date_mouvement__gte=maintenant - timedelta(days=jours),
+                    date_mouvement__lte=maintenant,
+                ).values('produit_id').annotate(
+                    total=models.Sum('quantite')
+                ).values_list('produit_id', 'total').order_by()
+            )
+            for jours in cls.FENETRES
+        }
+
+        velocites = []
+        stocks = Produit.objects.filter(is_active=True).with_stock().values_list('id', 'stock')
+        for produit_id, stock in stocks.iterator(chunk_size=2000):
+            velocite = cls(
+                produit_id=produit_id,
+                **{f'ventes_{jours}j': ventes[jours].get(produit_id, 0) for jours in cls.FENETRES}
+            )
+            vendus = getattr(velocite, f'ventes_{cls.FENETRE_COUVERTURE}j')
+            if vendus:
+                velocite.couverture_jours = max(stock, 0) * cls.FENETRE_COUVERTURE // vendus
+            velocites.append(velocite)
+
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                velocites,
+                update_conflicts=True,
+                unique_fields=['produit'],
+                update_fields=['ventes_7j', 'ventes_30j', 'ventes_90j', 'couverture_jours', 'updated_at'],
+                batch_size=1000,
+            )
+            cls.objects.exclude(produit__is_active=True).delete()
+        return len(velocites)
+
+    @classmethod
+    def actualiser_couverture(cls, produit_ids):
+        """
+        Recalcule la couverture des produits donnés à partir de leur solde
+        courant, sans relire les ventes (vélocités du dernier calcul)
+        """
+        velocites = list(cls.objects.filter(produit_id__in=produit_ids))
+        stocks = dict(
+            SoldeStock.objects.filter(produit_id__in=produit_ids).values_list('produit_id', 'quantite')
+        )
+        for velocite in velocites:
+            vendus = getattr(velocite, f'ventes_{cls.FENETRE_COUVERTURE}j')
+            velocite.couverture_jours = (
+                max(stocks.get(velocite.produit_id, 0), 0) * cls.FENETRE_COUVERTURE // vendus
+                if vendus else None
+            )
+        cls.objects.bulk_update(velocites, ['couverture_jours'])
+        return len(velocites)
+
+
+class AlerteStock(models.Model):
+    """
+    Produits actifs dont le stock est sous le seuil d'alerte, tenus à jour
+    à chaque variation de solde ou de seuil
+    """
+    produit = models.OneToOneField(
+        'produits.Produit',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='alerte',
+        verbose_name="Produit",
+        help_text="Produit en alerte de stock"
+    )
+    stock_actuel = models.IntegerField(
+        verbose_name="Stock actuel",
+        help_text="Stock du produit au moment de l'alerte"
+    )
+    seuil = models.PositiveIntegerField(
+        verbose_name="Seuil d'alerte",
+        help_text="Seuil d'alerte du produit"
+    )
+    ecart = models.IntegerField(
+        db_index=True,
+        verbose_name="Écart au seuil",
+        help_text="Quantité manquante pour revenir au seuil"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Date de modification"
+    )
+
+    class Meta:
+        verbose_name = "Alerte de stock"
+        verbose_name_plural = "Alertes de stock"
+        ordering = ['-ecart']
+
+    def __str__(self):
+        return f"{self.produit_id} - {self.stock_actuel}/{self.seuil}"
+
+    @classmethod
+    def synchroniser(cls, produit_ids):
+        """
+        Met à jour les alertes des produits donnés
+        """
+        from produits.models import Produit
+
+        produits = Produit.objects.filter(pk__in=produit_ids).with_stock().values(
+            'id', 'is_active', 'stock', 'seuil_alerte', 'en_rupture'
+        )
+        a_retirer = set(produit_ids)
+        alertes = []
+        for produit in produits:
+            if produit['is_active'] and produit['en_rupture']:
+                a_retirer.discard(produit['id'])
+                alertes.append(cls(
+                    produit_id=produit['id'],
+                    stock_actuel=produit['stock'],
+                    seuil=produit['seuil_alerte'],
+                    ecart=produit['seuil_alerte'] - produit['stock'],
+                ))
+        if alertes:
+            # Une seule requête d'upsert, même pour un import de milliers de produits
+            cls.objects.bulk_create(
+                alertes,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['produit'],
+                update_fields=['stock_actuel', 'seuil', 'ecart', 'updated_at'],
+            )
+        if a_retirer:
+            cls.objects.filter(produit_id__in=a_retirer).delete()
+
+    @classmethod
+    def reconstruire(cls):
+        """
+        Recalcule toutes les alertes à partir des soldes
+        """
+        from produits.models import Produit
+
+        alertes = [
+            cls(
+                produit_id=produit['id'],
+                stock_actuel=produit['stock'],
+                seuil=produit['seuil_alerte'],
+                ecart=produit['ecart_seuil'],
+            )
+            for produit in Produit.objects.filter(is_active=True).with_stock().filter(
+                en_rupture=True
+            ).values('id', 'stock', 'seuil_alerte', 'ecart_seuil')
+        ]
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(alertes, batch_size=1000)
+        return len(alertes)
+
+
+class InventaireSession(BaseModel):
+    """
+    Session d'inventaire physique : les quantités comptées sont chargées par
+    lots puis comparées aux soldes lors de la validation
+    """
+    STATUT_CHOICES = [
+        ('OUVERTE', 'Ouverte'),
+        ('VALIDEE', 'Validée'),
+        ('ANNULEE', 'Annulée'),
+    ]
+
+    reference = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name="Référence",
+        help_text="Référence de la session d'inventaire"
+    )
+    statut = models.CharField(
+        max_length=10,
+        choices=STATUT_CHOICES,
+        default='OUVERTE',
+        verbose_name="Statut",
+        help_text="Statut de la session"
+    )
+    commentaire = models.TextField(
+        blank=True,
+        verbose_name="Commentaire",
+        help_text="Commentaire sur l'inventaire"
+    )
+    emplacement = models.ForeignKey(
+        Emplacement,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='inventaires',
+        verbose_name="Emplacement",
+        help_text="Emplacement inventorié (vide : stock total, ajusté à l'emplacement principal)"
+    )
+    date_validation = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Date de validation",
+        help_text="Date à laquelle les ajustements ont été enregistrés"
+    )
+
+    class Meta:
+        verbose_name = "Session d'inventaire"
+        verbose_name_plural = "Sessions d'inventaire"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Inventaire {self.reference} ({self.get_statut_display()})"
+
+    @property
+    def est_ouverte(self):
+        return self.statut == 'OUVERTE'
+
+
+class LigneInventaire(models.Model):
+    """
+    Quantité comptée d'un produit dans une session d'inventaire
+    """
+    session = models.ForeignKey(
+        InventaireSession,
+        on_delete=models.CASCADE,
+        related_name='lignes',
+        verbose_name="Session",
+        help_text="Session d'inventaire"
+    )
+    produit = models.ForeignKey(
+        'produits.Produit',
+        on_delete=models.CASCADE,
+        related_name='lignes_inventaire',
+        verbose_name="Produit",
+        help_text="Produit compté"
+    )
+    quantite_comptee = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Quantité comptée",
+        help_text="Quantité physiquement comptée"
+    )
+    stock_theorique = models.IntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Stock théorique",
+        help_text="Solde du produit au moment de la validation"
+    )
+    ecart = models.IntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Écart",
+        help_text="Quantité comptée moins stock théorique, à la validation"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Date de modification"
+    )
+
+    class Meta:
+        verbose_name = "Ligne d'inventaire"
+        verbose_name_plural = "Lignes d'inventaire"
+        ordering = ['session', 'produit']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'produit'], name='unique_ligne_inventaire_produit'),
+        ]
+
+    def __str__(self):
+        return f"{self.session.reference} - {self.produit} : {self.quantite_comptee}"
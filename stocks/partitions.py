@@ -0,0 +1,160 @@
+"""
+Partitionnement mensuel du journal des mouvements de stock (PostgreSQL)
+
+Sur PostgreSQL, la table `stocks_mouvementstock` peut être convertie en
+table partitionnée par plage de `date_mouvement` (une partition par mois,
+plus une partition par défaut). Sur les autres bases, la table reste une
+table simple et ces fonctions ne font rien.
+"""
+from datetime import date
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import MouvementStock
+
+TABLE = MouvementStock._meta.db_table
+
+
+def est_supporte():
+    """
+    Indique si la base courante supporte le partitionnement déclaratif
+    """
+    return connection.vendor == 'postgresql'
+
+
+def est_partitionnee():
+    """
+    Indique si la table des mouvements est déjà partitionnée
+    """
+    if not est_supporte():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def _debut_mois(jour, decalage=0):
+    mois = jour.year * 12 + jour.month - 1 + decalage
+    return date(mois // 12, mois % 12 + 1, 1)
+
+
+def _nom_partition(debut):
+    return f"{TABLE}_p{debut.strftime('%Y%m')}"
+
+
+def creer_partition(cursor, debut):
+    """
+    Crée la partition du mois commençant à `debut` si elle n'existe pas.
+
+    PostgreSQL refuse de créer une partition dont la plage contient des lignes
+    de la partition par défaut : celle-ci est alors détachée, ses lignes du mois
+    sont déplacées dans la nouvelle partition, puis elle est rattachée.
+    """
+    partition = _nom_partition(debut)
+    defaut = f"{TABLE}_defaut"
+    fin = _debut_mois(debut, 1)
+    plage = f"date_mouvement >= '{debut.isoformat()}' AND date_mouvement < '{fin.isoformat()}'"
+    creation = (
+        f'CREATE TABLE "{partition}" PARTITION OF "{TABLE}" '
+        f"FOR VALUES FROM ('{debut.isoformat()}') TO ('{fin.isoformat()}')"
+    )
+
+    cursor.execute("SELECT to_regclass(%s), to_regclass(%s)", [partition, defaut])
+    existante, defaut_existe = cursor.fetchone()
+    if existante:
+        return
+    lignes_a_deplacer = False
+    if defaut_existe:
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{defaut}" WHERE {plage})')
+        lignes_a_deplacer = cursor.fetchone()[0]
+    if not lignes_a_deplacer:
+        cursor.execute(creation)
+        return
+
+    with transaction.atomic():
+        cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{defaut}"')
+        cursor.execute(creation)
+        cursor.execute(f'INSERT INTO "{partition}" SELECT * FROM "{defaut}" WHERE {plage}')
+        cursor.execute(f'DELETE FROM "{defaut}" WHERE {plage}')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{defaut}" DEFAULT')
+
+
+def creer_partitions(mois_a_venir=3):
+    """
+    Crée les partitions du mois courant et des `mois_a_venir` mois suivants.
+    Retourne le nombre de partitions vérifiées (0 si la table n'est pas partitionnée).
+    """
+    if not est_partitionnee():
+        return 0
+    aujourd_hui = timezone.now().date()
+    with transaction.atomic(), connection.cursor() as cursor:
+        for decalage in range(mois_a_venir + 1):
+            creer_partition(cursor, _debut_mois(aujourd_hui, decalage))
+    return mois_a_venir + 1
+
+
+def partitionner(mois_a_venir=3):
+    """
+    Convertit la table des mouvements en table partitionnée par mois.
+    Les données, index, contraintes et la séquence des identifiants sont conservés.
+    """
+    if not est_supporte():
+        raise NotImplementedError("Le partitionnement n'est disponible que sur PostgreSQL")
+    if est_partitionnee():
+        return creer_partitions(mois_a_venir)
+
+    ancienne = f"{TABLE}_ancienne"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+
+        # Index et clés étrangères à recréer sur la table partitionnée
+        cursor.execute(
+            "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "WHERE i.indrelid = %s::regclass AND NOT i.indisprimary",
+            [TABLE],
+        )
+        index = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        cles_etrangeres = cursor.fetchall()
+        cursor.execute(f'SELECT MIN(date_mouvement), MAX(id) FROM "{TABLE}"')
+        premiere_date, dernier_id = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{ancienne}"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{ancienne}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f"PARTITION BY RANGE (date_mouvement)"
+        )
+
+        aujourd_hui = timezone.now().date()
+        mois = _debut_mois(premiere_date.date() if premiere_date else aujourd_hui)
+        while mois <= _debut_mois(aujourd_hui, mois_a_venir):
+            creer_partition(cursor, mois)
+            mois = _debut_mois(mois, 1)
+        cursor.execute(f'CREATE TABLE "{TABLE}_defaut" PARTITION OF "{TABLE}" DEFAULT')
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{ancienne}"')
+        cursor.execute(f'DROP TABLE "{ancienne}"')
+
+        # La clé primaire d'une table partitionnée doit inclure la clé de partition
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, date_mouvement)')
+
+        # Séquence propre à la nouvelle table, l'identité de l'ancienne n'étant pas copiée
+        sequence = f"{TABLE}_id_seq"
+        cursor.execute(f'CREATE SEQUENCE "{sequence}" OWNED BY "{TABLE}".id')
+        cursor.execute("SELECT setval(%s, %s, false)", [sequence, (dernier_id or 0) + 1])
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ALTER COLUMN id SET DEFAULT nextval(\'"{sequence}"\')'
+        )
+
+        # Les définitions ont été lues avant le renommage : elles visent déjà la nouvelle table
+        for definition in index:
+            cursor.execute(definition)
+        for nom, definition in cles_etrangeres:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{nom}" {definition}')
+    return est_partitionnee()
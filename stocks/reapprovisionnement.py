@@ -0,0 +1,100 @@
+"""
+Suggestions de réapprovisionnement groupées par fournisseur
+
+Pour chaque produit actif, la vélocité (ventes sur 30 jours calculées
+chaque nuit), le délai de livraison du fournisseur principal et le seuil
+d'alerte donnent un point de commande :
+
+    point de commande = seuil d'alerte + vélocité x délai de livraison
+
+Un produit dont le stock est au plus à ce point est proposé à la commande
+pour remonter à :
+
+    stock cible = seuil d'alerte + vélocité x (délai + jours de couverture)
+
+Le filtre sur le point de commande est évalué en SQL (arithmétique entière)
+sur tout le catalogue en une requête ; seules les lignes retenues sont
+calculées en Python.
+"""
+import math
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+
+from .models import VelociteProduit
+
+FENETRE = VelociteProduit.FENETRE_COUVERTURE
+DELAI_PAR_DEFAUT = 7
+
+
+def quantite_suggeree(stock, seuil, ventes, delai, jours_couverture):
+    """
+    Quantité à commander pour un produit (0 si le point de commande n'est pas atteint)
+    """
+    velocite = ventes / FENETRE
+    if stock > seuil + velocite * delai:
+        return 0
+    cible = seuil + math.ceil(velocite * (delai + jours_couverture))
+    return max(cible - stock, 0)
+
+
+def suggestions(fournisseur_id=None, jours_couverture=None):
+    """
+    Retourne la liste des commandes suggérées, une par fournisseur :
+    [{'fournisseur_id', 'fournisseur', 'delai_livraison', 'lignes', 'total'}]
+    Les produits sans fournisseur principal sont regroupés sous `None`.
+    """
+    from produits.models import Produit
+
+    if jours_couverture is None:
+        jours_couverture = settings.STOCKS_REAPPRO_JOURS_COUVERTURE
+
+    stock = Coalesce('solde__quantite', 0)
+    ventes = Coalesce('velocite__ventes_30j', 0)
+    delai = Coalesce('fournisseur_principal__delai_livraison', Value(DELAI_PAR_DEFAUT))
+    # stock <= seuil + ventes / FENETRE x délai, multiplié par FENETRE pour rester en entiers
+    candidats = Produit.objects.filter(is_active=True).annotate(
+        stock=stock,
+        ventes=ventes,
+        delai=delai,
+        marge=(F('seuil_alerte') - stock) * FENETRE + ventes * delai,
+    ).filter(marge__gte=0)
+    if fournisseur_id:
+        candidats = candidats.filter(fournisseur_principal_id=fournisseur_id)
+
+    commandes = {}
+    lignes = candidats.order_by('fournisseur_principal__nom', 'nom').values_list(
+        'id', 'code_produit', 'nom', 'unite', 'prix_achat', 'seuil_alerte', 'stock', 'ventes', 'delai',
+        'fournisseur_principal_id', 'fournisseur_principal__nom',
+    )
+    for (produit_id, code, nom, unite, prix_achat, seuil, stock, ventes, delai,
+         fournisseur, fournisseur_nom) in lignes.iterator(chunk_size=2000):
+        quantite = quantite_suggeree(stock, seuil, ventes, delai, jours_couverture)
+        if not quantite:
+            continue
+        commande = commandes.setdefault(fournisseur, {
+            'fournisseur_id': fournisseur,
+            'fournisseur': fournisseur_nom,
+            'delai_livraison': delai,
+            'lignes': [],
+            'total': Decimal(0),
+        })
+        montant = quantite * (prix_achat or Decimal(0))
+        commande['lignes'].append({
+            'produit_id': produit_id,
+            'code_produit': code,
+            'nom': nom,
+            'unite': unite,
+            'stock': stock,
+            'seuil_alerte': seuil,
+            'velocite': ventes / FENETRE,
+            'quantite': quantite,
+            'prix_achat': prix_achat,
+            'montant': montant,
+        })
+        commande['total'] += montant
+
+    # Fournisseurs par ordre alphabétique, produits sans fournisseur en dernier
+    return sorted(commandes.values(), key=lambda c: (c['fournisseur_id'] is None, c['fournisseur'] or ''))
@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import MouvementStock, SoldeEmplacement, SoldeStock
+
+
+class StockInsuffisant(Exception):
+    """
+    La sortie demandée rendrait le stock d'un produit négatif
+    """
+
+    def __init__(self, produit_id, disponible, demande):
+        self.produit_id = produit_id
+        self.disponible = disponible
+        self.demande = demande
+        super().__init__(
+            f"Stock insuffisant pour le produit {produit_id} : "
+            f"{disponible} disponible(s), {demande} demandé(s)"
+        )
+
+
+def verrouiller_soldes(produit_ids):
+    """
+    Verrouille les soldes des produits donnés jusqu'à la fin de la transaction.
+    Les lignes sont toujours verrouillées par identifiant croissant afin que
+    deux transactions concurrentes ne puissent pas s'interbloquer.
+    À appeler dans un bloc transaction.atomic().
+    """
+    produit_ids = sorted(set(produit_ids))
+    existants = set(
+        SoldeStock.objects.filter(produit_id__in=produit_ids).values_list('produit_id', flat=True)
+    )
+    manquants = [SoldeStock(produit_id=produit_id) for produit_id in produit_ids if produit_id not in existants]
+    if manquants:
+        SoldeStock.objects.bulk_create(manquants, ignore_conflicts=True)
+    return {
+        solde.produit_id: solde
+        for solde in SoldeStock.objects.select_for_update().filter(
+            produit_id__in=produit_ids
+        ).order_by('produit_id')
+    }
+
+
+def verrouiller_soldes_emplacement(produit_ids, emplacement_id):
+    """
+    Verrouille les soldes des produits donnés à un emplacement et retourne
+    leurs quantités {produit_id: quantite} (0 si le produit n'y a jamais été)
+    """
+    quantites = dict(
+        SoldeEmplacement.objects.select_for_update().filter(
+            produit_id__in=sorted(set(produit_ids)), emplacement_id=emplacement_id
+        ).order_by('produit_id').values_list('produit_id', 'quantite')
+    )
+    return {produit_id: quantites.get(produit_id, 0) for produit_id in produit_ids}
+
+
+def sortir_stock(lignes, motif='VENTE', autoriser_negatif=None, **champs):
+    """
+    Enregistre atomiquement des sorties de stock.
+
+    `lignes` est une liste de tuples (produit, quantite, prix_unitaire).
+    Les soldes concernés sont verrouillés avant le contrôle de disponibilité,
+    ce qui sérialise les ventes simultanées d'un même produit. Si le stock
+    négatif est interdit (paramètre STOCKS_INTERDIRE_STOCK_NEGATIF ou
+    `autoriser_negatif=False`), StockInsuffisant est levée et rien n'est écrit.
+    Avec `emplacement=...`, c'est le stock de cet emplacement qui est contrôlé.
+    """
+    if autoriser_negatif is None:
+        autoriser_negatif = not settings.STOCKS_INTERDIRE_STOCK_NEGATIF
+
+    quantites = {}
+    for produit, quantite, _ in lignes:
+        quantites[produit.pk] = quantites.get(produit.pk, 0) + quantite
+
+    with transaction.atomic():
+        soldes = verrouiller_soldes(quantites)
+        if not autoriser_negatif:
+            disponibles = {produit_id: solde.quantite for produit_id, solde in soldes.items()}
+            emplacement = champs.get('emplacement')
+            if emplacement:
+                # Vente depuis un emplacement précis : son propre solde doit suffire
+                disponibles = verrouiller_soldes_emplacement(quantites, emplacement.pk)
+            for produit_id, quantite in sorted(quantites.items()):
+                if disponibles[produit_id] < quantite:
+                    raise StockInsuffisant(produit_id, disponibles[produit_id], quantite)
+
+        champs.setdefault('date_mouvement', timezone.now())
+        return [
+            MouvementStock.objects.create(
+                produit=produit,
+                type_mouvement='SORTIE',
+                quantite=quantite,
+                motif=motif,
+                prix_unitaire=prix_unitaire,
+                **champs
+            )
+            for produit, quantite, prix_unitaire in lignes
+        ]
+
+
+def transferer_stock(produit, origine, destination, quantite, autoriser_negatif=None, **champs):
+    """
+    Transfère une quantité d'un produit entre deux emplacements.
+
+    Un seul mouvement TRANSFERT est écrit : le stock total, la valorisation
+    et l'historique du produit sont inchangés, seuls les deux soldes par
+    emplacement varient. Le solde d'origine est verrouillé pendant le
+    contrôle ; aucun historique n'est relu.
+    """
+    if autoriser_negatif is None:
+        autoriser_negatif = not settings.STOCKS_INTERDIRE_STOCK_NEGATIF
+    if quantite <= 0:
+        raise ValueError("La quantité transférée doit être positive")
+    if origine.pk == destination.pk:
+        raise ValueError("Les emplacements d'origine et de destination doivent être différents")
+
+    with transaction.atomic():
+        if not autoriser_negatif:
+            disponible = verrouiller_soldes_emplacement([produit.pk], origine.pk)[produit.pk]
+            if disponible < quantite:
+                raise StockInsuffisant(produit.pk, disponible, quantite)
+
+        champs.setdefault('date_mouvement', timezone.now())
+        return MouvementStock.objects.create(
+            produit=produit,
+            type_mouvement='TRANSFERT',
+            quantite=quantite,
+            motif='TRANSFERT',
+            emplacement=origine,
+            emplacement_destination=destination,
+            **champs
+        )
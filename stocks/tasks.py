@@ -0,0 +1,62 @@
+from datetime import date as Date, timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from . import archivage, partitions, valorisation
+from .models import ClotureStock, VelociteProduit
+
+
+@shared_task
+def cloturer_stock_journalier(date=None):
+    """
+    Enregistre les stocks de clôture de la veille (ou du jour donné au format ISO)
+    """
+    if date:
+        jour = Date.fromisoformat(date)
+    else:
+        jour = timezone.localdate() - timedelta(days=1)
+
+    total = ClotureStock.cloturer(jour)
+    return f"{total} clôtures de stock enregistrées pour le {jour.strftime('%d/%m/%Y')}"
+
+
+@shared_task
+def calculer_velocites_produits():
+    """
+    Recalcule les ventes moyennes sur 7/30/90 jours et la couverture de stock
+    """
+    total = VelociteProduit.recalculer()
+    return f"{total} vélocités de produits calculées"
+
+
+@shared_task
+def creer_partitions_stock(mois_a_venir=3):
+    """
+    Crée à l'avance les partitions mensuelles du journal des mouvements
+    (sans effet si la table n'est pas partitionnée)
+    """
+    total = partitions.creer_partitions(mois_a_venir)
+    return f"{total} partitions de mouvements de stock vérifiées"
+
+
+@shared_task
+def archiver_mouvements_stock(annees=None):
+    """
+    Archive les mouvements des anciens exercices en soldes d'ouverture
+    """
+    resultat = archivage.archiver(annees or settings.STOCKS_ARCHIVAGE_ANNEES)
+    return (
+        f"{resultat['mouvements']} mouvements archivés, "
+        f"{resultat['ouvertures']} soldes d'ouverture créés"
+    )
+
+
+@shared_task
+def reconstruire_valorisation_stock(taille_lot=500):
+    """
+    Recalcule la valorisation du stock par lots de produits
+    """
+    total = valorisation.reconstruire(taille_lot)
+    return f"{total} produits revalorisés"
@@ -1,3 +1,635 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import io
+import json
+import shutil
+import tempfile
+import threading
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.urls import reverse
+from django.utils import timezone
+
+from core import outbox
+from core.models import EvenementOutbox
+from produits.models import Categorie, Produit
+from utilisateurs.models import User
+from .models import (
+    AlerteStock, ClotureStock, CoucheFifo, Emplacement, InventaireSession, MouvementStock, SoldeEmplacement,
+    SoldeStock, ValorisationCategorie, VelociteProduit
+)
+from .services import StockInsuffisant, sortir_stock, transferer_stock
+from . import archivage, inventaire, partitions, reapprovisionnement, valorisation
+
+
+def creer_produit(stock_initial=0):
+    categorie = Categorie.objects.create(nom="Visserie")
+    produit = Produit.objects.create(
+        code_produit="VIS-001",
+        nom="Vis à bois",
+        categorie=categorie,
+        prix_achat=1,
+        prix_vente=2,
+    )
+    if stock_initial:
+        MouvementStock.objects.create(
+            produit=produit, type_mouvement='ENTREE', quantite=stock_initial, motif='ACHAT'
+        )
+    return produit
+
+
+class SortieStockTest(TestCase):
+
+    def test_sortie_met_a_jour_le_solde(self):
+        produit = creer_produit(stock_initial=10)
+        sortir_stock([(produit, 4, 2)], reference="V1")
+        self.assertEqual(SoldeStock.objects.get(produit=produit).quantite, 6)
+
+    @override_settings(STOCKS_INTERDIRE_STOCK_NEGATIF=True)
+    def test_stock_negatif_refuse(self):
+        produit = creer_produit(stock_initial=3)
+        with self.assertRaises(StockInsuffisant):
+            sortir_stock([(produit, 2, 2), (produit, 2, 2)])
+        self.assertEqual(SoldeStock.objects.get(produit=produit).quantite, 3)
+        self.assertFalse(MouvementStock.objects.filter(type_mouvement='SORTIE').exists())
+
+    def test_stock_negatif_autorise_par_defaut(self):
+        produit = creer_produit(stock_initial=1)
+        sortir_stock([(produit, 5, 2)])
+        self.assertEqual(SoldeStock.objects.get(produit=produit).quantite, -4)
+
+
+class MouvementStockAdminTest(TestCase):
+
+    def setUp(self):
+        self.produit = creer_produit(stock_initial=10)
+        self.sortie = MouvementStock.objects.create(
+            produit=self.produit, type_mouvement='SORTIE', quantite=3, motif='VENTE'
+        )
+        User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        self.client.login(username='admin', password='secret')
+        self.url = reverse('admin:stocks_mouvementstock_changelist')
+
+    def solde(self):
+        return SoldeStock.objects.get(produit=self.produit).quantite
+
+    def test_desactivation_depuis_la_liste(self):
+        mouvements = list(MouvementStock.objects.order_by('-date_mouvement'))
+        donnees = {
+            'form-TOTAL_FORMS': len(mouvements), 'form-INITIAL_FORMS': len(mouvements), '_save': 'Enregistrer',
+        }
+        for i, mouvement in enumerate(mouvements):
+            donnees[f'form-{i}-id'] = mouvement.pk
+            if mouvement != self.sortie:
+                donnees[f'form-{i}-is_active'] = 'on'
+        self.assertEqual(self.client.post(self.url, donnees).status_code, 302)
+        self.assertEqual(self.solde(), 10)
+
+        donnees[f'form-{mouvements.index(self.sortie)}-is_active'] = 'on'
+        self.client.post(self.url, donnees)
+        self.assertEqual(self.solde(), 7)
+        SoldeStock.reconstruire()
+        self.assertEqual(self.solde(), 7)
+
+    def test_suppression_groupee(self):
+        self.client.post(self.url, {
+            'action': 'delete_selected', '_selected_action': [self.sortie.pk], 'post': 'yes',
+        })
+        self.assertFalse(MouvementStock.objects.filter(pk=self.sortie.pk).exists())
+        self.assertEqual(self.solde(), 10)
+
+
+class TransfertStockTest(TestCase):
+
+    def soldes(self, produit):
+        return dict(SoldeEmplacement.objects.filter(produit=produit).values_list('emplacement__code', 'quantite'))
+
+    @override_settings(STOCKS_INTERDIRE_STOCK_NEGATIF=True)
+    def test_transfert_entre_emplacements(self):
+        produit = creer_produit(stock_initial=10)
+        boutique = Emplacement.objects.get(est_principal=True)
+        depot = Emplacement.objects.create(code="DEPOT", nom="Dépôt", type_emplacement='DEPOT')
+
+        transferer_stock(produit, boutique, depot, 4)
+        self.assertEqual(SoldeStock.objects.get(produit=produit).quantite, 10)
+        self.assertEqual(self.soldes(produit), {'BOUTIQUE': 6, 'DEPOT': 4})
+
+        with self.assertRaises(StockInsuffisant):
+            sortir_stock([(produit, 5, 2)], emplacement=depot)
+        sortir_stock([(produit, 3, 2)], emplacement=depot)
+        self.assertEqual(SoldeStock.objects.get(produit=produit).quantite, 7)
+        self.assertEqual(self.soldes(produit), {'BOUTIQUE': 6, 'DEPOT': 1})
+
+        SoldeEmplacement.reconstruire()
+        self.assertEqual(self.soldes(produit), {'BOUTIQUE': 6, 'DEPOT': 1})
+
+
+class ProduitPreselectionneTest(TestCase):
+
+    def test_formulaires_preselectionnent_le_produit_de_la_fiche(self):
+        self.client.force_login(User.objects.create_user("caisse", password="secret"))
+        produit = creer_produit()
+        for vue in ('create', 'entree', 'sortie', 'transfert', 'ajustement'):
+            reponse = self.client.get(reverse(f'stocks:{vue}'), {'produit': produit.pk})
+            self.assertEqual(reponse.context['produit_selectionne'], produit, vue)
+            self.assertContains(reponse, 'VIS-001 - Vis à bois')
+
+
+class OutboxTest(TestCase):
+
+    def test_relais_ordonne_et_reprise_apres_erreur(self):
+        produit = creer_produit(stock_initial=10)
+        sortir_stock([(produit, 4, 2)])
+        evenements = EvenementOutbox.objects.filter(agregat='stocks.mouvementstock')
+        self.assertEqual(
+            [e.donnees['type_mouvement'] for e in evenements], ['ENTREE', 'SORTIE']
+        )
+
+        recus, echecs = [], [True]
+
+        def abonne(evenement):
+            if evenement.donnees['type_mouvement'] == 'SORTIE' and echecs.pop():
+                raise RuntimeError("indisponible")
+            recus.append(evenement.pk)
+
+        outbox.abonner('stocks.mouvementstock')(abonne)
+        self.addCleanup(outbox._abonnes['stocks.mouvementstock'].remove, abonne)
+
+        # La sortie échoue : elle reste en file, sans bloquer les autres agrégats
+        with self.assertLogs('core.outbox', 'ERROR'):
+            outbox.relayer()
+        sortie = evenements.get(donnees__type_mouvement='SORTIE')
+        self.assertIsNone(sortie.traite_le)
+        self.assertEqual(sortie.tentatives, 1)
+
+        echecs.append(False)
+        outbox.relayer()
+        self.assertEqual(recus, list(evenements.values_list('pk', flat=True)))
+        self.assertFalse(EvenementOutbox.objects.filter(traite_le__isnull=True).exists())
+
+    def test_evenement_en_echec_bloque_son_agregat(self):
+        produit = creer_produit(stock_initial=10)
+        entree = MouvementStock.objects.get()
+        recus, echecs = [], [True]
+
+        def abonne(evenement):
+            if evenement.agregat_id == str(entree.pk) and echecs[-1]:
+                raise RuntimeError("indisponible")
+            recus.append(evenement.pk)
+
+        outbox.abonner('stocks.mouvementstock')(abonne)
+        self.addCleanup(outbox._abonnes['stocks.mouvementstock'].remove, abonne)
+
+        # Une seule tentative : l'événement de création est mis de côté
+        with self.assertLogs('core.outbox', 'ERROR'):
+            outbox.relayer(max_tentatives=1)
+        creation = EvenementOutbox.objects.get(agregat='stocks.mouvementstock', type_evenement='CREATION')
+        self.assertTrue(creation.en_echec)
+
+        # Les événements suivants du même mouvement attendent, les autres agrégats passent
+        entree.commentaire = "Corrigé"
+        entree.save()
+        sortir_stock([(produit, 1, 2)])
+        outbox.relayer(max_tentatives=1)
+        modification = EvenementOutbox.objects.get(agregat_id=str(entree.pk), type_evenement='MODIFICATION')
+        self.assertIsNone(modification.traite_le)
+        self.assertNotIn(modification.pk, recus)
+        self.assertTrue(EvenementOutbox.objects.get(
+            agregat='stocks.mouvementstock', donnees__type_mouvement='SORTIE'
+        ).traite_le)
+
+        # Relancé et traité, l'événement débloque la suite dans l'ordre
+        echecs.append(False)
+        EvenementOutbox.objects.filter(pk=creation.pk).update(en_echec=False, tentatives=0)
+        outbox.relayer(max_tentatives=1)
+        self.assertLess(recus.index(creation.pk), recus.index(modification.pk))
+        self.assertFalse(EvenementOutbox.objects.filter(traite_le__isnull=True).exists())
+
+
+class ValorisationTest(TestCase):
+
+    def setUp(self):
+        self.produit = creer_produit()
+
+    def entree(self, quantite, prix_unitaire, produit=None):
+        return MouvementStock.objects.create(
+            produit=produit or self.produit, type_mouvement='ENTREE', quantite=quantite,
+            motif='ACHAT', prix_unitaire=prix_unitaire,
+        )
+
+    def etat(self):
+        return (
+            {
+                solde.produit_id: (solde.quantite, solde.cout_moyen, solde.valeur_cmp, solde.valeur_fifo)
+                for solde in SoldeStock.objects.all()
+            },
+            sorted(CoucheFifo.objects.values_list('produit_id', 'quantite_restante', 'cout_unitaire')),
+            {
+                valeur.categorie_id: (valeur.valeur_cmp, valeur.valeur_fifo)
+                for valeur in ValorisationCategorie.objects.all()
+            },
+        )
+
+    def assertEtatReconstruit(self):
+        etat = self.etat()
+        valorisation.reconstruire()
+        self.assertEqual(self.etat(), etat)
+
+    def test_consommation_fifo_partielle(self):
+        self.entree(10, 1)
+        self.entree(10, 3)
+        sortir_stock([(self.produit, 15, 4)])
+
+        solde = SoldeStock.objects.get(produit=self.produit)
+        self.assertEqual((solde.quantite, solde.cout_moyen, solde.valeur_cmp, solde.valeur_fifo), (5, 2, 10, 15))
+        # La première couche est épuisée, la seconde entamée
+        self.assertEqual(list(CoucheFifo.objects.values_list('quantite_restante', 'cout_unitaire')), [(5, 3)])
+        categorie = ValorisationCategorie.objects.get(categorie=self.produit.categorie)
+        self.assertEqual((categorie.valeur_cmp, categorie.valeur_fifo), (10, 15))
+        self.assertEtatReconstruit()
+
+    def test_modification_rejoue_le_journal_du_produit(self):
+        premiere = self.entree(10, 1)
+        self.entree(10, 3)
+        sortir_stock([(self.produit, 15, 4)])
+
+        premiere.quantite = 20
+        premiere.save()
+        solde = SoldeStock.objects.get(produit=self.produit)
+        # CMP (20 x 1 + 10 x 3) / 30 ; FIFO : 5 restants à 1 puis 10 à 3
+        self.assertEqual((solde.quantite, solde.valeur_cmp, solde.valeur_fifo), (15, Decimal('25.00'), 35))
+        self.assertEtatReconstruit()
+
+        # Sans la première entrée, la sortie épuise les couches : le stock négatif n'a pas de valeur FIFO
+        premiere.delete()
+        solde = SoldeStock.objects.get(produit=self.produit)
+        self.assertEqual((solde.quantite, solde.valeur_fifo), (-5, 0))
+        self.assertFalse(CoucheFifo.objects.exists())
+        self.assertEtatReconstruit()
+
+    def test_cumul_par_categorie(self):
+        outillage = Categorie.objects.create(nom="Outillage")
+        marteau = Produit.objects.create(
+            code_produit="MAR-001", nom="Marteau", categorie=outillage, prix_achat=8, prix_vente=15,
+        )
+        self.entree(10, 1)
+        self.entree(2, None, produit=marteau)
+        self.assertEqual(ValorisationCategorie.valeur_boutique(), {'valeur_cmp': 26, 'valeur_fifo': 26})
+
+        # Changer de catégorie transfère la valeur du produit
+        self.produit.categorie = outillage
+        self.produit.save()
+        self.assertEqual(ValorisationCategorie.objects.get(categorie=outillage).valeur_cmp, 26)
+        self.assertEqual(ValorisationCategorie.objects.get(categorie__nom="Visserie").valeur_cmp, 0)
+        self.assertEtatReconstruit()
+
+
+class ClotureStockTest(TestCase):
+
+    def setUp(self):
+        self.produit = creer_produit()
+        self.aujourdhui = timezone.localdate()
+        self.jours = [self.aujourdhui - datetime.timedelta(days=n) for n in (3, 2, 1)]
+
+    def mouvement(self, jour, type_mouvement, quantite, heure=12):
+        return MouvementStock.objects.create(
+            produit=self.produit, type_mouvement=type_mouvement, quantite=quantite, motif='ACHAT',
+            date_mouvement=timezone.make_aware(datetime.datetime.combine(jour, datetime.time(heure))),
+        )
+
+    def stock_grand_livre(self, jour):
+        total = 0
+        for mouvement in MouvementStock.objects.filter(produit=self.produit, is_active=True):
+            if timezone.localdate(mouvement.date_mouvement) <= jour:
+                total += MouvementStock.impact_stock(
+                    mouvement.type_mouvement, mouvement.quantite, mouvement.is_active
+                )
+        return total
+
+    def test_stock_at_suit_les_mouvements_retroactifs(self):
+        # Mouvements aux bornes de la journée locale : minuit inclus, minuit suivant exclu
+        self.mouvement(self.jours[0], 'ENTREE', 10, heure=0)
+        self.mouvement(self.jours[1], 'SORTIE', 3)
+        self.mouvement(self.jours[2], 'ENTREE', 5, heure=23)
+        for jour in self.jours:
+            ClotureStock.cloturer(jour)
+        self.assertEqual(
+            list(ClotureStock.objects.order_by('date').values_list('quantite', flat=True)), [10, 7, 12]
+        )
+
+        # Saisie rétroactive, correction et annulation après les clôtures
+        self.mouvement(self.jours[0], 'SORTIE', 2, heure=8)
+        entree = MouvementStock.objects.get(quantite=5)
+        entree.quantite = 4
+        entree.save()
+        sortie = MouvementStock.objects.get(quantite=3)
+        sortie.is_active = False
+        sortie.save()
+
+        for jour in self.jours + [self.aujourdhui]:
+            self.assertEqual(self.produit.stock_at(jour), self.stock_grand_livre(jour), jour)
+        self.assertEqual(self.produit.stock_at(self.jours[2]), 12)
+
+        # Une nouvelle clôture du même jour repart des mouvements, pas d'elle-même
+        ClotureStock.cloturer(self.jours[2])
+        self.assertEqual(ClotureStock.objects.get(date=self.jours[2]).quantite, 12)
+
+
+class InventaireTest(TestCase):
+
+    def test_validation_ajuste_les_soldes(self):
+        produit = creer_produit(stock_initial=10)
+        session = InventaireSession.objects.create(reference="INV-1")
+        comptages = inventaire.lire_csv(io.BytesIO(b"code;quantite\nVIS-001;4\nVIS-001\nINCONNU;2\n"))
+        total, inconnus = inventaire.enregistrer_comptages(session, comptages)
+        self.assertEqual((total, inconnus), (1, ['INCONNU']))
+
+        self.assertEqual(inventaire.valider(session), 1)
+        self.assertEqual(SoldeStock.objects.get(produit=produit).quantite, 5)
+        ajustement = MouvementStock.objects.get(motif='AJUSTEMENT_INVENTAIRE')
+        self.assertEqual((ajustement.type_mouvement, ajustement.quantite), ('SORTIE', 5))
+        ligne = session.lignes.get()
+        self.assertEqual((ligne.stock_theorique, ligne.ecart), (10, -5))
+
+    def test_validation_valorise_les_ajustements_sans_rejouer(self):
+        produit = creer_produit(stock_initial=10)
+        autre = Produit.objects.create(
+            code_produit="VIS-002", nom="Vis métal", categorie=produit.categorie, prix_achat=3, prix_vente=5,
+        )
+        MouvementStock.objects.create(produit=autre, type_mouvement='ENTREE', quantite=2, motif='ACHAT')
+        session = InventaireSession.objects.create(reference="INV-3")
+        inventaire.enregistrer_comptages(session, {'VIS-001': 4, 'VIS-002': 6})
+
+        self.assertEqual(inventaire.valider(session), 2)
+        valeurs = {
+            solde.produit_id: (solde.quantite, solde.cout_moyen, solde.valeur_cmp, solde.valeur_fifo)
+            for solde in SoldeStock.objects.all()
+        }
+        self.assertEqual(valeurs[produit.pk], (4, 1, 4, 4))
+        self.assertEqual(valeurs[autre.pk], (6, 3, 18, 18))
+
+        valorisation.reconstruire()
+        self.assertEqual(valeurs, {
+            solde.produit_id: (solde.quantite, solde.cout_moyen, solde.valeur_cmp, solde.valeur_fifo)
+            for solde in SoldeStock.objects.all()
+        })
+
+    def test_session_validee_non_modifiable(self):
+        creer_produit(stock_initial=1)
+        session = InventaireSession.objects.create(reference="INV-2", statut='VALIDEE')
+        with self.assertRaises(inventaire.InventaireError):
+            inventaire.enregistrer_comptages(session, {'VIS-001': 1})
+
+
+class ReapprovisionnementTest(TestCase):
+
+    def test_quantite_suggeree(self):
+        # 15 ventes en 30 jours, 10 jours de délai : point de commande à 5 + 5
+        self.assertEqual(reapprovisionnement.quantite_suggeree(11, 5, 15, 10, 30), 0)
+        self.assertEqual(reapprovisionnement.quantite_suggeree(10, 5, 15, 10, 30), 15)
+        # Sans vente, on remonte simplement au seuil
+        self.assertEqual(reapprovisionnement.quantite_suggeree(-2, 5, 0, 10, 30), 7)
+
+    def test_suggestions_groupees_par_fournisseur(self):
+        produit = creer_produit(stock_initial=2)
+        produit.seuil_alerte = 5
+        produit.save()
+        commandes = reapprovisionnement.suggestions()
+        self.assertEqual(len(commandes), 1)
+        self.assertIsNone(commandes[0]['fournisseur_id'])
+        self.assertEqual(commandes[0]['lignes'][0]['quantite'], 3)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class SortieStockConcurrenteTest(TransactionTestCase):
+    """
+    Plusieurs caisses vendent le même produit en même temps
+    """
+    NB_CAISSES = 8
+    VENTES_PAR_CAISSE = 10
+    STOCK_INITIAL = 50
+
+    @override_settings(STOCKS_INTERDIRE_STOCK_NEGATIF=True)
+    def test_ventes_simultanees(self):
+        produit = creer_produit(stock_initial=self.STOCK_INITIAL)
+        refus = []
+        erreurs = []
+        depart = threading.Barrier(self.NB_CAISSES)
+
+        def caisse():
+            try:
+                depart.wait()
+                for _ in range(self.VENTES_PAR_CAISSE):
+                    try:
+                        sortir_stock([(produit, 1, 2)])
+                    except StockInsuffisant:
+                        refus.append(1)
+            except Exception as e:
+                erreurs.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=caisse) for _ in range(self.NB_CAISSES)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(erreurs, [])
+        total = self.NB_CAISSES * self.VENTES_PAR_CAISSE
+        self.assertEqual(len(refus), total - self.STOCK_INITIAL)
+        self.assertEqual(SoldeStock.objects.get(produit=produit).quantite, 0)
+        self.assertEqual(
+            MouvementStock.objects.filter(produit=produit, type_mouvement='SORTIE').count(),
+            self.STOCK_INITIAL,
+        )
+
+
+class AlerteStockTest(TestCase):
+
+    def setUp(self):
+        self.produit = Produit.objects.create(
+            code_produit="VIS-001", nom="Vis à bois", categorie=Categorie.objects.create(nom="Visserie"),
+            prix_achat=1, prix_vente=2, seuil_alerte=5,
+        )
+
+    def mouvement(self, type_mouvement, quantite):
+        MouvementStock.objects.create(
+            produit=self.produit, type_mouvement=type_mouvement, quantite=quantite, motif='ACHAT'
+        )
+
+    def alertes(self):
+        return list(AlerteStock.objects.values_list('produit_id', 'stock_actuel', 'seuil', 'ecart'))
+
+    def test_alertes_suivent_soldes_et_seuils(self):
+        self.mouvement('ENTREE', 10)
+        self.assertEqual(self.alertes(), [])
+
+        self.mouvement('SORTIE', 7)
+        self.assertEqual(self.alertes(), [(self.produit.pk, 3, 5, 2)])
+
+        self.produit.seuil_alerte = 2
+        self.produit.save()
+        self.assertEqual(self.alertes(), [])
+
+        self.produit.seuil_alerte = 8
+        self.produit.save()
+        alertes = self.alertes()
+        self.assertEqual(alertes, [(self.produit.pk, 3, 8, 5)])
+        AlerteStock.reconstruire()
+        self.assertEqual(self.alertes(), alertes)
+
+        # Un produit désactivé n'est plus en alerte
+        self.produit.is_active = False
+        self.produit.save()
+        self.assertEqual(self.alertes(), [])
+
+
+class PartitionnementTest(TestCase):
+
+    def test_bornes_des_partitions_mensuelles(self):
+        self.assertEqual(partitions._debut_mois(datetime.date(2026, 12, 15)), datetime.date(2026, 12, 1))
+        self.assertEqual(partitions._debut_mois(datetime.date(2026, 12, 15), 1), datetime.date(2027, 1, 1))
+        self.assertEqual(partitions._debut_mois(datetime.date(2026, 1, 31), 14), datetime.date(2027, 3, 1))
+        self.assertEqual(partitions._nom_partition(datetime.date(2027, 1, 1)), "stocks_mouvementstock_p202701")
+
+    def test_table_simple_hors_postgresql(self):
+        if partitions.est_supporte():
+            self.skipTest("Base PostgreSQL")
+        self.assertFalse(partitions.est_partitionnee())
+        self.assertEqual(partitions.creer_partitions(), 0)
+        with self.assertRaises(CommandError):
+            call_command('partition_stock_ledger', stdout=io.StringIO())
+
+    @skipUnless(partitions.est_supporte(), "Partitionnement PostgreSQL uniquement")
+    def test_partition_creee_apres_coup_reprend_les_lignes_de_la_partition_par_defaut(self):
+        produit = creer_produit()
+        partitions.partitionner(mois_a_venir=0)
+        # Mouvement daté au-delà des partitions existantes : il tombe dans la partition par défaut
+        date_future = timezone.now() + datetime.timedelta(days=100)
+        mouvement = MouvementStock.objects.create(
+            produit=produit, type_mouvement='ENTREE', quantite=5, motif='ACHAT', date_mouvement=date_future
+        )
+
+        partitions.creer_partitions(mois_a_venir=4)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT tableoid::regclass::text FROM "{partitions.TABLE}" WHERE id = %s', [mouvement.pk])
+            self.assertEqual(cursor.fetchone()[0], partitions._nom_partition(date_future.date().replace(day=1)))
+            cursor.execute(f'SELECT count(*) FROM "{partitions.TABLE}_defaut"')
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertTrue(MouvementStock.objects.filter(pk=mouvement.pk, quantite=5).exists())
+
+
+class ArchivageTest(TestCase):
+
+    def test_archivage_conserve_les_soldes(self):
+        produit = creer_produit(stock_initial=10)
+        boutique = Emplacement.objects.get(est_principal=True)
+        depot = Emplacement.objects.create(code="DEPOT", nom="Dépôt", type_emplacement='DEPOT')
+        transferer_stock(produit, boutique, depot, 4)
+        sortir_stock([(produit, 1, 2)])
+        MouvementStock.objects.update(date_mouvement=timezone.now() - datetime.timedelta(days=3 * 366))
+        sortir_stock([(produit, 2, 2)], emplacement=depot)
+
+        soldes = dict(SoldeEmplacement.objects.values_list('emplacement__code', 'quantite'))
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        resultat = archivage.archiver(2, dossier=dossier)
+
+        self.assertEqual((resultat['mouvements'], resultat['ouvertures']), (3, 2))
+        with gzip.open(resultat['fichier'], 'rt', encoding='utf-8') as fichier:
+            self.assertEqual(len(fichier.readlines()), 3)
+        # Un solde d'ouverture par emplacement, plus la sortie récente conservée
+        self.assertEqual(sorted(MouvementStock.objects.values_list('motif', 'quantite')), [
+            (archivage.MOTIF_OUVERTURE, 4), (archivage.MOTIF_OUVERTURE, 5), ('VENTE', 2),
+        ])
+        self.assertEqual(archivage.soldes_journal(), {produit.pk: 7})
+        self.assertEqual(SoldeStock.objects.get(produit=produit).quantite, 7)
+        SoldeEmplacement.reconstruire()
+        self.assertEqual(dict(SoldeEmplacement.objects.values_list('emplacement__code', 'quantite')), soldes)
+
+
+class ExportMouvementsTest(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("caisse", password="secret"))
+        self.produit = creer_produit(stock_initial=10)
+        self.depot = Emplacement.objects.create(code="DEPOT", nom="Dépôt", type_emplacement='DEPOT')
+        transferer_stock(
+            self.produit, Emplacement.objects.get(est_principal=True), self.depot, 4, commentaire='Rayon "vis"; bas'
+        )
+        sortir_stock([(self.produit, 1, 2)], reference="V1")
+
+    def exporter(self, **params):
+        reponse = self.client.get(reverse('stocks:export'), params)
+        self.assertEqual(reponse.status_code, 200)
+        return b''.join(reponse.streaming_content).decode('utf-8')
+
+    def test_export_csv_filtre(self):
+        lignes = list(csv.DictReader(io.StringIO(self.exporter(format='csv').lstrip('\ufeff')), delimiter=';'))
+        self.assertEqual([ligne['motif'] for ligne in lignes], ['ACHAT', 'TRANSFERT', 'VENTE'])
+        self.assertEqual(lignes[1]['commentaire'], 'Rayon "vis"; bas')
+
+        # Un transfert concerne ses deux emplacements
+        lignes = list(csv.DictReader(io.StringIO(
+            self.exporter(format='csv', emplacement=self.depot.pk).lstrip('\ufeff')
+        ), delimiter=';'))
+        self.assertEqual([(ligne['emplacement'], ligne['emplacement_destination']) for ligne in lignes], [
+            ('BOUTIQUE', 'DEPOT'),
+        ])
+
+        demain = (timezone.localdate() + datetime.timedelta(days=1)).isoformat()
+        self.assertEqual(self.exporter(format='csv', date_debut=demain).count('\n'), 1)
+
+    def test_export_ndjson(self):
+        lignes = [json.loads(ligne) for ligne in self.exporter(format='ndjson', type_mouvement='SORTIE').splitlines()]
+        self.assertEqual(len(lignes), 1)
+        self.assertEqual(
+            (lignes[0]['code_produit'], lignes[0]['quantite'], lignes[0]['reference']), ("VIS-001", 1, "V1")
+        )
+
+
+class VelociteProduitTest(TestCase):
+
+    def vente(self, produit, quantite, jours, **champs):
+        champs.setdefault('motif', 'VENTE')
+        MouvementStock.objects.create(
+            produit=produit, type_mouvement='SORTIE', quantite=quantite,
+            date_mouvement=timezone.now() - datetime.timedelta(days=jours), **champs
+        )
+
+    def test_fenetres_et_couverture(self):
+        produit = creer_produit(stock_initial=100)
+        sans_vente = Produit.objects.create(
+            code_produit="MAR-001", nom="Marteau", categorie=produit.categorie, prix_achat=8, prix_vente=15,
+        )
+        self.vente(produit, 3, 5)
+        self.vente(produit, 6, 20)
+        self.vente(produit, 9, 60)
+        # Ni les ventes annulées ni les autres sorties ne comptent
+        self.vente(produit, 50, 1, is_active=False)
+        self.vente(produit, 1, 1, motif='CASSAGE')
+
+        self.assertEqual(VelociteProduit.recalculer(), 2)
+        velocite = VelociteProduit.objects.get(produit=produit)
+        self.assertEqual((velocite.ventes_7j, velocite.ventes_30j, velocite.ventes_90j), (3, 9, 18))
+        # 81 en stock pour 9 vendus en 30 jours
+        self.assertEqual(velocite.couverture_jours, 270)
+        self.assertIsNone(VelociteProduit.objects.get(produit=sans_vente).couverture_jours)
+
+        # Une vente met à jour la couverture sans relire l'historique des ventes
+        sortir_stock([(produit, 18, 2)])
+        VelociteProduit.actualiser_couverture({produit.pk})
+        self.assertEqual(VelociteProduit.objects.get(produit=produit).couverture_jours, 210)
+
+        sans_vente.is_active = False
+        sans_vente.save()
+        self.assertEqual(VelociteProduit.recalculer(), 1)
+        self.assertFalse(VelociteProduit.objects.filter(produit=sans_vente).exists())
@@ -5,9 +5,16 @@ app_name = 'stocks'
 
 urlpatterns = [
     path('', views.MouvementStockListView.as_view(), name='list'),
+    path('export/', views.MouvementStockExportView.as_view(), name='export'),
     path('create/', views.MouvementStockCreateView.as_view(), name='create'),
     path('<int:pk>/', views.MouvementStockDetailView.as_view(), name='detail'),
     path('entree/', views.EntreeStockView.as_view(), name='entree'),
     path('sortie/', views.SortieStockView.as_view(), name='sortie'),
+    path('transfert/', views.TransfertStockView.as_view(), name='transfert'),
     path('ajustement/', views.AjustementStockView.as_view(), name='ajustement'),
+    path('reapprovisionnement/', views.ReapprovisionnementView.as_view(), name='reapprovisionnement'),
+    path('inventaires/', views.InventaireListView.as_view(), name='inventaire_list'),
+    path('inventaires/<int:pk>/', views.InventaireDetailView.as_view(), name='inventaire_detail'),
+    path('inventaires/<int:pk>/import/', views.InventaireImportView.as_view(), name='inventaire_import'),
+    path('inventaires/<int:pk>/valider/', views.InventaireValiderView.as_view(), name='inventaire_valider'),
 ]
@@ -0,0 +1,297 @@
+"""
+Valorisation du stock au coût moyen pondéré (CMP) et en FIFO
+
+Chaque entrée ou sortie active met à jour, dans la transaction du
+mouvement, le coût moyen et les valeurs du solde du produit, ses couches
+FIFO et la valeur cumulée de sa catégorie ; un lot inséré avec bulk_create
+est valorisé de la même façon, en quelques requêtes. La modification ou la
+suppression d'un mouvement existant rejoue le journal du seul produit
+concerné ; `reconstruire` rejoue tout le journal par lots de produits.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CoucheFifo, MouvementStock, SoldeStock, ValorisationCategorie
+
+CENTIME = Decimal('0.01')
+PRECISION_COUT = Decimal('0.0001')
+
+
+def _cout_entree(mouvement, prix_achat):
+    """
+    Coût unitaire d'une entrée : son prix, ou à défaut le prix d'achat du produit
+    """
+    if mouvement.prix_unitaire:
+        return Decimal(mouvement.prix_unitaire)
+    return Decimal(prix_achat or 0)
+
+
+def _nouveau_cout_moyen(quantite_avant, cout_moyen, quantite, cout):
+    if quantite_avant <= 0:
+        return cout.quantize(PRECISION_COUT)
+    valeur = quantite_avant * cout_moyen + quantite * cout
+    return (valeur / (quantite_avant + quantite)).quantize(PRECISION_COUT)
+
+
+def _consommer(couches, quantite):
+    """
+    Consomme les couches les plus anciennes ; retourne la valeur sortie
+    et les couches modifiées
+    """
+    valeur = Decimal(0)
+    modifiees = []
+    for couche in couches:
+        if not quantite:
+            break
+        prise = min(quantite, couche.quantite_restante)
+        couche.quantite_restante -= prise
+        valeur += prise * couche.cout_unitaire
+        quantite -= prise
+        modifiees.append(couche)
+    return valeur, modifiees
+
+
+def appliquer_mouvement(mouvement):
+    """
+    Met à jour la valorisation après l'enregistrement d'un nouveau mouvement.
+    Le solde du produit doit déjà inclure le mouvement.
+    """
+    appliquer_mouvements([mouvement])
+
+
+def appliquer_mouvements(mouvements):
+    """
+    Met à jour la valorisation après l'enregistrement d'un lot de nouveaux
+    mouvements (dans leur ordre), sans rejouer le journal : une lecture des
+    soldes et des couches FIFO concernés, puis une écriture par table.
+    Les soldes des produits doivent déjà inclure ces mouvements.
+    """
+    mouvements = [
+        mouvement for mouvement in mouvements
+        if mouvement.type_mouvement in MouvementStock.SENS_STOCK and mouvement.is_active and mouvement.quantite
+    ]
+    if not mouvements:
+        return
+
+    with transaction.atomic():
+        soldes = {
+            solde.produit_id: solde
+            for solde in SoldeStock.objects.select_for_update().select_related('produit').filter(
+                produit_id__in={mouvement.produit_id for mouvement in mouvements}
+            )
+        }
+        couches = {}
+        for couche in CoucheFifo.objects.select_for_update().filter(
+            produit_id__in={
+                mouvement.produit_id for mouvement in mouvements
+                if MouvementStock.SENS_STOCK[mouvement.type_mouvement] < 0
+            },
+            quantite_restante__gt=0,
+        ).order_by('produit_id', 'date_entree', 'id'):
+            couches.setdefault(couche.produit_id, []).append(couche)
+
+        valeurs_avant = {
+            produit_id: (solde.valeur_cmp, solde.valeur_fifo) for produit_id, solde in soldes.items()
+        }
+        quantites = {produit_id: solde.quantite for produit_id, solde in soldes.items()}
+        for mouvement in mouvements:
+            quantites[mouvement.produit_id] -= MouvementStock.impact_stock(
+                mouvement.type_mouvement, mouvement.quantite
+            )
+
+        nouvelles_couches, modifiees = [], []
+        for mouvement in mouvements:
+            solde = soldes[mouvement.produit_id]
+            sens = MouvementStock.SENS_STOCK[mouvement.type_mouvement]
+            if sens > 0:
+                cout = _cout_entree(mouvement, solde.produit.prix_achat)
+                solde.cout_moyen = _nouveau_cout_moyen(
+                    quantites[mouvement.produit_id], solde.cout_moyen, mouvement.quantite, cout
+                )
+                couche = CoucheFifo(
+                    produit_id=mouvement.produit_id,
+                    mouvement_id=mouvement.pk,
+                    date_entree=mouvement.date_mouvement,
+                    quantite_restante=mouvement.quantite,
+                    cout_unitaire=cout,
+                )
+                nouvelles_couches.append(couche)
+                couches.setdefault(mouvement.produit_id, []).append(couche)
+                solde.valeur_fifo += mouvement.quantite * cout
+            else:
+                valeur, touchees = _consommer(couches.get(mouvement.produit_id, []), mouvement.quantite)
+                modifiees.extend(couche for couche in touchees if couche.pk)
+                couches[mouvement.produit_id] = [
+                    couche for couche in couches.get(mouvement.produit_id, []) if couche.quantite_restante
+                ]
+                solde.valeur_fifo -= valeur
+            quantites[mouvement.produit_id] += sens * mouvement.quantite
+
+        CoucheFifo.objects.bulk_create(
+            [couche for couche in nouvelles_couches if couche.quantite_restante], batch_size=1000
+        )
+        CoucheFifo.objects.bulk_update(
+            [couche for couche in modifiees if couche.quantite_restante], ['quantite_restante'], batch_size=1000
+        )
+        CoucheFifo.objects.filter(
+            pk__in=[couche.pk for couche in modifiees if not couche.quantite_restante]
+        ).delete()
+
+        maintenant = timezone.now()
+        deltas = {}
+        for produit_id, solde in soldes.items():
+            solde.valeur_cmp = (solde.quantite * solde.cout_moyen).quantize(CENTIME)
+            solde.valeur_fifo = solde.valeur_fifo.quantize(CENTIME)
+            # bulk_update ne renseigne pas les champs auto_now
+            solde.updated_at = maintenant
+            valeur_cmp_avant, valeur_fifo_avant = valeurs_avant[produit_id]
+            delta = deltas.setdefault(solde.produit.categorie_id, [Decimal(0), Decimal(0)])
+            delta[0] += solde.valeur_cmp - valeur_cmp_avant
+            delta[1] += solde.valeur_fifo - valeur_fifo_avant
+        SoldeStock.objects.bulk_update(
+            soldes.values(), ['cout_moyen', 'valeur_cmp', 'valeur_fifo', 'updated_at'], batch_size=1000
+        )
+        for categorie_id, (delta_cmp, delta_fifo) in deltas.items():
+            ValorisationCategorie.appliquer(categorie_id, delta_cmp, delta_fifo)
+
+
+def _rejouer(mouvements, prix_achat):
+    """
+    Rejoue les mouvements d'un produit (triés par date) ; retourne
+    (quantite, cout_moyen, couches restantes)
+    """
+    quantite, cout_moyen, couches = 0, Decimal(0), []
+    for mouvement in mouvements:
+        sens = MouvementStock.SENS_STOCK.get(mouvement.type_mouvement)
+        if sens is None:
+            continue
+        if sens > 0:
+            cout = _cout_entree(mouvement, prix_achat)
+            cout_moyen = _nouveau_cout_moyen(quantite, cout_moyen, mouvement.quantite, cout)
+            couches.append(CoucheFifo(
+                produit_id=mouvement.produit_id,
+                mouvement_id=mouvement.pk,
+                date_entree=mouvement.date_mouvement,
+                quantite_restante=mouvement.quantite,
+                cout_unitaire=cout,
+            ))
+        else:
+            _consommer(couches, mouvement.quantite)
+            couches = [couche for couche in couches if couche.quantite_restante]
+        quantite += sens * mouvement.quantite
+    return quantite, cout_moyen, couches
+
+
+def _revaloriser(produits, mouvements_par_produit):
+    """
+    Réécrit soldes, couches FIFO et catégories pour une liste de produits
+    """
+    soldes = {
+        solde.produit_id: solde
+        for solde in SoldeStock.objects.select_for_update().filter(
+            produit_id__in=[produit.pk for produit in produits]
+        )
+    }
+    CoucheFifo.objects.filter(produit_id__in=[produit.pk for produit in produits]).delete()
+
+    nouvelles_couches = []
+    deltas = {}
+    for produit in produits:
+        solde = soldes.get(produit.pk) or SoldeStock(produit_id=produit.pk)
+        quantite, cout_moyen, couches = _rejouer(
+            mouvements_par_produit.get(produit.pk, []), produit.prix_achat
+        )
+        valeur_cmp = (quantite * cout_moyen).quantize(CENTIME)
+        valeur_fifo = sum((c.quantite_restante * c.cout_unitaire for c in couches), Decimal(0)).quantize(CENTIME)
+        delta = deltas.setdefault(produit.categorie_id, [Decimal(0), Decimal(0)])
+        delta[0] += valeur_cmp - solde.valeur_cmp
+        delta[1] += valeur_fifo - solde.valeur_fifo
+        solde.quantite, solde.cout_moyen = quantite, cout_moyen
+        solde.valeur_cmp, solde.valeur_fifo = valeur_cmp, valeur_fifo
+        soldes[produit.pk] = solde
+        nouvelles_couches.extend(couches)
+
+    SoldeStock.objects.bulk_create(
+        soldes.values(),
+        update_conflicts=True,
+        unique_fields=['produit'],
+        update_fields=['quantite', 'cout_moyen', 'valeur_cmp', 'valeur_fifo', 'updated_at'],
+    )
+    CoucheFifo.objects.bulk_create(nouvelles_couches, batch_size=1000)
+    for categorie_id, (delta_cmp, delta_fifo) in deltas.items():
+        ValorisationCategorie.appliquer(categorie_id, delta_cmp, delta_fifo)
+
+
+def changer_categorie(produit_id, ancienne_categorie_id, nouvelle_categorie_id):
+    """
+    Transfère la valeur du stock d'un produit vers sa nouvelle catégorie
+    """
+    solde = SoldeStock.objects.filter(produit_id=produit_id).first()
+    if solde is None or ancienne_categorie_id == nouvelle_categorie_id:
+        return
+    with transaction.atomic():
+        ValorisationCategorie.appliquer(ancienne_categorie_id, -solde.valeur_cmp, -solde.valeur_fifo)
+        ValorisationCategorie.appliquer(nouvelle_categorie_id, solde.valeur_cmp, solde.valeur_fifo)
+
+
+def revaloriser_produits(produit_ids):
+    """
+    Rejoue le journal des produits donnés (après modification d'un mouvement existant)
+    """
+    from produits.models import Produit
+
+    produits = list(Produit.objects.filter(pk__in=produit_ids))
+    mouvements = {}
+    for mouvement in MouvementStock.objects.filter(
+        produit_id__in=produit_ids, is_active=True
+    ).order_by('date_mouvement', 'id').iterator(chunk_size=2000):
+        mouvements.setdefault(mouvement.produit_id, []).append(mouvement)
+    with transaction.atomic():
+        _revaloriser(produits, mouvements)
+
+
+def reconstruire(taille_lot=500):
+    """
+    Recalcule toute la valorisation à partir du journal, par lots de produits.
+    Retourne le nombre de produits traités.
+    """
+    from produits.models import Produit
+
+    produit_ids = list(Produit.objects.order_by('pk').values_list('pk', flat=True))
+    for debut in range(0, len(produit_ids), taille_lot):
+        revaloriser_produits(produit_ids[debut:debut + taille_lot])
+
+    # Les lots ont appliqué des deltas : on resynchronise les catégories depuis les soldes
+    recalculer_categories()
+    return len(produit_ids)
+
+
+def recalculer_categories():
+    """
+    Recalcule la valeur cumulée de chaque catégorie à partir des soldes
+    """
+    from django.db.models import Sum
+    from produits.models import Categorie
+
+    totaux = {
+        ligne['produit__categorie']: ligne
+        for ligne in SoldeStock.objects.values('produit__categorie').annotate(
+            total_cmp=Sum('valeur_cmp'), total_fifo=Sum('valeur_fifo')
+        )
+    }
+    with transaction.atomic():
+        ValorisationCategorie.objects.bulk_create(
+            [
+                ValorisationCategorie(
+                    categorie_id=categorie_id,
+                    valeur_cmp=totaux.get(categorie_id, {}).get('total_cmp') or 0,
+                    valeur_fifo=totaux.get(categorie_id, {}).get('total_fifo') or 0,
+                )
+                for categorie_id in Categorie.objects.values_list('pk', flat=True)
+            ],
+            update_conflicts=True,
+            unique_fields=['categorie'],
+            update_fields=['valeur_cmp', 'valeur_fifo', 'updated_at'],
+        )
@@ -1,65 +1,89 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.generic import ListView, DetailView, TemplateView
+from django.views.generic import ListView, DetailView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.db.models import Q
+from django.db.models import Count, Q
 from django.utils import timezone
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.paginator import Paginator
+import csv
+import json
 
-from .models import MouvementStock
+from core.pagination import CursorPaginationMixin
+from .models import Emplacement, MouvementStock, InventaireSession
+from .services import StockInsuffisant, sortir_stock, transferer_stock
+from . import inventaire, reapprovisionnement
+from .export import FORMATS, exporter, filtrer_mouvements
 from produits.models import Produit
 from fournisseurs.models import Fournisseur
 
 
-class MouvementStockListView(LoginRequiredMixin, ListView):
+def produit_selectionne(request):
+    """
+    Produit présélectionné par le paramètre `produit` (liens depuis la fiche produit)
+    """
+    produit_id = request.GET.get('produit', '')
+    if not produit_id.isdigit():
+        return None
+    return Produit.objects.filter(pk=produit_id, is_active=True).first()
+
+
+class MouvementStockListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = MouvementStock
     template_name = 'stocks/list.html'
     context_object_name = 'mouvements'
     paginate_by = 20
+    cursor_ordering = ('-date_mouvement', '-id')
     
     def get_queryset(self):
-        queryset = MouvementStock.objects.filter(is_active=True).select_related('produit', 'fournisseur')
-        
-        # Filtrage par recherche
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(produit__nom__icontains=search) |
-                Q(produit__code_produit__icontains=search) |
-                Q(reference__icontains=search) |
-                Q(commentaire__icontains=search)
-            )
-        
-        # Filtrage par type de mouvement
-        type_mouvement = self.request.GET.get('type_mouvement')
-        if type_mouvement:
-            queryset = queryset.filter(type_mouvement=type_mouvement)
-        
-        # Filtrage par motif
-        motif = self.request.GET.get('motif')
-        if motif:
-            queryset = queryset.filter(motif=motif)
-        
-        return queryset
+        queryset = MouvementStock.objects.filter(is_active=True).select_related(
+            'produit', 'fournisseur', 'emplacement', 'emplacement_destination'
+        )
+        return filtrer_mouvements(self.request.GET, queryset)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search'] = self.request.GET.get('search', '')
         context['type_filter'] = self.request.GET.get('type_mouvement', '')
         context['motif_filter'] = self.request.GET.get('motif', '')
+        context['date_debut'] = self.request.GET.get('date_debut', '')
+        context['date_fin'] = self.request.GET.get('date_fin', '')
+        context['emplacement_filter'] = self.request.GET.get('emplacement', '')
+        context['emplacements'] = Emplacement.objects.filter(is_active=True)
         context['type_choices'] = MouvementStock.TYPE_MOUVEMENT_CHOICES
         context['motif_choices'] = MouvementStock.MOTIF_CHOICES
         return context
 
 
+class MouvementStockExportView(LoginRequiredMixin, View):
+    """
+    Export en flux (CSV ou NDJSON) des mouvements filtrés comme la liste
+    """
+
+    def get(self, request, *args, **kwargs):
+        format_export = request.GET.get('format', 'csv')
+        if format_export not in FORMATS:
+            format_export = 'csv'
+        response = StreamingHttpResponse(
+            exporter(filtrer_mouvements(request.GET), format_export),
+            content_type=FORMATS[format_export],
+        )
+        nom = f"mouvements_stock_{timezone.localtime():%Y%m%d_%H%M%S}.{format_export}"
+        response['Content-Disposition'] = f'attachment; filename="{nom}"'
+        return response
+
+
 class MouvementStockDetailView(LoginRequiredMixin, DetailView):
     model = MouvementStock
     template_name = 'stocks/detail.html'
     context_object_name = 'mouvement'
     
     def get_queryset(self):
-        return MouvementStock.objects.filter(is_active=True).select_related('produit', 'fournisseur')
+        return MouvementStock.objects.filter(is_active=True).select_related(
+            'produit', 'fournisseur', 'emplacement', 'emplacement_destination'
+        )
 
 
 class MouvementStockCreateView(LoginRequiredMixin, TemplateView):
@@ -67,7 +91,7 @@ class MouvementStockCreateView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['produits'] = Produit.objects.filter(is_active=True)
+        context['produit_selectionne'] = produit_selectionne(self.request)
         context['fournisseurs'] = Fournisseur.objects.filter(is_active=True)
         context['type_choices'] = MouvementStock.TYPE_MOUVEMENT_CHOICES
         context['motif_choices'] = MouvementStock.MOTIF_CHOICES
@@ -114,8 +138,10 @@ class EntreeStockView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['produits'] = Produit.objects.filter(is_active=True)
+        context['produit_selectionne'] = produit_selectionne(self.request)
         context['fournisseurs'] = Fournisseur.objects.filter(is_active=True)
+        context['emplacements'] = Emplacement.objects.filter(is_active=True)
+        context['selection'] = Emplacement.principal_id()
         return context
     
     def post(self, request, *args, **kwargs):
@@ -125,15 +151,20 @@ class EntreeStockView(LoginRequiredMixin, TemplateView):
             reference = request.POST.get('reference', '')
             prix_unitaire = float(request.POST.get('prix_unitaire', 0))
             fournisseur_id = request.POST.get('fournisseur')
+            emplacement_id = request.POST.get('emplacement')
             commentaire = request.POST.get('commentaire', '')
             
             produit = get_object_or_404(Produit, id=produit_id, is_active=True)
             fournisseur = None
             if fournisseur_id:
                 fournisseur = get_object_or_404(Fournisseur, id=fournisseur_id, is_active=True)
+            emplacement = None
+            if emplacement_id:
+                emplacement = get_object_or_404(Emplacement, id=emplacement_id, is_active=True)
             
             MouvementStock.objects.create(
                 produit=produit,
+                emplacement=emplacement,
                 type_mouvement='ENTREE',
                 quantite=quantite,
                 motif='ACHAT',
@@ -157,11 +188,13 @@ class SortieStockView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['produits'] = Produit.objects.filter(is_active=True)
+        context['produit_selectionne'] = produit_selectionne(self.request)
         context['motif_choices'] = [
             choice for choice in MouvementStock.MOTIF_CHOICES 
             if choice[0] in ['VENTE', 'RETOUR_CLIENT', 'CASSAGE', 'PERDU', 'VOL', 'DON']
         ]
+        context['emplacements'] = Emplacement.objects.filter(is_active=True)
+        context['selection'] = Emplacement.principal_id()
         return context
     
     def post(self, request, *args, **kwargs):
@@ -172,20 +205,21 @@ class SortieStockView(LoginRequiredMixin, TemplateView):
             reference = request.POST.get('reference', '')
             prix_unitaire = float(request.POST.get('prix_unitaire', 0))
             client = request.POST.get('client', '')
+            emplacement_id = request.POST.get('emplacement')
             commentaire = request.POST.get('commentaire', '')
             
             produit = get_object_or_404(Produit, id=produit_id, is_active=True)
+            emplacement = None
+            if emplacement_id:
+                emplacement = get_object_or_404(Emplacement, id=emplacement_id, is_active=True)
             
-            MouvementStock.objects.create(
-                produit=produit,
-                type_mouvement='SORTIE',
-                quantite=quantite,
+            sortir_stock(
+                [(produit, quantite, prix_unitaire)],
+                emplacement=emplacement,
                 motif=motif,
                 reference=reference,
-                prix_unitaire=prix_unitaire,
                 client=client,
-                commentaire=commentaire,
-                date_mouvement=timezone.now()
+                commentaire=commentaire
             )
             
             messages.success(request, 'Sortie de stock enregistrée avec succès.')
@@ -196,12 +230,48 @@ class SortieStockView(LoginRequiredMixin, TemplateView):
             return self.get(request, *args, **kwargs)
 
 
+class TransfertStockView(LoginRequiredMixin, TemplateView):
+    template_name = 'stocks/transfert_form.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['produit_selectionne'] = produit_selectionne(self.request)
+        context['emplacements'] = Emplacement.objects.filter(is_active=True)
+        context['selection'] = Emplacement.principal_id()
+        return context
+
+    def post(self, request, *args, **kwargs):
+        try:
+            produit = get_object_or_404(Produit, id=request.POST.get('produit'), is_active=True)
+            origine = get_object_or_404(Emplacement, id=request.POST.get('origine'), is_active=True)
+            destination = get_object_or_404(Emplacement, id=request.POST.get('destination'), is_active=True)
+
+            transferer_stock(
+                produit,
+                origine,
+                destination,
+                int(request.POST.get('quantite', 0)),
+                reference=request.POST.get('reference', ''),
+                commentaire=request.POST.get('commentaire', '')
+            )
+
+            messages.success(request, 'Transfert de stock enregistré avec succès.')
+            return redirect('stocks:list')
+
+        except (StockInsuffisant, ValueError) as e:
+            messages.error(request, f'Transfert impossible : {str(e)}')
+            return self.get(request, *args, **kwargs)
+        except Exception as e:
+            messages.error(request, f'Erreur lors de l\'enregistrement : {str(e)}')
+            return self.get(request, *args, **kwargs)
+
+
 class AjustementStockView(LoginRequiredMixin, TemplateView):
     template_name = 'stocks/ajustement_form.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['produits'] = Produit.objects.filter(is_active=True)
+        context['produit_selectionne'] = produit_selectionne(self.request)
         return context
     
     def post(self, request, *args, **kwargs):
@@ -229,3 +299,167 @@ class AjustementStockView(LoginRequiredMixin, TemplateView):
         except Exception as e:
             messages.error(request, f'Erreur lors de l\'enregistrement : {str(e)}')
             return self.get(request, *args, **kwargs)
+
+
+class InventaireListView(LoginRequiredMixin, ListView):
+    model = InventaireSession
+    template_name = 'stocks/inventaire_list.html'
+    context_object_name = 'sessions'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return InventaireSession.objects.filter(is_active=True).select_related('emplacement').annotate(
+            nb_lignes=Count('lignes')
+        ).order_by('-created_at')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['emplacements'] = Emplacement.objects.filter(is_active=True)
+        return context
+
+    def post(self, request, *args, **kwargs):
+        try:
+            reference = request.POST.get('reference', '').strip()
+            emplacement_id = request.POST.get('emplacement')
+            session = InventaireSession.objects.create(
+                reference=reference or f"INV-{timezone.localtime():%Y%m%d-%H%M%S}",
+                emplacement=get_object_or_404(Emplacement, id=emplacement_id, is_active=True) if emplacement_id else None,
+                commentaire=request.POST.get('commentaire', '')
+            )
+            messages.success(request, "Session d'inventaire ouverte avec succès.")
+            return redirect('stocks:inventaire_detail', pk=session.pk)
+
+        except Exception as e:
+            messages.error(request, f'Erreur lors de la création : {str(e)}')
+            return redirect('stocks:inventaire_list')
+
+
+class InventaireDetailView(LoginRequiredMixin, DetailView):
+    model = InventaireSession
+    template_name = 'stocks/inventaire_detail.html'
+    context_object_name = 'session'
+    lignes_par_page = 50
+
+    def get_queryset(self):
+        return InventaireSession.objects.filter(is_active=True).select_related('emplacement')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        session = self.object
+        if session.est_ouverte:
+            lignes = inventaire.lignes_avec_ecart(session)
+            champ_ecart = 'ecart_courant'
+        else:
+            lignes = session.lignes.all()
+            champ_ecart = 'ecart'
+
+        context['resume'] = lignes.aggregate(
+            nb_lignes=Count('pk'),
+            nb_ecarts=Count('pk', filter=~Q(**{champ_ecart: 0})),
+        )
+        ecarts_seulement = self.request.GET.get('ecarts') == 'true'
+        if ecarts_seulement:
+            lignes = lignes.exclude(**{champ_ecart: 0})
+        page = Paginator(
+            lignes.select_related('produit').order_by('produit__nom', 'pk'), self.lignes_par_page
+        ).get_page(self.request.GET.get('page'))
+        context['lignes'] = page
+        context['page_obj'] = page
+        context['ecarts_seulement'] = ecarts_seulement
+        return context
+
+
+class InventaireImportView(LoginRequiredMixin, View):
+    """
+    Charge un lot de comptages : fichier CSV du scanner (formulaire) ou
+    lot JSON (application/json, réponse JSON)
+    """
+
+    def post(self, request, *args, **kwargs):
+        session = get_object_or_404(InventaireSession, pk=self.kwargs['pk'], is_active=True)
+        remplacer = request.GET.get('remplacer') == 'true' or request.POST.get('remplacer') == 'on'
+
+        if request.content_type == 'application/json':
+            try:
+                comptages = inventaire.lire_json(json.loads(request.body))
+                total, inconnus = inventaire.enregistrer_comptages(session, comptages, remplacer)
+            except (ValueError, inventaire.InventaireError) as e:
+                return JsonResponse({'erreur': str(e)}, status=400)
+            return JsonResponse({'lignes': total, 'inconnus': inconnus})
+
+        try:
+            fichier = request.FILES.get('fichier')
+            if not fichier:
+                raise inventaire.InventaireError("Aucun fichier de comptage fourni")
+            total, inconnus = inventaire.enregistrer_comptages(
+                session, inventaire.lire_csv(fichier), remplacer
+            )
+            messages.success(request, f'{total} produit(s) compté(s) enregistré(s).')
+            if inconnus:
+                messages.warning(
+                    request,
+                    f"{len(inconnus)} code(s) inconnu(s) ignoré(s) : {', '.join(inconnus[:20])}"
+                )
+
+        except Exception as e:
+            messages.error(request, f"Erreur lors de l'import : {str(e)}")
+        return redirect('stocks:inventaire_detail', pk=session.pk)
+
+
+class InventaireValiderView(LoginRequiredMixin, View):
+
+    def post(self, request, *args, **kwargs):
+        session = get_object_or_404(InventaireSession, pk=self.kwargs['pk'], is_active=True)
+        try:
+            total = inventaire.valider(session)
+            messages.success(request, f'Inventaire validé : {total} ajustement(s) enregistré(s).')
+
+        except Exception as e:
+            messages.error(request, f'Erreur lors de la validation : {str(e)}')
+        return redirect('stocks:inventaire_detail', pk=session.pk)
+
+
+class ReapprovisionnementView(LoginRequiredMixin, TemplateView):
+    """
+    Commandes suggérées par fournisseur ; `?format=csv&fournisseur=<id>`
+    télécharge le brouillon de commande d'un fournisseur
+    """
+    template_name = 'stocks/reapprovisionnement.html'
+
+    def get_jours_couverture(self):
+        try:
+            return max(int(self.request.GET.get('jours', '')), 0)
+        except ValueError:
+            return settings.STOCKS_REAPPRO_JOURS_COUVERTURE
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('format') == 'csv':
+            return self.export_csv(request.GET.get('fournisseur') or None)
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        jours = self.get_jours_couverture()
+        commandes = reapprovisionnement.suggestions(jours_couverture=jours)
+        context['commandes'] = commandes
+        context['jours_couverture'] = jours
+        context['nb_produits'] = sum(len(commande['lignes']) for commande in commandes)
+        context['montant_total'] = sum(commande['total'] for commande in commandes)
+        return context
+
+    def export_csv(self, fournisseur_id):
+        commandes = reapprovisionnement.suggestions(fournisseur_id, self.get_jours_couverture())
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = (
+            f'attachment; filename="commande_{fournisseur_id or "tous"}_{timezone.localdate():%Y%m%d}.csv"'
+        )
+        response.write('\ufeff')
+        writer = csv.writer(response, delimiter=';')
+        writer.writerow(['fournisseur', 'code_produit', 'produit', 'quantite', 'unite', 'prix_achat', 'montant'])
+        for commande in commandes:
+            for ligne in commande['lignes']:
+                writer.writerow([
+                    commande['fournisseur'] or '', ligne['code_produit'], ligne['nom'], ligne['quantite'],
+                    ligne['unite'], ligne['prix_achat'], ligne['montant'],
+                ])
+        return response
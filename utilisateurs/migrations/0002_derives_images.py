@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("utilisateurs", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profilutilisateur",
+            name="avatar_derives",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Miniatures générées en arrière-plan (voir core.images)",
+                verbose_name="Dérivés de l'avatar",
+            ),
+        ),
+    ]
@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from core import images
 from core.models import BaseModel
 
 
@@ -112,6 +113,13 @@ class ProfilUtilisateur(BaseModel):
         verbose_name="Avatar",
         help_text="Photo de profil"
     )
+    avatar_derives = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Dérivés de l'avatar",
+        help_text="Miniatures générées en arrière-plan (voir core.images)"
+    )
     bio = models.TextField(
         blank=True,
         null=True,
@@ -141,3 +149,10 @@ class ProfilUtilisateur(BaseModel):
 
     def __str__(self):
         return f"Profil de {self.user.nom_complet}"
+
+    def save(self, *args, **kwargs):
+        nouvel_avatar = images.preparer(self, 'avatar')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if nouvel_avatar:
+                images.planifier(self, 'avatar')
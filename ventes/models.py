@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from core import outbox
 from core.models import BaseModel
 
 
@@ -103,7 +104,30 @@ class Vente(BaseModel):
         # Calculer le montant final
         self.montant_final = self.montant_total - self.remise
         
-        super().save(*args, **kwargs)
+        creation = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            outbox.publier(self, 'CREATION' if creation else 'MODIFICATION', self.donnees_evenement())
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            outbox.publier(self, 'SUPPRESSION', self.donnees_evenement(), pk=pk)
+        return result
+
+    def donnees_evenement(self):
+        """
+        État de la vente transmis aux abonnés de l'outbox
+        """
+        return {
+            'numero_vente': self.numero_vente,
+            'client_nom': self.client_nom,
+            'statut': self.statut,
+            'date_vente': self.date_vente,
+            'montant_final': self.montant_final,
+            'is_active': self.is_active,
+        }
 
 
 class LigneVente(BaseModel):
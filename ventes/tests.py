@@ -1,3 +1,39 @@
 from django.test import TestCase
+from django.utils import timezone
 
-# Create your tests here.
+from produits.models import Categorie, Produit
+from stocks.models import MouvementStock, SoldeStock
+from utilisateurs.models import User
+from .models import Vente
+
+
+class FinalisationVenteTest(TestCase):
+
+    def setUp(self):
+        self.produit = Produit.objects.create(
+            code_produit="VIS-001", nom="Vis", categorie=Categorie.objects.create(nom="Visserie"),
+            prix_achat=1, prix_vente=2,
+        )
+        MouvementStock.objects.create(produit=self.produit, type_mouvement='ENTREE', quantite=10, motif='ACHAT')
+        self.vente = Vente.objects.create(numero_vente="V-001", client_nom="Client", date_vente=timezone.now())
+        User.objects.create_user('caisse', 'caisse@example.com', 'secret')
+        self.client.login(username='caisse', password='secret')
+        self.url = f'/ventes/{self.vente.pk}/finaliser/'
+
+    def test_double_envoi_ne_sort_le_stock_qu_une_fois(self):
+        donnees = {'produits': [self.produit.pk], 'quantites': ['3']}
+        self.assertEqual(self.client.post(self.url, donnees).status_code, 302)
+        reponse = self.client.post(self.url, donnees)
+
+        self.assertEqual(reponse.status_code, 200)
+        self.assertIn("déjà terminée", ' '.join(str(message) for message in reponse.context['messages']))
+        self.assertEqual(SoldeStock.objects.get(produit=self.produit).quantite, 7)
+        self.assertEqual(self.vente.lignes.count(), 1)
+
+    def test_quantite_invalide_refusee_avant_ecriture(self):
+        reponse = self.client.post(self.url, {'produits': [self.produit.pk], 'quantites': ['abc']})
+
+        self.assertIn("Quantité invalide", ' '.join(str(message) for message in reponse.context['messages']))
+        self.vente.refresh_from_db()
+        self.assertEqual(self.vente.statut, 'EN_COURS')
+        self.assertFalse(self.vente.lignes.exists())
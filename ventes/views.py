@@ -5,16 +5,21 @@ from django.contrib import messages
 from django.urls import reverse_lazy
 from django.db.models import Q
 from django.utils import timezone
+from django.db import transaction
+from django.http import Http404
 
+from core.pagination import CursorPaginationMixin
 from .models import Vente, LigneVente
 from produits.models import Produit
+from stocks.services import sortir_stock
 
 
-class VenteListView(LoginRequiredMixin, ListView):
+class VenteListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Vente
     template_name = 'ventes/list.html'
     context_object_name = 'ventes'
     paginate_by = 20
+    cursor_ordering = ('-date_vente', '-id')
     
     def get_queryset(self):
         queryset = Vente.objects.filter(is_active=True)
@@ -57,7 +62,6 @@ class VenteCreateView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['produits'] = Produit.objects.filter(is_active=True)
         context['statut_choices'] = Vente.STATUT_CHOICES
         return context
     
@@ -143,33 +147,82 @@ class VenteFinaliserView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['vente'] = get_object_or_404(Vente, id=self.kwargs['pk'], is_active=True)
-        context['produits'] = Produit.objects.filter(is_active=True)
         return context
     
+    def lire_lignes(self, request):
+        """
+        Lignes postées [(produit_id, quantité)], validées avant toute écriture ;
+        une ligne sans produit choisi est ignorée
+        """
+        produits_ids = request.POST.getlist('produits')
+        quantites = request.POST.getlist('quantites')
+        if len(produits_ids) != len(quantites):
+            raise ValueError("Lignes de vente incomplètes")
+        lignes = []
+        for produit_id, quantite in zip(produits_ids, quantites):
+            produit_id, quantite = produit_id.strip(), quantite.strip()
+            if not produit_id:
+                continue
+            if not produit_id.isdigit():
+                raise ValueError(f"Produit invalide « {produit_id} »")
+            if not quantite.isdigit() or int(quantite) <= 0:
+                raise ValueError(f"Quantité invalide « {quantite} »")
+            lignes.append((int(produit_id), int(quantite)))
+        if not lignes:
+            raise ValueError("Aucun produit à vendre")
+        return lignes
+
     def post(self, request, *args, **kwargs):
         try:
-            vente = get_object_or_404(Vente, id=self.kwargs['pk'], is_active=True)
-            
-            # Ajouter des lignes de vente
-            produits_ids = request.POST.getlist('produits')
-            quantites = request.POST.getlist('quantites')
-            
-            for produit_id, quantite in zip(produits_ids, quantites):
-                if quantite and int(quantite) > 0:
-                    produit = get_object_or_404(Produit, id=produit_id, is_active=True)
+            lignes_postees = self.lire_lignes(request)
+        except ValueError as e:
+            messages.error(request, f'Erreur lors de la finalisation : {str(e)}')
+            return self.get(request, *args, **kwargs)
+
+        try:
+            with transaction.atomic():
+                # Verrou sur la vente : un double envoi ou une autre caisse attend ici,
+                # puis trouve la vente déjà terminée
+                vente = get_object_or_404(
+                    Vente.objects.select_for_update(), id=self.kwargs['pk'], is_active=True
+                )
+                if vente.statut != 'EN_COURS':
+                    raise ValueError(f"la vente est déjà {vente.get_statut_display().lower()}")
+
+                produits = Produit.objects.filter(is_active=True).in_bulk(
+                    {produit_id for produit_id, _ in lignes_postees}
+                )
+                inconnus = {produit_id for produit_id, _ in lignes_postees} - set(produits)
+                if inconnus:
+                    raise ValueError(f"produit introuvable ou inactif ({', '.join(map(str, sorted(inconnus)))})")
+
+                lignes = []
+                for produit_id, quantite in lignes_postees:
+                    produit = produits[produit_id]
                     LigneVente.objects.create(
                         vente=vente,
                         produit=produit,
-                        quantite=int(quantite),
+                        quantite=quantite,
                         prix_unitaire=produit.prix_vente
                     )
-            
-            vente.statut = 'TERMINEE'
-            vente.save()
+                    lignes.append((produit, quantite, produit.prix_vente))
+                
+                # Sortie de stock sérialisée avec les autres caisses
+                sortir_stock(
+                    lignes,
+                    motif='VENTE',
+                    reference=vente.numero_vente,
+                    client=vente.client_nom
+                )
+                
+                vente.statut = 'TERMINEE'
+                vente.save()
             
             messages.success(request, 'Vente finalisée avec succès.')
             return redirect('ventes:detail', pk=vente.pk)
             
+        except Http404:
+            raise
         except Exception as e:
             messages.error(request, f'Erreur lors de la finalisation : {str(e)}')
             return self.get(request, *args, **kwargs)